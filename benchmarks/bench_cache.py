@@ -0,0 +1,91 @@
+"""SQLite round trips vs the in-memory product cache for the GUI's hot paths.
+
+Times a first page per sort order, a substring name filter, totals and row
+formatting against SQL, plus what keeping the cache current costs (initial load,
+a refresh with nothing changed, a refresh after a handful of edits) and how much
+memory the cache holds.
+
+Usage: python benchmarks/bench_cache.py [--rows 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import inventory_core as core
+import product_cache
+
+WORDS = ["rice", "beans", "garri", "yam", "palm", "oil", "sugar", "salt", "milk", "bread"]
+
+def format_row(row):
+    # The Treeview formatting done by inventory.format_product_row
+    date = datetime.strptime(row[4], "%Y-%m-%d %H:%M:%S").strftime("%m/%d/%Y %I:%M %p") if row[4] else "Never"
+    return (row[0], row[1], f"₦{row[2]:,.2f}", f"{row[3]:,}", f"₦{row[2]*row[3]:,.2f}", date)
+
+def ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat): fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, "bench.db")); database.initialize(conn)
+        rng = random.Random(42)
+        conn.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                         [(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", round(rng.uniform(50, 5000), 2), rng.randint(0, 500),
+                           f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00") for i in range(args.rows)])
+        conn.commit()
+
+        cache = product_cache.ProductCache()
+        load_ms = ms(lambda: cache.load(conn), 1)
+        orders_ms = ms(lambda: [cache.order(field) for field in core.SORT_EXPRESSIONS], 1)
+        # Measured again on a second cache, as tracing slows the load down
+        tracemalloc.start()
+        traced_cache = product_cache.ProductCache(); traced_cache.load(conn)
+        for field in core.SORT_EXPRESSIONS: traced_cache.order(field)
+        traced = tracemalloc.get_traced_memory()[0]; tracemalloc.stop()
+        del traced_cache
+
+        results = []
+        for field in ("id", "price", "name"):
+            v = core.sorted_view(core.make_view(), field, desc=True)
+            results.append((f"first page by {field}", ms(lambda: core.fetch_page(conn, v), args.repeat),
+                            ms(lambda: cache.fetch_page(v), args.repeat)))
+        # What search falls back to without FTS5: a substring filter over every name
+        v = dict(core.make_view("LOWER(products.name) LIKE ?", ("%milk%",)), contains="milk")
+        results.append(("name filter, first page", ms(lambda: core.fetch_page(conn, v), args.repeat),
+                        ms(lambda: cache.fetch_page(v), args.repeat)))
+        results.append(("totals (full scan)", ms(lambda: core.compute_totals(conn), args.repeat), ms(cache.totals, args.repeat)))
+        results.append(("totals (trigger row)", ms(lambda: core.read_totals(conn), args.repeat), ms(cache.totals, args.repeat)))
+        page = core.fetch_page(conn, core.make_view())
+        cache.fetch_page(core.make_view())
+        results.append(("format a page", ms(lambda: [format_row(r) for r in page], args.repeat),
+                        ms(lambda: [cache.display(r[0], format_row) for r in page], args.repeat)))
+
+        print(f"{args.rows:,} products")
+        print(f"{'':26}{'SQLite ms':>12}{'cache ms':>12}")
+        for name, sql, mem in results:
+            print(f"{name:26}{sql:12.3f}{mem:12.3f}   x{sql / max(mem, 1e-6):,.0f}")
+
+        refresh_idle = ms(lambda: cache.refresh(conn), args.repeat)
+        ids = rng.sample(range(1, args.rows + 1), 100)
+        for pid in ids: conn.execute("UPDATE products SET quantity = quantity + 1 WHERE id = ?", (pid,))
+        conn.commit()
+        refresh_edits = ms(lambda: cache.refresh(conn), 1)
+        print(f"\ninitial load                   {load_ms:10.1f} ms")
+        print(f"build all six sort orders      {orders_ms:10.1f} ms")
+        print(f"refresh, nothing changed       {refresh_idle:10.3f} ms")
+        print(f"refresh after 100 edits        {refresh_edits:10.3f} ms")
+        print(f"cache memory (memory_bytes)    {cache.memory_bytes() / 1e6:10.1f} MB")
+        print(f"cache memory (tracemalloc)     {traced / 1e6:10.1f} MB")
+        conn.close()
@@ -0,0 +1,73 @@
+"""Write/read throughput of a default sqlite3 connection vs the tuned database layer.
+
+"before" is what init_database() used to do: sqlite3.connect() with default pragmas
+(rollback journal, synchronous=FULL) and no secondary indexes. "after" is
+database.connect() (WAL, tuned pragmas, statement cache) on the fully migrated schema.
+
+Usage: python benchmarks/bench_database.py [--rows 50000] [--writes 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+
+WORDS = ["rice", "beans", "garri", "yam", "palm", "oil", "sugar", "salt", "milk", "bread"]
+
+def setup(conn, rows, indexed):
+    for target, step in database.MIGRATIONS:
+        if target == 3 and not indexed: continue
+        step(conn)
+    rng = random.Random(42)
+    conn.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                     [(f"{rng.choice(WORDS)} {i}", rng.uniform(50, 5000), rng.randint(0, 500),
+                       f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00") for i in range(rows)])
+    conn.commit()
+
+def rate(count, fn):
+    start = time.perf_counter(); fn()
+    return count / (time.perf_counter() - start)
+
+def workload(conn, rows, writes):
+    rng = random.Random(7)
+    def single_writes():
+        # add_product()/update_product(): one statement, one commit
+        for i in range(writes):
+            if i % 2: conn.execute("UPDATE products SET quantity=? WHERE id=?", (rng.randint(0, 500), rng.randint(1, rows)))
+            else: conn.execute("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                               ("new item", 10.0, 1, "2024-06-01 09:00:00"))
+            conn.commit()
+    def point_reads():
+        for _ in range(writes * 5):
+            conn.execute("SELECT id, name, price, quantity, updated_at FROM products WHERE id=?", (rng.randint(1, rows),)).fetchone()
+    def name_lookups():
+        for _ in range(writes):
+            conn.execute("SELECT id FROM products WHERE name=? COLLATE NOCASE", (f"RICE {rng.randint(0, rows)}",)).fetchall()
+    def recent_pages():
+        for _ in range(writes // 10):
+            conn.execute("SELECT id, name FROM products ORDER BY updated_at DESC LIMIT 100").fetchall()
+    return {"single-row commits/s": rate(writes, single_writes),
+            "point reads/s": rate(writes * 5, point_reads),
+            "name lookups/s": rate(writes, name_lookups),
+            "recent-page queries/s": rate(writes // 10, recent_pages)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        before = sqlite3.connect(os.path.join(tmp, "before.db"))
+        setup(before, args.rows, indexed=False)
+        after = database.connect(os.path.join(tmp, "after.db"))
+        setup(after, args.rows, indexed=True)
+        results = [workload(before, args.rows, args.writes), workload(after, args.rows, args.writes)]
+        before.close(); after.close()
+    print(f"{'':24}{'before':>14}{'after':>14}")
+    for name in results[0]:
+        print(f"{name:24}{results[0][name]:14,.0f}{results[1][name]:14,.0f}   x{results[1][name] / results[0][name]:.1f}")
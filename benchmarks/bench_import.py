@@ -0,0 +1,65 @@
+"""Compare bulk CSV import with the old one-row-one-commit path of add_product().
+
+Usage: python benchmarks/bench_import.py [--rows 100000] [--per-row-sample 2000]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import inventory_core as core
+
+WORDS = ["rice", "beans", "garri", "yam", "palm", "oil", "sugar", "salt", "milk", "bread",
+         "tomato", "pepper", "onion", "noodles", "semovita", "maggi", "butter", "soap", "detergent", "water"]
+
+def write_price_list(filename, rows):
+    rng = random.Random(42)
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Price", "Quantity"])
+        for _ in range(rows):
+            writer.writerow([f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.randint(1, 500)}",
+                             f"₦{rng.uniform(50, 50000):,.2f}", f"{rng.randint(0, 1000):,}"])
+
+def per_row(path, filename, limit):
+    """What add_product() does for each product: validate, insert, commit"""
+    conn = database.connect(path); database.initialize(conn)
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    with open(filename, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f); next(reader)
+        for i, (name, price_str, qty_str) in enumerate(reader):
+            if i == limit: break
+            price, qty = core.validate_product_input(name, price_str, qty_str)
+            current_time = core.timestamp()
+            cursor.execute("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                           (name, price, qty, current_time)); conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return limit / elapsed
+
+def bulk(path, filename):
+    conn = database.connect(path); database.initialize(conn); conn.close()
+    start = time.perf_counter()
+    imported, _ = core.import_products_csv(path, filename)
+    return imported / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--per-row-sample", type=int, default=2000,
+                        help="rows to time on the per-row path (it is far too slow for the full file)")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        price_list = os.path.join(tmp, "prices.csv")
+        write_price_list(price_list, args.rows)
+        slow = per_row(os.path.join(tmp, "per_row.db"), price_list, min(args.per_row_sample, args.rows))
+        fast = bulk(os.path.join(tmp, "bulk.db"), price_list)
+    print(f"per-row commits : {slow:12,.0f} rows/s  (~{args.rows / slow:,.1f}s for {args.rows:,} rows)")
+    print(f"bulk import     : {fast:12,.0f} rows/s  ({args.rows / fast:,.1f}s for {args.rows:,} rows)")
+    print(f"speedup         : x{fast / slow:,.1f}")
@@ -0,0 +1,69 @@
+"""What instrumentation costs: a timed() call and SQL paging/scanning, disabled and enabled.
+
+Each workload runs on a plain connection, on an instrumented connection with
+recording off (the app started with --diagnostics, then paused) and with it on.
+Without --diagnostics the app keeps plain connections, so only the timed()
+"disabled" column applies.
+
+Usage: python benchmarks/bench_instrumentation.py [--rows 100000] [--repeat 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import instrumentation
+import inventory_core as core
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat): fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def run(conn, repeat):
+    v = core.sorted_view(core.make_view(), "price", desc=True)
+    page = core.fetch_page(conn, v)
+    key = core.row_key(page[-1])
+    return {"first page": per_call_us(lambda: core.fetch_page(conn, v), repeat),
+            "next page": per_call_us(lambda: core.fetch_page(conn, v, before=key), repeat),
+            "point lookup": per_call_us(lambda: core.get_product(conn, 1), repeat),
+            "full scan": per_call_us(lambda: sum(1 for _ in conn.execute("SELECT id, name, price, quantity FROM products")), 3)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    noop = lambda: None
+    wrapped = instrumentation.timed("noop")(noop)
+    bare = per_call_us(noop, args.repeat * 100)
+    off = per_call_us(wrapped, args.repeat * 100)
+    instrumentation.enable(); on = per_call_us(wrapped, args.repeat * 100); instrumentation.disable()
+    print(f"timed() call            bare {bare:7.3f} us   disabled {off:7.3f} us   enabled {on:7.3f} us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = database.connect(path); database.initialize(conn)
+        rng = random.Random(42)
+        conn.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                         [(f"product {i}", round(rng.uniform(50, 5000), 2), rng.randint(0, 500), "2024-01-01 09:00:00")
+                          for i in range(args.rows)])
+        conn.commit()
+        plain = run(conn, args.repeat); conn.close()
+
+        instrumentation.install()
+        conn = database.connect(path)
+        paused = run(conn, args.repeat)
+        instrumentation.enable(); recording = run(conn, args.repeat); instrumentation.disable()
+        conn.close()
+
+    print(f"\n{args.rows:,} products, microseconds per call")
+    print(f"{'':16}{'plain':>12}{'paused':>12}{'recording':>12}")
+    for name in plain:
+        print(f"{name:16}{plain[name]:12.1f}{paused[name]:12.1f}{recording[name]:12.1f}"
+              f"   +{(recording[name] / plain[name] - 1) * 100:.0f}%")
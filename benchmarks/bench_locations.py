@@ -0,0 +1,66 @@
+"""Per-location listing, search and totals against the same operations over the whole store.
+
+The catalogue from catalogue.py is spread over --locations locations (every
+product at the default one, a random share at each branch, as a chain that
+stocks its range unevenly would), then every listing is timed once over all
+products and once limited to a branch. With the composite location indexes
+the branch columns should stay within a small factor of the store-wide ones.
+
+Usage: python benchmarks/bench_locations.py [--rows 100000] [--locations 5] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import inventory_core as core
+import catalogue
+from bench_suite import measure
+
+BRANCH_SHARE = 0.4              # share of the catalogue each branch stocks
+
+def operations(conn, fts_enabled, location):
+    """{name: zero-argument callable} for one location (None: the whole store)"""
+    limit = (lambda v: v) if location is None else (lambda v: core.location_view(v, location))
+    ops = {"first page": lambda: core.fetch_page(conn, limit(core.make_view()))}
+    for field in ("name", "price", "total_value"):
+        v = limit(core.sorted_view(core.make_view(), field, desc=True))
+        key = core.row_key(core.fetch_page(conn, v)[-1])
+        ops[f"sort {field}"] = lambda v=v: core.fetch_page(conn, v)
+        ops[f"sort {field} next page"] = lambda v=v, key=key: core.fetch_page(conn, v, before=key)
+    for term in ("rice", "semo", "zzzz"):
+        ops[f"search {term}"] = lambda term=term: core.fetch_page(conn, limit(core.search_view(conn, term, fts_enabled)))
+    ops["totals"] = lambda: core.read_totals(conn, location)
+    ops["totals full scan"] = lambda: core.compute_totals(conn, location)
+    return ops
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--locations", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, "locations.db")); fts_enabled = database.initialize(conn)
+        catalogue.populate(conn, args.rows, args.seed)
+        rng = random.Random(args.seed)
+        ids = [r[0] for r in conn.execute("SELECT id FROM products")]
+        branches = [core.add_location(conn, f"Branch {i}") for i in range(1, args.locations)]
+        for branch in branches:
+            for pid in rng.sample(ids, int(len(ids) * BRANCH_SHARE)):
+                core.set_location_stock(conn, branch, pid, rng.randint(0, 50))
+        conn.commit()
+
+        branch = branches[0] if branches else core.DEFAULT_LOCATION
+        store, local = operations(conn, fts_enabled, None), operations(conn, fts_enabled, branch)
+        print(f"{args.rows:,} products over {args.locations} locations, median ms of {args.repeat} runs")
+        print(f"  {'operation':28}{'all':>10}{'branch':>10}")
+        for name in store:
+            a, b = measure(store[name], args.repeat)["median_ms"], measure(local[name], args.repeat)["median_ms"]
+            print(f"  {name:28}{a:10.3f}{b:10.3f}")
+        conn.close()
@@ -0,0 +1,100 @@
+"""NumPy reports vs the same reports written as a plain Python loop per product.
+
+Builds a products table and a month of sales in a scratch database (schema
+reduced to the columns the reports read, so filling a million rows is quick),
+then times reports.build_report() against a per-row implementation and checks
+that both agree.
+
+Usage: python benchmarks/bench_reports.py [--rows 1000000] [--sales 200000]
+"""
+import argparse
+import bisect
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import product_cache
+import reports
+
+def setup(conn, rows, sales, now):
+    conn.executescript("""
+    CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL, quantity INTEGER NOT NULL, updated_at TEXT);
+    CREATE TABLE stock_movements (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, kind TEXT NOT NULL,
+                                  quantity_change INTEGER NOT NULL, price REAL NOT NULL, created_at TEXT NOT NULL, note TEXT);
+    CREATE INDEX idx_stock_movements_created ON stock_movements(created_at);
+    CREATE TABLE product_changes (product_id INTEGER PRIMARY KEY, version INTEGER NOT NULL);
+    """)
+    rng = random.Random(42)
+    conn.executemany("INSERT INTO products (id, name, price, quantity) VALUES (?,?,?,?)",
+                     ((i, f"item {i}", round(rng.lognormvariate(7, 1.5), 2), rng.randint(0, 300)) for i in range(1, rows + 1)))
+    # Skewed demand: a few products sell most of the units
+    conn.executemany("INSERT INTO stock_movements (product_id, kind, quantity_change, price, created_at) VALUES (?,?,?,?,?)",
+                     ((min(int(rng.paretovariate(1.2)), rows), "sale", -rng.randint(1, 5), 0,
+                       (now - timedelta(minutes=rng.randint(0, 60 * 24 * 40))).strftime("%Y-%m-%d %H:%M:%S")) for _ in range(sales)))
+    conn.commit()
+
+def naive_report(conn, now):
+    """The reports computed the obvious way: fetch rows, loop in Python"""
+    products = conn.execute("SELECT id, price, quantity FROM products").fetchall()
+    since = (now - timedelta(days=reports.DEMAND_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    sold = {}
+    for pid, units in conn.execute("SELECT product_id, -quantity_change FROM stock_movements WHERE created_at >= ? AND kind = 'sale'", (since,)):
+        sold[pid] = sold.get(pid, 0) + units
+    bands = [[0, 0, 0.0] for _ in reports.PRICE_BANDS]
+    total = 0.0
+    for pid, price, qty in products:
+        band = bands[bisect.bisect_right(reports.PRICE_BANDS, price) - 1]
+        band[0] += 1; band[1] += qty; band[2] += price * qty; total += price * qty
+    abc = [0, 0, 0]; running = 0.0
+    for pid, price, qty in sorted(products, key=lambda r: -r[1] * r[2]):
+        share = running / (total or 1.0)
+        abc[0 if share < reports.ABC_SHARES[0] else 1 if share < reports.ABC_SHARES[1] else 2] += 1
+        running += price * qty
+    low = 0
+    for pid, price, qty in products:
+        demand = sold.get(pid, 0) / reports.DEMAND_DAYS
+        reorder = -(-demand * reports.LEAD_TIME_DAYS // 1) if demand > 0 else reports.LOW_STOCK_QUANTITY
+        if qty <= reorder: low += 1
+    known = {pid for pid, _, _ in products}
+    movers = sorted(((-units, pid) for pid, units in sold.items() if pid in known and units > 0))[:reports.TOP_MOVERS]
+    return [(b[0], b[1]) for b in bands], abc, low, [pid for _, pid in movers]
+
+def timed(fn):
+    start = time.perf_counter(); result = fn()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--sales", type=int, default=200000)
+    args = parser.parse_args()
+    if not reports.available(): sys.exit("NumPy is not installed")
+    now = datetime(2024, 6, 30, 18, 0, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, "reports.db"))
+        setup(conn, args.rows, args.sales, now)
+        reports.load_products(conn)   # warm the page cache for both sides
+        naive, naive_s = timed(lambda: naive_report(conn, now))
+        report, numpy_s = timed(lambda: reports.build_report(conn, now=now))
+        _, load_s = timed(lambda: reports.load_products(conn))
+        # The desktop app builds reports from its product cache, which is already in memory
+        cache = product_cache.ProductCache(); cache.load(conn)
+        cached_report, cached_s = timed(lambda: reports.build_report(conn, cache, now=now))
+        conn.close()
+    assert cached_report["sections"] == report["sections"], "cache-backed report differs"
+    bands, abc, low, movers = report["sections"]
+    assert [(r[1], r[2]) for r in bands["rows"]] == naive[0], "valuation differs"
+    assert [r[1] for r in abc["rows"]] == naive[1], "ABC classes differ"
+    assert low["count"] == naive[2], "low stock differs"
+    assert [r[0] for r in movers["rows"]] == naive[3], "top movers differ"
+    print(f"{args.rows:,} products, {args.sales:,} sales (results match)")
+    print(f"per-row Python loop   {naive_s * 1000:10.1f} ms")
+    print(f"NumPy build_report    {numpy_s * 1000:10.1f} ms   x{naive_s / numpy_s:.1f}")
+    print(f"  of which bulk load  {load_s * 1000:10.1f} ms   (products into arrays)")
+    print(f"  the rest            {(numpy_s - load_s) * 1000:10.1f} ms   (sales, reports, names)")
+    print(f"NumPy from the cache  {cached_s * 1000:10.1f} ms   x{naive_s / cached_s:.1f}   (what the app runs)")
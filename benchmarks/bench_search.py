@@ -0,0 +1,56 @@
+"""Compare the old LIKE scan with the FTS5 search index.
+
+Usage: python benchmarks/bench_search.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import inventory_core as core
+
+WORDS = ["rice", "beans", "garri", "yam", "palm", "oil", "sugar", "salt", "milk", "bread",
+         "tomato", "pepper", "onion", "noodles", "semovita", "maggi", "butter", "soap", "detergent", "water"]
+TERMS = ["rice", "pal", "tomato paste", "noodles 12", "zzz"]
+REPEATS = 20
+
+def populate(cursor, rows):
+    rng = random.Random(42)
+    batch = []
+    for i in range(rows):
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.randint(1, 500)}"
+        batch.append((name, round(rng.uniform(50, 50000), 2), rng.randint(0, 1000), "2024-01-01 09:00:00"))
+        if len(batch) == 10000:
+            cursor.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)", batch); batch.clear()
+    if batch: cursor.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)", batch)
+
+def time_ms(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS): fn()
+    return (time.perf_counter() - start) * 1000 / REPEATS
+
+def run(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, "bench.db")); fts_enabled = database.initialize(conn)
+        cursor = conn.cursor()
+        populate(cursor, size); conn.commit()
+        print(f"\n{size:,} rows")
+        for term in TERMS:
+            # What search_product() used to do: full scan + LOWER() on every row, fetch everything
+            like = time_ms(lambda: cursor.execute("SELECT * FROM products WHERE LOWER(name) LIKE ?",
+                                                  (f"%{term.lower()}%",)).fetchall())
+            # What it does now: FTS match, first page only
+            def fts_search():
+                core.fetch_page(conn, core.search_view(conn, term, fts_enabled))
+            fts = time_ms(fts_search)
+            print(f"  {term!r:16} LIKE {like:9.2f} ms   FTS5 {fts:8.2f} ms   x{like / max(fts, 1e-9):.1f}")
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    for size in parser.parse_args().sizes: run(size)
@@ -0,0 +1,102 @@
+"""Load test for service.py: many concurrent keep-alive clients against a local server.
+
+Starts the service in a subprocess on a temporary database and reports
+requests/second and latency percentiles. Nothing leaves the machine.
+
+Usage: python benchmarks/bench_service.py [--rows 20000] [--clients 50] [--seconds 10] [--write-ratio 0.1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import database
+
+WORDS = ["rice", "beans", "garri", "yam", "palm", "oil", "sugar", "salt", "milk", "bread"]
+
+def populate(path, rows):
+    conn = database.connect(path); database.initialize(conn)
+    rng = random.Random(42)
+    conn.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                     [(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", rng.uniform(50, 5000), rng.randint(0, 500),
+                       "2024-01-01 09:00:00") for i in range(rows)])
+    conn.commit(); conn.close()
+
+async def request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""): break
+        if line.lower().startswith(b"content-length:"): length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return status
+
+async def client(port, rows, deadline, write_ratio, seed, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < write_ratio / 2:
+                call = ("POST", "/products", {"name": f"{rng.choice(WORDS)} new", "price": "120.50", "quantity": "3"})
+            elif roll < write_ratio:
+                call = ("PUT", f"/products/{rng.randint(1, rows)}", {"name": "updated", "price": "99", "quantity": str(rng.randint(0, 50))})
+            elif roll < 0.5:
+                call = ("GET", f"/products/{rng.randint(1, rows)}", None)
+            elif roll < 0.75:
+                call = ("GET", f"/search?q={rng.choice(WORDS)}%20{rng.choice(WORDS)[:2]}&limit=20", None)
+            elif roll < 0.9:
+                call = ("GET", "/products?limit=50", None)
+            else:
+                call = ("GET", "/totals", None)
+            start = time.perf_counter()
+            status = await request(reader, writer, *call)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500: errors.append(status)
+    finally:
+        writer.close()
+
+async def load(port, rows, clients, seconds, write_ratio):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, rows, deadline, write_ratio, i, latencies, errors) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - start
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "service.db")
+        populate(path, args.rows)
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "service.py"), "--db", path, "--port", "0"],
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            port = int(server.stdout.readline().rsplit(":", 1)[1])
+            latencies, errors, elapsed = asyncio.run(load(port, args.rows, args.clients, args.seconds, args.write_ratio))
+        finally:
+            server.terminate(); server.wait()
+    latencies.sort()
+    print(f"{len(latencies):,} requests from {args.clients} clients in {elapsed:.1f}s "
+          f"({args.write_ratio:.0%} writes, {len(errors)} server errors)")
+    print(f"throughput : {len(latencies) / elapsed:,.0f} req/s")
+    print(f"latency    : p50 {percentile(latencies, 50) * 1000:.2f} ms   "
+          f"p95 {percentile(latencies, 95) * 1000:.2f} ms   p99 {percentile(latencies, 99) * 1000:.2f} ms")
@@ -0,0 +1,70 @@
+"""Startup cost of the desktop app: import time and time to a drawn login window.
+
+Import time comes from `python -X importtime -c "import inventory"` (cumulative
+microseconds of the top-level import, plus the slowest modules under it).
+Time-to-login-window runs `inventory.py --measure-startup` against a scratch
+database, which prints the seconds from interpreter start of the module to the
+first drawn login screen and quits; it needs a display and is skipped without one.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--top 8] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(top):
+    """(total seconds, [(seconds, module), ...] slowest first) for `import inventory`"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import inventory"],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1e6, name.rstrip()))
+    total = next(t for t, name in modules if name.strip() == "inventory")
+    # Direct children of inventory are nested one level (two spaces) under it
+    children = sorted((m for m in modules if m[1].startswith("   ") and not m[1].startswith("    ")), reverse=True)
+    return total, [(t, name.strip()) for t, name in children[:top]]
+
+def login_window_times(runs):
+    """Seconds to a drawn login window per run, or None without a display"""
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "startup.db")
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "inventory.py", "--db", db, "--measure-startup"],
+                                  cwd=ROOT, capture_output=True, text=True)
+            wall = time.perf_counter() - start
+            if proc.returncode != 0 or "time-to-login-window" not in proc.stdout: return None
+            times.append((float(proc.stdout.split()[-1]), wall))
+    return times
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest imported modules to list")
+    parser.add_argument("--json", action="store_true", help="print results as JSON for tracking across releases")
+    args = parser.parse_args()
+    total, slowest = import_times(args.top)
+    windows = login_window_times(args.runs)
+    result = {"import_inventory_s": total, "slowest_imports": [{"module": m, "seconds": t} for t, m in slowest],
+              "login_window_s": statistics.median(t for t, _ in windows) if windows else None,
+              "login_window_wall_s": statistics.median(w for _, w in windows) if windows else None}
+    if args.json:
+        print(json.dumps(result, indent=2)); sys.exit(0)
+    print(f"import inventory        {total * 1000:8.1f} ms")
+    for t, name in slowest:
+        print(f"  {name:22}{t * 1000:8.1f} ms")
+    if windows is None:
+        print("time-to-login-window    skipped: no display")
+    else:
+        print(f"time-to-login-window    {result['login_window_s'] * 1000:8.1f} ms  (median of {len(windows)})")
+        print(f"  process wall time     {result['login_window_wall_s'] * 1000:8.1f} ms")
@@ -0,0 +1,210 @@
+"""Benchmark suite: the app's core operations on synthetic catalogues, with JSON results.
+
+For each size a fresh database is migrated the way init_database() does it and
+filled from catalogue.py (realistic names and prices, fixed seed). Operations
+run headless through inventory_core - the functions the GUI calls - and the
+product cache that serves the GUI's listings:
+
+    insert, update, delete   one product per commit (add_product, update_product, delete_product)
+    search                   first page for broad, brand, prefix, exact-name and missing terms
+    sort                     first and next keyset page per sortable column, from SQLite and the cache
+    totals                   the trigger-maintained row and a full recompute
+    export, import           the whole catalogue to CSV, and that CSV into an empty database
+
+--gui also drives load_products, sort_treeview, search_product and update_totals
+through a real Tk window, timed by the app's instrumentation. It needs a display
+and is skipped without one; on a server run it under xvfb-run.
+
+Timings are the median and p95 of --repeat runs (bulk operations: --bulk-repeat).
+--json FILE saves the results with the commit and Python/SQLite versions;
+--compare BASELINE.json prints the change against an earlier run and exits 1
+if any median got slower by more than --threshold.
+
+Usage: python benchmarks/bench_suite.py [--sizes 10000 100000 1000000] [--repeat 20]
+                                        [--json FILE] [--compare FILE] [--gui]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import inventory_core as core
+import product_cache
+import catalogue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_TERMS = {"broad": "rice", "brand": "peak", "prefix": "semo", "exact": "Royal Stallion Parboiled Rice 5kg", "missing": "zzzz"}
+GUI_SORTS = [("Price", True), ("Name", False), ("Last Updated", True)]
+GUI_SETTLE_SECONDS = 30         # give up waiting for the window to go idle after this long
+
+def measure(fn, repeat, setup=None):
+    """Median, p95 and fastest of repeat timed calls of fn(); setup() runs untimed before each"""
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter(); fn(); times.append(time.perf_counter() - start)
+    times.sort()
+    return {"median_ms": times[len(times) // 2] * 1000, "p95_ms": times[min(int(len(times) * 0.95), len(times) - 1)] * 1000,
+            "min_ms": times[0] * 1000, "runs": repeat}
+
+def throughput(result, rows):
+    return dict(result, rows_per_s=rows / max(result["median_ms"] / 1000, 1e-9))
+
+# --- Headless operations ---
+def run_size(size, args, tmp):
+    """{operation: timing} for a catalogue of size products"""
+    path = os.path.join(tmp, f"suite-{size}.db")
+    conn = database.connect(path); fts_enabled = database.initialize(conn)
+    results = {"populate": throughput(measure(lambda: catalogue.populate(conn, size, args.seed), 1), size)}
+    rng = random.Random(args.seed)
+    ids = [r[0] for r in conn.execute("SELECT id FROM products")]
+
+    names = (f"Bench Product {i}" for i in range(10 ** 9))
+    results["insert"] = measure(lambda: core.add_product(conn, next(names), "1500", "10"), args.repeat)
+    results["update"] = measure(lambda: core.update_product(conn, rng.choice(ids), "Bench Update", "2500", str(rng.randint(0, 500))), args.repeat)
+    doomed = iter(rng.sample(ids, args.repeat))
+    results["delete"] = measure(lambda: core.delete_product(conn, next(doomed)), args.repeat)
+
+    for kind, term in SEARCH_TERMS.items():
+        results[f"search {kind}"] = measure(lambda: core.fetch_page(conn, core.search_view(conn, term, fts_enabled)), args.repeat)
+
+    cache = product_cache.ProductCache()
+    results["cache load"] = measure(lambda: cache.load(conn), args.bulk_repeat)
+    for field in core.SORT_EXPRESSIONS:
+        v = core.sorted_view(core.make_view(), field, desc=True)
+        key = core.row_key(core.fetch_page(conn, v)[-1])
+        results[f"sort {field}"] = measure(lambda: core.fetch_page(conn, v), args.repeat)
+        results[f"sort {field} next page"] = measure(lambda: core.fetch_page(conn, v, before=key), args.repeat)
+        cache.order(field)   # built once, then kept up to date; its cost is part of the cache load
+        results[f"sort {field} (cache)"] = measure(lambda: cache.fetch_page(v), args.repeat)
+    results["filter name (cache)"] = measure(lambda: cache.fetch_page(core.search_view(conn, "rice", False)), args.repeat)
+
+    results["totals"] = measure(lambda: core.read_totals(conn), args.repeat)
+    results["totals full scan"] = measure(lambda: core.compute_totals(conn), args.repeat)
+
+    count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    export_file = os.path.join(tmp, f"export-{size}.csv")
+    results["export"] = throughput(measure(lambda: core.write_products_csv(path, export_file), args.bulk_repeat), count)
+    import_db = os.path.join(tmp, f"import-{size}.db")
+    def empty_database():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(import_db + suffix): os.remove(import_db + suffix)
+        dest = database.connect(import_db); database.initialize(dest); dest.close()
+    results["import"] = throughput(measure(lambda: core.import_products_csv(import_db, export_file), args.bulk_repeat, empty_database), count)
+    conn.close()
+    if args.gui:
+        gui = run_gui(path, args.repeat)
+        if gui is None: print("  gui: skipped, no display", file=sys.stderr)
+        else: results.update(gui)
+    return results
+
+# --- GUI operations ---
+def run_gui(path, repeat):
+    """Tk-thread timings of the GUI paths from inventory.py's instrumentation, or None without a display"""
+    if sys.platform not in ("win32", "darwin") and not os.environ.get("DISPLAY"): return None
+    import inventory
+    import instrumentation
+    instrumentation.install(); instrumentation.reset(); instrumentation.enable()
+    try:
+        inventory.init_database(path)
+        inventory.load_ui_modules()
+        inventory.root = inventory.tb.Window(title="Optiedge benchmark", themename="litera")
+        inventory.style = inventory.tb.Style(theme="litera"); inventory.setup_styles()
+        inventory.login_frame = inventory.tk.Frame(inventory.root); inventory.inventory_frame = inventory.tk.Frame(inventory.root)
+        inventory.show_inventory()   # builds the screen and loads the product cache on the query worker
+        settle(inventory)
+        instrumentation.reset()
+        for i in range(repeat):
+            inventory.load_products(); settle(inventory)
+            col, desc = GUI_SORTS[i % len(GUI_SORTS)]
+            inventory.sort_treeview(col, desc); settle(inventory)
+            inventory.search_entry.delete(0, "end"); inventory.search_entry.insert(0, list(SEARCH_TERMS.values())[i % len(SEARCH_TERMS)])
+            inventory.search_product(); settle(inventory)
+            inventory.update_totals(); settle(inventory)
+        operations = instrumentation.snapshot()["operations"]
+        results = {}
+        for op in ("load_products", "sort_treeview", "search_product", "update_totals"):
+            for metric, summary in operations.get(op, {}).get("timings", {}).items():
+                results[f"gui {op} {metric}"] = {"median_ms": summary["p50_ms"], "p95_ms": summary["p95_ms"],
+                                                 "min_ms": None, "runs": summary["count"]}
+        inventory.root.destroy()
+        return results
+    finally:
+        instrumentation.disable()
+        database.connection_factory = sqlite3.Connection
+        if inventory.pool: inventory.pool.close_all()
+
+def settle(inventory):
+    """Run the Tk event loop until queued queries and redraws have finished"""
+    deadline = time.perf_counter() + GUI_SETTLE_SECONDS
+    while inventory.queries_in_flight or inventory.pending_redraws or not inventory.products.loaded:
+        if time.perf_counter() > deadline: raise RuntimeError("the window did not go idle")
+        inventory.root.update(); time.sleep(0.001)
+    inventory.root.update()
+
+# --- Reporting ---
+def metadata(args):
+    def git(*cmd):
+        try: return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError): return None
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "platform": platform.platform(), "seed": args.seed,
+            "repeat": args.repeat, "bulk_repeat": args.bulk_repeat}
+
+def print_results(size, results):
+    print(f"\n{size:,} products")
+    print(f"  {'operation':32}{'median ms':>12}{'p95 ms':>12}")
+    for name, r in results.items():
+        extra = f"   {r['rows_per_s']:,.0f} rows/s" if "rows_per_s" in r else ""
+        print(f"  {name:32}{r['median_ms']:12.3f}{r['p95_ms']:12.3f}{extra}")
+
+def compare(report, baseline, threshold):
+    """Print every median against the baseline's; returns how many got slower than threshold allows"""
+    print(f"\nAgainst {baseline['meta'].get('commit')} ({baseline['meta'].get('created')}), threshold {threshold:.0%}")
+    regressions = 0
+    for size, results in report["sizes"].items():
+        for name, r in results.items():
+            old = baseline["sizes"].get(size, {}).get(name)
+            if not old: continue
+            change = r["median_ms"] / max(old["median_ms"], 1e-9) - 1
+            slower = change > threshold
+            regressions += slower
+            if slower or abs(change) > threshold:
+                print(f"  {'SLOWER' if slower else 'faster':7}{int(size):>10,}  {name:32}{old['median_ms']:10.3f} -> {r['median_ms']:.3f} ms ({change:+.0%})")
+    print(f"  {regressions} regression(s)")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per operation (default: %(default)s)")
+    parser.add_argument("--bulk-repeat", type=int, default=3, help="runs of cache load, export and import (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON to FILE ('-' for stdout)")
+    parser.add_argument("--compare", metavar="FILE", help="compare with the JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.20, help="slowdown counted as a regression (default: %(default)s)")
+    parser.add_argument("--gui", action="store_true", help="also time the Tk paths (needs a display)")
+    args = parser.parse_args()
+
+    report = {"meta": metadata(args), "sizes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            report["sizes"][str(size)] = results = run_size(size, args, tmp)
+            if args.json != "-": print_results(size, results)
+    if args.json == "-": print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)
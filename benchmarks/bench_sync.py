@@ -0,0 +1,62 @@
+"""Incremental changeset sync against copying the whole database, as the number of changes grows.
+
+Two terminals start from the same catalogue (the second got it through a first,
+full sync). Then one of them edits --changes products, and bringing the other up
+to date is timed two ways: sync.sync() with the peer's file, and a full copy of
+the database with sqlite3's backup API (the best a file copy can do while the
+app has it open). Changeset sizes are the compact JSON a service peer would be sent.
+
+Usage: python benchmarks/bench_sync.py [--rows 100000] [--changes 10 100 1000 10000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import inventory_core as core
+import sync
+import catalogue
+
+def timed(fn):
+    start = time.perf_counter(); result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+def full_copy(conn, path):
+    dest = database.connect(path)
+    conn.backup(dest); dest.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--changes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ("till-1.db", "till-2.db", "copy.db")]
+        conn = database.connect(paths[0]); database.initialize(conn)
+        catalogue.populate(conn, args.rows, args.seed)
+        peer = sync.FilePeer(paths[1], create=True)
+        first, _ = timed(lambda: sync.sync(conn, peer))
+        size = os.path.getsize(paths[0])
+        print(f"{args.rows:,} products, {size / 1e6:.1f} MB; first sync (everything) {first:.0f} ms")
+        print(f"  {'changes':>8}{'sync ms':>12}{'changeset KB':>14}{'full copy ms':>14}{'copy MB':>10}")
+
+        rng = random.Random(args.seed)
+        ids = [r[0] for r in conn.execute("SELECT id FROM products")]
+        for n in args.changes:
+            for pid in rng.sample(ids, min(n, len(ids))):
+                conn.execute("UPDATE products SET quantity = ?, updated_at = ? WHERE id = ?", (rng.randint(0, 500), core.timestamp(), pid))
+            conn.commit()
+            changes = sync.changeset(conn, sync.received_version(peer.conn, sync.site_id(conn)))
+            kb = len(json.dumps(changes, separators=(",", ":"))) / 1000
+            incremental, _ = timed(lambda: sync.sync(conn, peer))
+            copy, _ = timed(lambda: full_copy(conn, paths[2]))
+            print(f"  {n:>8,}{incremental:12.1f}{kb:14.1f}{copy:14.1f}{os.path.getsize(paths[2]) / 1e6:10.1f}")
+            os.remove(paths[2])
+        peer.close(); conn.close()
@@ -0,0 +1,118 @@
+"""Synthetic, reproducible product catalogues for benchmarks.
+
+Names look like a Nigerian retail price list - "Golden Penny Semovita 2kg",
+"Peak Evaporated Milk 170g x 24" - with the skew of real ones: within each
+category a few brands and staples account for most rows (Zipf-weighted), so
+searches for "rice" or "peak" match thousands of products while a full name
+matches only a few. Prices are log-normal around each category's median and
+scale with pack size, quantities are mostly small with some zero stock, and
+updated_at leans towards recent dates. The same seed always gives the same
+catalogue.
+
+    python benchmarks/catalogue.py --rows 100000 --db big.db      # a database to open in the app
+    python benchmarks/catalogue.py --rows 100000 --csv big.csv    # a price list for 📥 Import
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+
+# (brands, products, pack sizes, median ₦ for the first size, share of the catalogue); lists run most to least common
+CATEGORIES = [
+    (["Mama Gold", "Royal Stallion", "Caprice", "Mama's Pride", "Falcon", "Ofada Gold", "Local"],
+     ["Rice", "Parboiled Rice", "Basmati Rice", "Ofada Rice"], ["1kg", "5kg", "10kg", "25kg", "50kg"], 1800, 10),
+    (["Golden Penny", "Dangote", "Honeywell", "Mama Gold", "Ayoola", "Local"],
+     ["Semovita", "Semolina", "Wheat Meal", "Garri", "Poundo Yam", "Yam Flour"], ["1kg", "2kg", "5kg", "10kg"], 1500, 9),
+    (["Indomie", "Golden Penny", "Dangote", "Honeywell", "Chikki", "Mimee", "Power"],
+     ["Spaghetti", "Noodles", "Chicken Noodles", "Macaroni", "Pepper Soup Noodles"], ["70g", "120g", "500g", "70g x 40"], 350, 9),
+    (["Peak", "Dano", "Three Crowns", "Cowbell", "Milo", "Bournvita", "Nestlé", "Loya"],
+     ["Evaporated Milk", "Milk Powder", "Full Cream Milk", "Chocolate Drink", "Malted Drink"], ["170g", "400g", "900g", "170g x 24"], 900, 8),
+    (["Power", "Mamador", "King's", "Devon King's", "Golden Terra", "Local"],
+     ["Vegetable Oil", "Palm Oil", "Groundnut Oil", "Olive Oil"], ["75cl", "1.5L", "3L", "5L", "25L"], 2200, 7),
+    (["Gino", "Knorr", "Maggi", "Tasty Tom", "Onga", "Dangote", "Ducros"],
+     ["Tomato Paste", "Seasoning Cubes", "Tomato Mix", "Salt", "Curry Powder", "Thyme"], ["70g", "210g", "400g", "50 cubes"], 300, 8),
+    (["Dangote", "St. Louis", "Lipton", "Nescafé", "Kellogg's", "Checkers", "Golden Morn"],
+     ["Sugar", "Tea", "Cube Sugar", "Custard", "Cornflakes", "Coffee"], ["250g", "500g", "1kg", "2kg"], 1100, 7),
+    (["Eva", "Nestlé Pure Life", "Coca-Cola", "Pepsi", "Fanta", "Maltina", "Chi", "Five Alive", "Bigi", "Predator"],
+     ["Bottled Water", "Soft Drink", "Malt Drink", "Table Water", "Fruit Juice", "Energy Drink"], ["35cl", "50cl", "75cl", "1L", "50cl x 12"], 250, 9),
+    (["Ariel", "Omo", "Hypo", "Morning Fresh", "Dettol", "Closeup", "Pepsodent", "Joy", "Nivea", "Viva"],
+     ["Detergent", "Bar Soap", "Dishwashing Liquid", "Toothpaste", "Bleach", "Body Lotion"], ["100g", "500g", "900g", "2kg", "4L"], 700, 9),
+    (["McVities", "Beloxxi", "Oxford", "Yale", "Digestive", "Tom Tom", "Local"],
+     ["Biscuits", "Cabin Biscuits", "Chin Chin", "Plantain Chips", "Groundnuts", "Sweets"], ["30g", "100g", "250g", "30g x 24"], 200, 8),
+    (["Molfix", "Pampers", "Always", "Lady Care", "Rose", "Cerelac"],
+     ["Diapers", "Sanitary Pads", "Tissue Paper", "Baby Wipes", "Baby Food"], ["Small", "Medium", "Large", "Jumbo Pack"], 2500, 6),
+    (["Tiger", "Duracell", "Philips", "Oraimo", "Binatone", "Local"],
+     ["Batteries", "Light Bulb", "Extension Box", "Phone Charger", "Candles"], ["Single", "Pack of 4", "Pack of 10"], 1200, 5),
+]
+ZIPF_EXPONENT = 1.1             # brand and product popularity: rank r is chosen in proportion to 1 / r^1.1
+PRICE_SIGMA = 0.35              # spread of prices around a category's median (log-normal)
+SIZE_STEP = 2.2                 # each larger pack size costs about this much more
+ZERO_STOCK_SHARE = 0.05
+MEAN_QUANTITY = 60
+HISTORY_DAYS = 365
+EPOCH = datetime(2024, 12, 31, 18, 0, 0)    # fixed, so updated_at does not depend on the day of the run
+GENERATE_BATCH = 10000
+
+def zipf_weights(n, exponent=ZIPF_EXPONENT):
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+def products(count, seed=42):
+    """Yield count (name, price, quantity, updated_at) rows, the same ones for the same seed"""
+    rng = random.Random(seed)
+    category_weights = list(accumulate(c[4] for c in CATEGORIES))
+    brand_weights = [zipf_weights(len(c[0])) for c in CATEGORIES]
+    item_weights = [zipf_weights(len(c[1])) for c in CATEGORIES]
+    for start in range(0, count, GENERATE_BATCH):
+        n = min(GENERATE_BATCH, count - start)
+        for category in rng.choices(range(len(CATEGORIES)), cum_weights=category_weights, k=n):
+            brands, items, sizes, median, _ = CATEGORIES[category]
+            brand = rng.choices(brands, cum_weights=brand_weights[category])[0]
+            item = rng.choices(items, cum_weights=item_weights[category])[0]
+            size = rng.randrange(len(sizes))
+            name = f"{brand} {item} {sizes[size]}"
+            if rng.random() < 0.2: name += f" ({rng.choice(('New', 'Promo', 'Carton', 'Imported', 'Family Pack'))})"
+            price = median * SIZE_STEP ** size * math.exp(rng.gauss(0, PRICE_SIGMA))
+            price = round(price, -1) if price >= 1000 else round(price, 2)
+            quantity = 0 if rng.random() < ZERO_STOCK_SHARE else int(rng.expovariate(1 / MEAN_QUANTITY)) + 1
+            # Squaring a uniform draw puts more edits in the recent past
+            updated = EPOCH - timedelta(seconds=int(HISTORY_DAYS * 86400 * rng.random() ** 2))
+            yield name, price, quantity, updated.strftime("%Y-%m-%d %H:%M:%S")
+
+def populate(conn, count, seed=42):
+    """Insert a catalogue of count products into an initialized database and commit"""
+    rows = products(count, seed)
+    while True:
+        batch = [row for _, row in zip(range(GENERATE_BATCH), rows)]
+        if not batch: break
+        conn.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)", batch)
+    conn.commit()
+
+def write_csv(filename, count, seed=42):
+    """Write a catalogue as a Name,Price,Quantity price list, the format import_products_csv reads"""
+    import csv
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Price", "Quantity"])
+        writer.writerows((name, price, quantity) for name, price, quantity, _ in products(count, seed))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="add the products to this database (created and migrated if needed)")
+    parser.add_argument("--csv", help="write the products to this CSV file")
+    args = parser.parse_args()
+    if not args.db and not args.csv: parser.error("give --db and/or --csv")
+    if args.db:
+        conn = database.connect(args.db); database.initialize(conn)
+        populate(conn, args.rows, args.seed); conn.close()
+        print(f"Added {args.rows:,} products to {args.db}")
+    if args.csv:
+        write_csv(args.csv, args.rows, args.seed)
+        print(f"Wrote {args.rows:,} products to {args.csv}")
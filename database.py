@@ -0,0 +1,497 @@
+"""Data access for Optiedge Inventory: tuned connections, a per-thread pool and schema migrations."""
+import sqlite3
+import threading
+
+DB_PATH = "optiedge_inventory.db"
+
+# Applied to every connection. WAL lets readers run while a writer commits, and with
+# WAL synchronous=NORMAL is still safe against corruption (only the last commits can
+# be lost on power failure), while avoiding an fsync per transaction.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -32000,          # KiB (negative) -> 32 MB page cache per connection
+    "mmap_size": 268435456,        # memory-map up to 256 MB of the file for reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,          # ms to wait on a locked database instead of failing
+    "foreign_keys": "ON",
+}
+STATEMENT_CACHE_SIZE = 256         # prepared statements kept per connection, keyed by SQL text
+connection_factory = sqlite3.Connection   # instrumentation.install() swaps in a timing subclass
+
+# --- Connections ---
+def connect(path=DB_PATH, check_same_thread=True):
+    """Open a tuned connection to path"""
+    conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=check_same_thread,
+                           factory=connection_factory)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+class ConnectionPool:
+    """Hands every thread its own connection to one database file.
+
+    SQLite connections must not be shared between threads, so a worker asks
+    the pool for its connection instead of using the UI's. Connections are
+    opened on first use and live until release() (for that thread) or
+    close_all()."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def get(self):
+        """The calling thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close_all() may close it from another thread
+            conn = self._local.conn = connect(self.path, check_same_thread=False)
+            with self._lock: self._connections[threading.get_ident()] = conn
+        return conn
+
+    def release(self):
+        """Close the calling thread's connection, e.g. when a worker thread finishes"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock: self._connections.pop(threading.get_ident(), None)
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections = list(self._connections.values()); self._connections.clear()
+        for conn in connections:
+            conn.close()
+
+# --- Schema ---
+def _execute_script(conn, script):
+    """Run a multi-statement script inside the current transaction.
+
+    executescript() would commit first, so a failing migration could not roll back whole."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement); statement = ""
+
+def _base_schema(conn):
+    _execute_script(conn, """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        price REAL NOT NULL,
+        quantity INTEGER NOT NULL,
+        updated_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL
+    );
+    """)
+    # Create default admin
+    if not conn.execute("SELECT 1 FROM users WHERE username=?", ("admin",)).fetchone():
+        conn.execute("INSERT INTO users (username,password) VALUES (?,?)", ("admin", "admin123"))
+
+def _inventory_totals(conn):
+    # Running totals maintained by triggers, so reading them never scans products
+    _execute_script(conn, """
+    CREATE TABLE IF NOT EXISTS inventory_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_quantity INTEGER NOT NULL DEFAULT 0,
+        total_value REAL NOT NULL DEFAULT 0
+    );
+    CREATE TRIGGER IF NOT EXISTS inventory_totals_ai AFTER INSERT ON products BEGIN
+        UPDATE inventory_totals SET total_quantity = total_quantity + new.quantity,
+                                    total_value = total_value + new.price * new.quantity WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS inventory_totals_ad AFTER DELETE ON products BEGIN
+        UPDATE inventory_totals SET total_quantity = total_quantity - old.quantity,
+                                    total_value = total_value - old.price * old.quantity WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS inventory_totals_au AFTER UPDATE OF price, quantity ON products BEGIN
+        UPDATE inventory_totals SET total_quantity = total_quantity - old.quantity + new.quantity,
+                                    total_value = total_value - old.price * old.quantity + new.price * new.quantity
+        WHERE id = 1;
+    END;
+    """)
+    # Seed from the rows that predate the totals table
+    conn.execute("""INSERT OR REPLACE INTO inventory_totals (id, total_quantity, total_value)
+                    SELECT 1, COALESCE(SUM(quantity), 0), COALESCE(SUM(price * quantity), 0) FROM products""")
+
+def _product_indexes(conn):
+    _execute_script(conn, """
+    CREATE INDEX IF NOT EXISTS idx_products_name ON products(name COLLATE NOCASE);
+    CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);
+    """)
+
+def _sort_indexes(conn):
+    # One per sortable column, matching inventory_core.SORT_EXPRESSIONS; the table's
+    # rowid rides along in every index, so (sort value, id) keyset pages are index seeks
+    _execute_script(conn, """
+    CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
+    CREATE INDEX IF NOT EXISTS idx_products_quantity ON products(quantity);
+    CREATE INDEX IF NOT EXISTS idx_products_total_value ON products(price * quantity);
+    CREATE INDEX IF NOT EXISTS idx_products_updated_key ON products(IFNULL(updated_at, ''));
+    """)
+
+def _stock_ledger(conn):
+    # Append-only history of every stock change, written by triggers so the GUI,
+    # imports and the service all feed it. ledger_context lets a writer label the
+    # movements its next statements cause (e.g. 'sale'); unlabelled inserts are
+    # receipts and everything else an adjustment. Snapshots materialize stock at a
+    # point in time so history queries only replay movements since the last one.
+    _execute_script(conn, """
+    CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        quantity_change INTEGER NOT NULL,
+        price REAL NOT NULL,
+        created_at TEXT NOT NULL,
+        note TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_stock_movements_created ON stock_movements(created_at);
+    CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_id, id);
+    CREATE TABLE IF NOT EXISTS ledger_context (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        kind TEXT,
+        note TEXT
+    );
+    INSERT OR IGNORE INTO ledger_context (id) VALUES (1);
+    CREATE TABLE IF NOT EXISTS stock_snapshots (
+        id INTEGER PRIMARY KEY,
+        taken_at TEXT NOT NULL,
+        last_movement_id INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_stock_snapshots_taken ON stock_snapshots(taken_at);
+    CREATE TABLE IF NOT EXISTS stock_snapshot_items (
+        snapshot_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL,
+        PRIMARY KEY (snapshot_id, product_id)
+    ) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS stock_movements_ai AFTER INSERT ON products BEGIN
+        INSERT INTO stock_movements (product_id, kind, quantity_change, price, created_at, note)
+        SELECT new.id, COALESCE(kind, 'receipt'), new.quantity, new.price,
+               COALESCE(new.updated_at, datetime('now', 'localtime')), note
+        FROM ledger_context WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS stock_movements_au AFTER UPDATE OF price, quantity ON products
+    WHEN new.quantity IS NOT old.quantity OR new.price IS NOT old.price BEGIN
+        INSERT INTO stock_movements (product_id, kind, quantity_change, price, created_at, note)
+        SELECT new.id, COALESCE(kind, 'adjustment'), new.quantity - old.quantity, new.price,
+               COALESCE(new.updated_at, datetime('now', 'localtime')), note
+        FROM ledger_context WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS stock_movements_ad AFTER DELETE ON products BEGIN
+        INSERT INTO stock_movements (product_id, kind, quantity_change, price, created_at, note)
+        SELECT old.id, COALESCE(kind, 'adjustment'), -old.quantity, old.price, datetime('now', 'localtime'), note
+        FROM ledger_context WHERE id = 1;
+    END;
+    """)
+    # History starts here: an opening snapshot of the stock that predates the ledger
+    snapshot = conn.execute("INSERT INTO stock_snapshots (taken_at, last_movement_id) VALUES (datetime('now', 'localtime'), 0)").lastrowid
+    conn.execute("""INSERT INTO stock_snapshot_items (snapshot_id, product_id, quantity, price)
+                    SELECT ?, id, quantity, price FROM products""", (snapshot,))
+
+def _change_tracking(conn):
+    # Every insert, update or delete stamps the product with the next version (deleted
+    # products keep theirs as a tombstone), so an in-memory copy can ask for exactly
+    # what changed since the highest version it has seen (see product_cache.py).
+    _execute_script(conn, """
+    CREATE TABLE IF NOT EXISTS product_changes (
+        product_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_product_changes_version ON product_changes(version);
+    CREATE TRIGGER IF NOT EXISTS product_changes_ai AFTER INSERT ON products BEGIN
+        INSERT INTO product_changes (product_id, version)
+        SELECT new.id, COALESCE(MAX(version), 0) + 1 FROM product_changes WHERE true
+        ON CONFLICT(product_id) DO UPDATE SET version = excluded.version;
+    END;
+    CREATE TRIGGER IF NOT EXISTS product_changes_au AFTER UPDATE ON products BEGIN
+        INSERT INTO product_changes (product_id, version)
+        SELECT new.id, COALESCE(MAX(version), 0) + 1 FROM product_changes WHERE true
+        ON CONFLICT(product_id) DO UPDATE SET version = excluded.version;
+    END;
+    CREATE TRIGGER IF NOT EXISTS product_changes_ad AFTER DELETE ON products BEGIN
+        INSERT INTO product_changes (product_id, version)
+        SELECT old.id, COALESCE(MAX(version), 0) + 1 FROM product_changes WHERE true
+        ON CONFLICT(product_id) DO UPDATE SET version = excluded.version;
+    END;
+    """)
+
+DEFAULT_LOCATION = 1
+
+def _locations(conn):
+    # Stock per location. location_stock is a partition of products per location with
+    # the same column names (id is the product id), so listing queries run unchanged
+    # against "location_stock AS products" and each sort order has a (location_id, ...)
+    # index. Triggers keep name/price/updated_at mirrored from products, products.quantity
+    # equal to the sum over locations, and location_totals current for rollups.
+    # Writes that only set products.quantity (imports, the service, the ledger) land on
+    # ledger_context.location_id, or the default location when that is NULL
+    # (reductions are spread over the stocked locations since migration 10).
+    if "location_id" not in [r[1] for r in conn.execute("PRAGMA table_info(ledger_context)")]:
+        conn.execute("ALTER TABLE ledger_context ADD COLUMN location_id INTEGER")
+    _execute_script(conn, f"""
+    CREATE TABLE IF NOT EXISTS locations (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE
+    );
+    INSERT OR IGNORE INTO locations (id, name) VALUES ({DEFAULT_LOCATION}, 'Main Store');
+    CREATE TABLE IF NOT EXISTS location_stock (
+        location_id INTEGER NOT NULL REFERENCES locations(id),
+        id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        price REAL NOT NULL,
+        quantity INTEGER NOT NULL,
+        updated_at TEXT,
+        PRIMARY KEY (location_id, id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_location_stock_product ON location_stock(id, quantity);
+    CREATE INDEX IF NOT EXISTS idx_location_stock_name ON location_stock(location_id, name COLLATE NOCASE, id);
+    CREATE INDEX IF NOT EXISTS idx_location_stock_price ON location_stock(location_id, price, id);
+    CREATE INDEX IF NOT EXISTS idx_location_stock_quantity ON location_stock(location_id, quantity, id);
+    CREATE INDEX IF NOT EXISTS idx_location_stock_total_value ON location_stock(location_id, price * quantity, id);
+    CREATE INDEX IF NOT EXISTS idx_location_stock_updated_key ON location_stock(location_id, IFNULL(updated_at, ''), id);
+    CREATE TABLE IF NOT EXISTS location_totals (
+        location_id INTEGER PRIMARY KEY,
+        products INTEGER NOT NULL DEFAULT 0,
+        total_quantity INTEGER NOT NULL DEFAULT 0,
+        total_value REAL NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO location_stock (location_id, id, name, price, quantity, updated_at)
+        SELECT {DEFAULT_LOCATION}, id, name, price, quantity, updated_at FROM products;
+    INSERT OR REPLACE INTO location_totals (location_id, products, total_quantity, total_value)
+        SELECT location_id, COUNT(*), SUM(quantity), SUM(price * quantity) FROM location_stock GROUP BY location_id;
+
+    CREATE TRIGGER IF NOT EXISTS location_stock_ai AFTER INSERT ON location_stock BEGIN
+        INSERT INTO location_totals (location_id, products, total_quantity, total_value)
+        VALUES (new.location_id, 1, new.quantity, new.price * new.quantity)
+        ON CONFLICT(location_id) DO UPDATE SET products = products + 1, total_quantity = total_quantity + excluded.total_quantity,
+                                               total_value = total_value + excluded.total_value;
+        UPDATE products SET quantity = (SELECT SUM(quantity) FROM location_stock WHERE id = new.id)
+        WHERE id = new.id AND quantity IS NOT (SELECT SUM(quantity) FROM location_stock WHERE id = new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS location_stock_au AFTER UPDATE OF price, quantity ON location_stock BEGIN
+        UPDATE location_totals SET total_quantity = total_quantity - old.quantity + new.quantity,
+                                   total_value = total_value - old.price * old.quantity + new.price * new.quantity
+        WHERE location_id = new.location_id;
+    END;
+    -- Only on quantity changes: a mirrored price update runs while products.quantity may be mid-update
+    CREATE TRIGGER IF NOT EXISTS location_stock_quantity AFTER UPDATE OF quantity ON location_stock
+    WHEN new.quantity IS NOT old.quantity BEGIN
+        UPDATE products SET quantity = (SELECT SUM(quantity) FROM location_stock WHERE id = new.id)
+        WHERE id = new.id AND quantity IS NOT (SELECT SUM(quantity) FROM location_stock WHERE id = new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS location_stock_ad AFTER DELETE ON location_stock BEGIN
+        UPDATE location_totals SET products = products - 1, total_quantity = total_quantity - old.quantity,
+                                   total_value = total_value - old.price * old.quantity
+        WHERE location_id = old.location_id;
+        UPDATE products SET quantity = (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = old.id)
+        WHERE id = old.id AND quantity IS NOT (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = old.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS products_location_ai AFTER INSERT ON products BEGIN
+        INSERT INTO location_stock (location_id, id, name, price, quantity, updated_at)
+        SELECT COALESCE(location_id, {DEFAULT_LOCATION}), new.id, new.name, new.price, new.quantity, new.updated_at
+        FROM ledger_context WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_location_au AFTER UPDATE OF name, price, updated_at ON products
+    WHEN new.name IS NOT old.name OR new.price IS NOT old.price OR new.updated_at IS NOT old.updated_at BEGIN
+        UPDATE location_stock SET name = new.name, price = new.price, updated_at = new.updated_at WHERE id = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_location_quantity AFTER UPDATE OF quantity ON products
+    WHEN new.quantity IS NOT (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = new.id) BEGIN
+        INSERT INTO location_stock (location_id, id, name, price, quantity, updated_at)
+        SELECT COALESCE(location_id, {DEFAULT_LOCATION}), new.id, new.name, new.price,
+               new.quantity - (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = new.id), new.updated_at
+        FROM ledger_context WHERE id = 1
+        ON CONFLICT(location_id, id) DO UPDATE SET quantity = quantity + excluded.quantity;
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_location_ad AFTER DELETE ON products BEGIN
+        DELETE FROM location_stock WHERE id = old.id;
+    END;
+    """)
+
+def _sync_log(conn):
+    # Identity for syncing between terminals (see sync.py). Product ids are local, so
+    # every product also gets a uid, "<site id>:<id where it was created>", that travels
+    # with it; deleting a product keeps the uid row as a tombstone with its deleted_at.
+    # sync_peers records the highest change version applied from each peer, so the next
+    # exchange starts from there. Changes themselves come from product_changes.
+    _execute_script(conn, """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        site_id TEXT NOT NULL
+    );
+    INSERT OR IGNORE INTO sync_state (id, site_id) VALUES (1, lower(hex(randomblob(8))));
+    CREATE TABLE IF NOT EXISTS sync_rows (
+        uid TEXT PRIMARY KEY,
+        product_id INTEGER UNIQUE,
+        deleted_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS sync_peers (
+        site_id TEXT PRIMARY KEY,
+        received_version INTEGER NOT NULL,
+        synced_at TEXT
+    );
+    INSERT OR IGNORE INTO sync_rows (uid, product_id)
+        SELECT (SELECT site_id FROM sync_state) || ':' || id, id FROM products;
+    CREATE TRIGGER IF NOT EXISTS sync_rows_ai AFTER INSERT ON products BEGIN
+        INSERT INTO sync_rows (uid, product_id) SELECT site_id || ':' || new.id, new.id FROM sync_state;
+    END;
+    CREATE TRIGGER IF NOT EXISTS sync_rows_ad AFTER DELETE ON products BEGIN
+        UPDATE sync_rows SET deleted_at = datetime('now', 'localtime') WHERE product_id = old.id;
+    END;
+    """)
+
+def _maintenance_log(conn):
+    # One row per maintenance task run (see maintenance.py): what ran, how long it took
+    # and what it did to the file size. The scheduler reads the last run of each task.
+    _execute_script(conn, """
+    CREATE TABLE IF NOT EXISTS maintenance_log (
+        id INTEGER PRIMARY KEY,
+        task TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        size_before INTEGER NOT NULL,
+        size_after INTEGER NOT NULL,
+        ok INTEGER NOT NULL,
+        result TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_maintenance_log_task ON maintenance_log(task, started_at);
+    """)
+
+def _location_drawdown(conn):
+    # A write that only sets products.quantity used to put the whole difference on
+    # ledger_context.location_id (or the default location), which went negative when
+    # the stock sold sat elsewhere. Increases still land there; reductions now come
+    # from that location first and then from the locations holding the most, and only
+    # what no location holds (a negative total) stays on it. While the trigger spreads
+    # a reduction, ledger_context.location_sync stops location_stock_quantity from
+    # writing the part-way sums back to products (and into the ledger).
+    if "location_sync" not in [r[1] for r in conn.execute("PRAGMA table_info(ledger_context)")]:
+        conn.execute("ALTER TABLE ledger_context ADD COLUMN location_sync INTEGER")
+    _execute_script(conn, f"""
+    DROP TRIGGER IF EXISTS location_stock_quantity;
+    CREATE TRIGGER location_stock_quantity AFTER UPDATE OF quantity ON location_stock
+    WHEN new.quantity IS NOT old.quantity AND (SELECT location_sync FROM ledger_context WHERE id = 1) IS NULL BEGIN
+        UPDATE products SET quantity = (SELECT SUM(quantity) FROM location_stock WHERE id = new.id)
+        WHERE id = new.id AND quantity IS NOT (SELECT SUM(quantity) FROM location_stock WHERE id = new.id);
+    END;
+    DROP TRIGGER IF EXISTS products_location_quantity;
+    CREATE TRIGGER products_location_quantity AFTER UPDATE OF quantity ON products
+    WHEN new.quantity IS NOT (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = new.id) BEGIN
+        UPDATE ledger_context SET location_sync = 1 WHERE id = 1;
+        UPDATE location_stock SET quantity = quantity - taken.amount
+        FROM (SELECT location_id, MIN(quantity, MAX(0, needed - (running - quantity))) AS amount
+              FROM (SELECT s.location_id, s.quantity,
+                           (SELECT SUM(quantity) FROM location_stock WHERE id = new.id) - new.quantity AS needed,
+                           SUM(s.quantity) OVER (ORDER BY s.location_id IS NOT COALESCE(c.location_id, {DEFAULT_LOCATION}),
+                                                          s.quantity DESC, s.location_id ROWS UNBOUNDED PRECEDING) AS running
+                    FROM location_stock s, ledger_context c WHERE s.id = new.id AND s.quantity > 0 AND c.id = 1)) AS taken
+        WHERE location_stock.id = new.id AND location_stock.location_id = taken.location_id AND taken.amount > 0;
+        INSERT INTO location_stock (location_id, id, name, price, quantity, updated_at)
+        SELECT COALESCE(location_id, {DEFAULT_LOCATION}), new.id, new.name, new.price,
+               new.quantity - (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = new.id), new.updated_at
+        FROM ledger_context WHERE id = 1
+          AND new.quantity IS NOT (SELECT COALESCE(SUM(quantity), 0) FROM location_stock WHERE id = new.id)
+        ON CONFLICT(location_id, id) DO UPDATE SET quantity = quantity + excluded.quantity;
+        UPDATE ledger_context SET location_sync = NULL WHERE id = 1;
+    END;
+    """)
+
+def _sync_revive(conn):
+    # A product inserted with the id of a deleted one (an import of an export that
+    # still lists it) hit its tombstone's UNIQUE product_id. It now revives the
+    # tombstone under its uid, so peers see the product come back.
+    _execute_script(conn, """
+    DROP TRIGGER IF EXISTS sync_rows_ai;
+    CREATE TRIGGER sync_rows_ai AFTER INSERT ON products BEGIN
+        INSERT INTO sync_rows (uid, product_id) SELECT site_id || ':' || new.id, new.id FROM sync_state WHERE true
+        ON CONFLICT(product_id) DO UPDATE SET deleted_at = NULL;
+    END;
+    """)
+
+# Applied in order; PRAGMA user_version records the last one a database has seen.
+# Steps use IF NOT EXISTS so databases created before versioning upgrade cleanly.
+MIGRATIONS = [
+    (1, _base_schema),
+    (2, _inventory_totals),
+    (3, _product_indexes),
+    (4, _sort_indexes),
+    (5, _stock_ledger),
+    (6, _change_tracking),
+    (7, _locations),
+    (8, _sync_log),
+    (9, _maintenance_log),
+    (10, _location_drawdown),
+    (11, _sync_revive),
+]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Bring the schema up to date, each migration in its own transaction; returns the new version"""
+    version = schema_version(conn)
+    if not conn.execute("SELECT 1 FROM sqlite_master").fetchone():
+        # A new file: give it incremental auto_vacuum before the first table (maintenance.vacuum
+        # converts older files). Not a per-connection pragma, since on an existing file
+        # setting it waits for the write lock. Under WAL the empty file already has its
+        # header page, so the setting only sticks after a VACUUM, which costs nothing here.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL"); conn.execute("VACUUM")
+    for target, step in MIGRATIONS:
+        if target <= version: continue
+        try:
+            conn.execute("BEGIN")
+            step(conn)
+            conn.execute(f"PRAGMA user_version={target}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        version = target
+    return version
+
+def ensure_search_index(conn):
+    """Create the FTS5 index over product names, kept in sync by triggers; False if FTS5 is unavailable.
+
+    Not a versioned migration, because it depends on the SQLite build: a database
+    opened without FTS5 should still gain the index once opened by a build that has it."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name='products_fts'").fetchone()
+    try:
+        conn.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+        END;
+        """)
+        # Index rows that predate the search index
+        if not exists: conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        conn.commit()
+        return True
+    except sqlite3.OperationalError:
+        conn.rollback()
+        return False
+
+def initialize(conn):
+    """Migrate the schema and set up the search index; returns whether FTS5 search is available"""
+    migrate(conn)
+    return ensure_search_index(conn)
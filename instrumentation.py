@@ -0,0 +1,307 @@
+"""Opt-in instrumentation: per-operation latency histograms, counters and a cProfile toggle.
+
+An operation is a named user action (load_products, search_product, ...). While one
+is active on a thread, everything measured there is charged to it: its own time,
+the SQL statements and rows fetched by instrumented connections, Treeview inserts
+and deletes. Work handed to another thread carries the name with it (see
+current()). Timings go into log-bucketed histograms, so p50/p95/p99 cost a few
+hundred counters per metric however long the app runs.
+
+Nothing is recorded until enable(). Disabled, operation() returns a shared no-op
+context and count()/observe() return at once, so call sites cost a flag test.
+SQL timing needs install() before connections are opened, as it swaps in the
+connection class used by database.connect.
+"""
+import functools
+import math
+import sqlite3
+import sys
+import threading
+import time
+
+import database
+
+BUCKETS_PER_DOUBLING = 8        # histogram buckets are ~9% wide, which bounds percentile error
+MIN_SECONDS = 1e-6              # everything faster shares the first bucket
+UI_METRICS = ("ui", "apply")    # time spent on the Tk thread, checked against stall_warn_ms
+PROFILE_TOP = 30                # functions listed in a cProfile summary
+ITER_BATCH = 256                # rows an instrumented cursor reads at a time while iterated
+
+enabled = False
+stall_warn_ms = None            # when set, print every Tk-thread stall at least this long
+timings = {}                    # (operation, metric) -> Histogram
+counters = {}                   # (operation, metric) -> count
+statements = {}                 # SQL text -> Histogram of execute + fetch time
+_statement_text = {}            # SQL as written -> whitespace-collapsed text it is reported under
+_lock = threading.Lock()
+_local = threading.local()
+_profiler = None
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets, self.count, self.total, self.max = {}, 0, 0.0, 0.0
+
+    def add(self, seconds):
+        bucket = 0 if seconds <= MIN_SECONDS else int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_DOUBLING) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1; self.total += seconds
+        if seconds > self.max: self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1), capped at the maximum"""
+        rank, seen = q * self.count, 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank: return min(MIN_SECONDS * 2 ** (bucket / BUCKETS_PER_DOUBLING), self.max)
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "total_ms": self.total * 1000, "mean_ms": self.total / max(self.count, 1) * 1000,
+                "p50_ms": self.percentile(0.50) * 1000, "p95_ms": self.percentile(0.95) * 1000,
+                "p99_ms": self.percentile(0.99) * 1000, "max_ms": self.max * 1000}
+
+# --- Recording ---
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    with _lock:
+        timings.clear(); counters.clear(); statements.clear()
+
+def current():
+    """The operation active on this thread, or None"""
+    return getattr(_local, "op", None)
+
+def observe(metric, seconds, op=None):
+    """Add a duration to metric of op (default: the current operation)"""
+    if not enabled: return
+    op = op or current() or "other"
+    with _lock:
+        histogram = timings.get((op, metric))
+        if histogram is None: histogram = timings[op, metric] = Histogram()
+        histogram.add(seconds)
+    if stall_warn_ms is not None and metric in UI_METRICS and seconds * 1000 >= stall_warn_ms:
+        print(f"stall: {op} blocked the UI for {seconds * 1000:.0f} ms", file=sys.stderr)
+
+def count(metric, n=1, op=None):
+    if not enabled: return
+    op = op or current() or "other"
+    with _lock: counters[op, metric] = counters.get((op, metric), 0) + n
+
+class _Operation:
+    __slots__ = ("name", "metric", "outer", "start")
+
+    def __init__(self, name, metric):
+        self.name, self.metric = name, metric
+
+    def __enter__(self):
+        self.outer = current(); _local.op = self.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _local.op = self.outer
+        observe(self.metric, elapsed, self.name)
+
+class _NoOperation:
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+_NO_OPERATION = _NoOperation()
+
+def operation(name, metric="ui"):
+    """Context manager charging what runs inside to operation name, its duration to metric"""
+    if not enabled or not name: return _NO_OPERATION
+    return _Operation(name, metric)
+
+def timed(name, metric="ui"):
+    """Decorator form of operation()"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if not enabled: return fn(*args, **kwargs)
+            with _Operation(name, metric): return fn(*args, **kwargs)
+        return run
+    return wrap
+
+# --- SQL ---
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times each statement from execute() until its rows are read, and counts the rows"""
+    _sql = _op = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def execute(self, sql, parameters=()):
+        if not enabled: return super().execute(sql, parameters)
+        self._finish()
+        start = time.perf_counter()
+        try: return super().execute(sql, parameters)
+        finally: self._begin(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, parameters):
+        if not enabled: return super().executemany(sql, parameters)
+        self._finish()
+        start = time.perf_counter()
+        try: return super().executemany(sql, parameters)
+        finally: self._begin(sql, time.perf_counter() - start); self._finish()
+
+    def fetchone(self):
+        if self._sql is None: return super().fetchone()
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(1 if row is not None else 0, time.perf_counter() - start, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        if self._sql is None: return super().fetchmany(self.arraysize if size is None else size)
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), time.perf_counter() - start, not rows)
+        return rows
+
+    def fetchall(self):
+        if self._sql is None: return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), time.perf_counter() - start, True)
+        return rows
+
+    def __iter__(self):
+        # Untimed cursors iterate at C speed; timed ones read in batches, as timing every row would dominate
+        return self if self._sql is None else self._timed_rows()
+
+    def _timed_rows(self):
+        while True:
+            rows = self.fetchmany(ITER_BATCH)
+            if not rows: return
+            yield from rows
+
+    def close(self):
+        self._finish(); super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _begin(self, sql, seconds):
+        text = _statement_text.get(sql)
+        if text is None: text = _statement_text[sql] = " ".join(sql.split())
+        self._sql, self._op, self._elapsed, self._rows = text, current() or "other", seconds, 0
+
+    def _fetched(self, rows, seconds, done):
+        self._elapsed += seconds; self._rows += rows
+        if done: self._finish()
+
+    def _finish(self):
+        """Record the statement in progress, if any"""
+        if self._sql is None: return
+        sql, self._sql = self._sql, None
+        observe("sql", self._elapsed, self._op)
+        if not enabled: return
+        count("statements", op=self._op)
+        if self._rows: count("rows fetched", self._rows, self._op)
+        with _lock:
+            histogram = statements.get(sql)
+            if histogram is None: histogram = statements[sql] = Histogram()
+            histogram.add(self._elapsed)
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3's own execute() makes a plain cursor, so while paused these cost one call
+    def execute(self, sql, parameters=()):
+        if not enabled: return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        if not enabled: return super().executemany(sql, parameters)
+        return self.cursor().executemany(sql, parameters)
+
+def install():
+    """Open every later database.connect() connection with SQL timing"""
+    database.connection_factory = InstrumentedConnection
+
+def installed():
+    return database.connection_factory is InstrumentedConnection
+
+# --- Profiling ---
+def profiling():
+    return _profiler is not None
+
+def start_profile():
+    """Start cProfile on the calling thread (for the app, the Tk thread)"""
+    global _profiler
+    if _profiler is not None: return
+    import cProfile
+    _profiler = cProfile.Profile(); _profiler.enable()
+
+def stop_profile(filename=None):
+    """Stop cProfile; saves the raw stats to filename if given and returns the top functions as text"""
+    global _profiler
+    if _profiler is None: return ""
+    import io
+    import pstats
+    profiler, _profiler = _profiler, None
+    profiler.disable()
+    if filename: profiler.dump_stats(filename)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+# --- Output ---
+def rows():
+    """(operation, metric, histogram summary or None, count) per recorded metric, sorted by operation"""
+    with _lock:
+        items = [(op, metric, h.summary(), h.count) for (op, metric), h in timings.items()]
+        items += [(op, metric, None, n) for (op, metric), n in counters.items()]
+    return sorted(items, key=lambda item: (item[0], item[2] is None, item[1]))
+
+def snapshot():
+    """Everything recorded, as JSON-able dicts"""
+    operations = {}
+    for op, metric, summary, n in rows():
+        entry = operations.setdefault(op, {"timings": {}, "counts": {}})
+        if summary is None: entry["counts"][metric] = n
+        else: entry["timings"][metric] = summary
+    with _lock: sql = {text: h.summary() for text, h in statements.items()}
+    return {"operations": operations, "statements": dict(sorted(sql.items(), key=lambda item: -item[1]["total_ms"]))}
+
+def dump(filename):
+    """Write snapshot() to filename: CSV if it ends in .csv, else JSON"""
+    data = snapshot()
+    if not filename.lower().endswith(".csv"):
+        import json
+        with open(filename, "w", encoding="utf-8") as f: json.dump(data, f, indent=2)
+        return
+    import csv
+    fields = ["count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["scope", "name", "metric"] + fields)
+        for op, entry in data["operations"].items():
+            for metric, summary in entry["timings"].items():
+                writer.writerow(["operation", op, metric] + [round(summary[k], 3) for k in fields])
+            for metric, n in entry["counts"].items():
+                writer.writerow(["operation", op, metric, n] + [""] * (len(fields) - 1))
+        for text, summary in data["statements"].items():
+            writer.writerow(["statement", text, "sql"] + [round(summary[k], 3) for k in fields])
+
+def format_report(metrics=None):
+    """Text table of the timings (only metrics, if given) and counters"""
+    lines = [f"{'Operation':24}{'metric':>14}{'count':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'total ms':>10}"]
+    for op, metric, summary, n in rows():
+        if metrics and metric not in metrics: continue
+        if summary is None:
+            lines.append(f"{op:24}{metric:>14}{n:8,}")
+        else:
+            lines.append(f"{op:24}{metric:>14}{n:8,}{summary['p50_ms']:9.1f}{summary['p95_ms']:9.1f}"
+                         f"{summary['p99_ms']:9.1f}{summary['max_ms']:9.1f}{summary['total_ms']:10.0f}")
+    return "\n".join(lines)
@@ -1,51 +1,75 @@
-import sqlite3
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import csv
-import ttkbootstrap as tb
+import time
+STARTED = time.perf_counter()
 from datetime import datetime
 import sys
+import argparse
+import os
+import queue
+import threading
+import atexit
+import sqlite3
+
+import database
+import instrumentation
+import inventory_core as core
+import ledger
+import maintenance
+import product_cache
+
+# GUI toolkits, imported by load_ui_modules() so headless commands never load Tk
+tk = ttk = messagebox = filedialog = tb = None
 
 # --- Global Variables ---
 conn = cursor = root = style = None
+db_path = pool = None
 login_frame = inventory_frame = None
 username_entry = password_entry = None
 name_entry = price_entry = qty_entry = search_entry = None
-tree = None
+tree = tree_scroll = None
+location_box = None
 total_qty_label = total_value_label = None
 clock_label = None
 form = None
 
+# --- Paged Product View ---
+PAGE_SIZE = 100            # rows fetched per keyset page
+MAX_WINDOW_PAGES = 3       # pages kept in the Treeview (visible page + prefetch margin)
+PREFETCH_MARGIN = 0.15     # fetch a neighbouring page when the scrollbar is this close to an edge
+view = core.make_view()   # current listing (see inventory_core.make_view)
+window_pages = []          # [{"first": key, "last": key, "iids": [...]}] in display order
+row_keys = {}              # Treeview iid -> (sort value, id) for rows in the window
+window_at_start = window_at_end = True
+page_fetch_pending = False
+window_cached = False      # whether the window's pages come from the product cache (else SQLite)
+products = product_cache.ProductCache()   # in-memory copy serving listings, name filters and totals
+cache_reload_pending = False   # a fresh product cache is being loaded on the query worker
+
+# --- Search ---
+SEARCH_DEBOUNCE_MS = 150   # wait for a pause in typing before searching
+fts_enabled = False        # False when this SQLite build lacks FTS5; search falls back to LIKE
+search_after_id = None
+last_search_text = ""
+
+# --- Sorting ---
+# Treeview column -> inventory_core.SORT_EXPRESSIONS field
+SORT_FIELDS = {"ID": "id", "Name": "name", "Price": "price", "Quantity": "quantity",
+               "Total Value": "total_value", "Last Updated": "updated_at"}
+sorted_by = None           # (column, descending) picked from a heading, or None for the view's own order
+current_location = None    # location id the listing, totals and export are limited to, or None for all of them
+location_ids = {}          # location combobox entry -> id
+ALL_LOCATIONS = "All locations"
+column_titles = {}
+
 # --- Database Functions ---
-def init_database():
-    global conn, cursor
-    conn = sqlite3.connect("optiedge_inventory.db")
-    cursor = conn.cursor()
-
-    # Create products table if it doesn't exist
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        price REAL NOT NULL,
-        quantity INTEGER NOT NULL,
-        updated_at TEXT
-    )""")
-
-    # Create users table if it doesn't exist
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL
-    )""")
-
-    # Create default admin
-    cursor.execute("SELECT * FROM users WHERE username=?", ("admin",))
-    if not cursor.fetchone():
-        cursor.execute("INSERT INTO users (username,password) VALUES (?,?)", ("admin","admin123"))
-        conn.commit()
-    
+DB_PATH = database.DB_PATH
+
+def init_database(path=DB_PATH):
+    global conn, cursor, db_path, pool, fts_enabled
+    # One connection per thread: the UI uses this one, workers get their own from the pool
+    pool = database.ConnectionPool(path); db_path = path
+    conn = pool.get(); cursor = conn.cursor()
+    fts_enabled = database.initialize(conn)
+    ledger.maybe_snapshot(conn)
     return conn, cursor
 
 # --- Input Validation ---
@@ -150,18 +174,6 @@ def on_paste(event):
         pass
     return True
 
-# --- Validation ---
-def validate_product_input(name, price_str, qty_str):
-    if not name: raise ValueError("Name is required")
-    if not price_str or not qty_str: raise ValueError("Price and Quantity required")
-    try:
-        price = float(price_str.replace('₦','').replace(',',''))
-        qty = int(qty_str.replace(',',''))
-        if price<0 or qty<0: raise ValueError
-        return price, qty
-    except:
-        raise ValueError("Invalid Price or Quantity")
-
 # --- Styles ---
 def setup_styles():
     style.configure("success.TButton", font=("Segoe UI",11,"bold"), padding=(20,10))
@@ -179,13 +191,29 @@ def create_modern_button(parent, text, style_name, command, width=15):
     return ttk.Button(parent, text=text, style=f"{style_name}.TButton", command=command, width=width)
 
 # --- Login ---
-def setup_login_frame():
-    import os
+LOGO_PATH = "logo.png"
+LOGO_SIZE = (150, 150)
+LOGO_CACHE_PATH = "logo_150.png"   # pre-scaled copy, regenerated when logo.png changes
+logo_photo = None
+
+def load_logo():
+    """The login logo as a PhotoImage, scaled once and cached in memory and on disk"""
+    global logo_photo
+    if logo_photo is not None or not os.path.exists(LOGO_PATH): return logo_photo
+    if os.path.exists(LOGO_CACHE_PATH) and os.path.getmtime(LOGO_CACHE_PATH) >= os.path.getmtime(LOGO_PATH):
+        # Tk reads PNG itself, so a warm start never imports PIL
+        logo_photo = tk.PhotoImage(file=LOGO_CACHE_PATH)
+        return logo_photo
     from PIL import Image, ImageTk
+    img = Image.open(LOGO_PATH).resize(LOGO_SIZE, Image.Resampling.LANCZOS)
+    try: img.save(LOGO_CACHE_PATH)
+    except OSError: pass  # read-only install: keep the in-memory copy only
+    logo_photo = ImageTk.PhotoImage(img)
+    return logo_photo
 
+def setup_login_frame():
+    """Build the login screen (once; logout just shows it again)"""
     global username_entry, password_entry
-    for w in login_frame.winfo_children(): 
-        w.destroy()
 
     login_frame.pack(fill="both", expand=True)
     login_frame.configure(bg="#F8FAFC")
@@ -197,14 +225,9 @@ def setup_login_frame():
     content_frame.pack(padx=30, pady=30)
 
     # --- Logo ---
-    logo_path = "logo.png"
-    if os.path.exists(logo_path):
-        img = Image.open(logo_path)
-        img = img.resize((150, 150), Image.Resampling.LANCZOS)
-        logo_photo = ImageTk.PhotoImage(img)
+    if load_logo():
         logo_label = tk.Label(content_frame, image=logo_photo, bg="#F8FAFC")
         logo_label.pack(pady=(0, 15))
-        center_frame.logo_photo = logo_photo  # keep reference
 
     # --- Title ---
     tk.Label(content_frame, text="OPTIEDGE INVENTORY", font=("Segoe UI", 22, "bold"), bg="#F8FAFC").pack(pady=(0,5))
@@ -228,12 +251,14 @@ def setup_login_frame():
     password_entry.bind("<Return>", lambda e: login())
     username_entry.focus()
 
+def show_login():
+    password_entry.delete(0, tk.END)
+    login_frame.pack(fill="both", expand=True); username_entry.focus()
 
 def login():
     username=username_entry.get().strip(); password=password_entry.get().strip()
     if not username or not password: messagebox.showwarning("Warning","Enter username & password"); return
-    cursor.execute("SELECT * FROM users WHERE username=? AND password=?",(username,password))
-    if cursor.fetchone(): show_inventory()
+    if core.check_login(conn,username,password): show_inventory()
     else: messagebox.showerror("Login Failed","❌ Invalid username or password")
 
 # --- Inventory Frame ---
@@ -243,6 +268,7 @@ def create_inventory_frame():
     tk.Label(header,text="🏪 OPTIEDGE INVENTORY SYSTEM", font=("Segoe UI",18,"bold"), bg="#1F2937",fg="white").pack(side="left", padx=20)
     clock_label = tk.Label(header,font=("Segoe UI",11),bg="#1F2937",fg="#D1D5DB"); clock_label.pack(side="left",expand=True)
     ttk.Button(header,text="🚪 Logout", style="danger.TButton", command=logout).pack(side="right", padx=10)
+    ttk.Button(header,text="💾 Backup", style="info.TButton", command=backup_database).pack(side="right")
     create_form_frame(); create_search_frame(); create_table_frame(); create_totals_frame()
 
 def create_form_frame():
@@ -259,8 +285,9 @@ def create_form_frame():
     form.columnconfigure(1,weight=1)
     btn_frame=ttk.Frame(form); btn_frame.grid(row=0,column=2,rowspan=3,padx=20)
     for txt,style_name,cmd in [("➕ Add","success",add_product),("✏️ Update","info",update_product),
-                               ("🗑️ Delete","danger",delete_product),("🧹 Clear","warning",clear_entries),
-                               ("📤 Export","primary",export_csv)]:
+                               ("🗑️ Delete","danger",delete_product),("🧹 Clear","warning",lambda: clear_entries(search=True)),
+                               ("📥 Import","primary",import_csv),("📤 Export","primary",export_csv),
+                               ("📊 Reports","secondary",show_reports)]:
         create_modern_button(btn_frame,txt,style_name,cmd).pack(pady=5,fill="x")
     
     # ✅ FIXED INPUT VALIDATION - Using key bindings instead of validatecommand
@@ -279,11 +306,14 @@ def create_search_frame():
     global search_entry
     search_frame=ttk.LabelFrame(inventory_frame,text="🔍 Search Products",padding=15,style="Modern.TLabelframe"); search_frame.pack(fill="x", padx=25, pady=10)
     search_entry = ttk.Entry(search_frame, style="Modern.TEntry"); search_entry.pack(side="left",fill="x",expand=True,padx=5, ipady=5)
+    search_entry.bind("<KeyRelease>", schedule_search)
+    search_entry.bind("<Return>", lambda e: search_product())
     create_modern_button(search_frame,"Search","primary",search_product).pack(side="left", padx=5)
     create_modern_button(search_frame,"Refresh","info",load_products).pack(side="left")
+    create_location_picker(search_frame)
 
 def create_table_frame():
-    global tree
+    global tree, tree_scroll
     table_frame=ttk.LabelFrame(inventory_frame,text="📋 Product Inventory",padding=15,style="Modern.TLabelframe"); table_frame.pack(fill="both", padx=25, pady=10, expand=True)
     columns=("ID","Name","Price","Quantity","Total Value","Last Updated")  # Added new column
     tree=ttk.Treeview(table_frame,columns=columns,show="headings",style="Custom.Treeview",height=15)
@@ -297,9 +327,11 @@ def create_table_frame():
     }
     for col in columns: 
         tree.heading(col,text=col_config[col]["text"],command=lambda c=col: sort_treeview(c,False))
+        column_titles[col]=col_config[col]["text"]
         tree.column(col, **{k:v for k,v in col_config[col].items() if k!="text"})
     tree.grid(row=0,column=0,sticky="nsew")
-    ttk.Scrollbar(table_frame,orient="vertical",command=tree.yview).grid(row=0,column=1,sticky="ns")
+    tree_scroll=ttk.Scrollbar(table_frame,orient="vertical",command=tree.yview); tree_scroll.grid(row=0,column=1,sticky="ns")
+    tree.configure(yscrollcommand=on_tree_scroll)
     ttk.Scrollbar(table_frame,orient="horizontal",command=tree.xview).grid(row=1,column=0,sticky="ew")
     table_frame.columnconfigure(0,weight=1); table_frame.rowconfigure(0,weight=1)
     tree.tag_configure('evenrow', background='#F8FAFC'); tree.tag_configure('oddrow', background='#FFFFFF')
@@ -313,77 +345,480 @@ def create_totals_frame():
     tk.Label(totals_frame,text="💵 OVERALL TOTAL VALUE",bg="#10B981",fg="white", font=("Segoe UI",12,"bold")).pack(side="left",expand=True,fill="both", padx=5, pady=10)
     total_value_label=tk.Label(totals_frame,text="₦0.00",bg="#10B981",fg="white", font=("Segoe UI",24,"bold")); total_value_label.pack(side="left",expand=True,fill="both")
 
+# --- Instrumentation ---
+STALL_WARN_MS = 100        # with --report-stalls, log any main-thread stall at least this long
+DIAGNOSTICS_REFRESH_MS = 1000
+diagnostics_window = None
+timed = instrumentation.timed
+
+def measure_render():
+    """Charge the time until Tk has redrawn the window to the current operation"""
+    if not instrumentation.enabled: return
+    op, start = instrumentation.current(), time.perf_counter()
+    def rendered():
+        root.update_idletasks()   # redisplays queued behind this callback
+        instrumentation.observe("render", time.perf_counter() - start, op)
+    root.after_idle(rendered)
+
+def print_stall_report():
+    print("Main-thread time per operation", file=sys.stderr)
+    print(instrumentation.format_report(instrumentation.UI_METRICS), file=sys.stderr)
+
+# --- Query Worker ---
+QUERY_POLL_MS = 15         # how often the UI collects finished queries while any are in flight
+query_requests = queue.Queue()
+query_results = queue.Queue()
+query_generations = {}     # supersede key -> generation of its newest request
+queries_in_flight = 0
+query_thread = None
+
+def submit_query(work, on_result, supersede=None, action="query"):
+    """Run work(conn) on the query worker; on_result(result, error) then runs on the Tk thread.
+
+    The worker has a connection of its own and runs requests in order, so a read
+    queued after a write sees it. Requests sharing a supersede key replace each
+    other: a stale one is skipped if it has not started, and its result dropped if it has.
+    With instrumentation on, both halves are charged to the operation that submitted
+    the work (or to action when none is active)."""
+    global query_thread, queries_in_flight
+    generation = None
+    if supersede is not None: generation = query_generations[supersede] = query_generations.get(supersede, 0) + 1
+    if query_thread is None:
+        query_thread = threading.Thread(target=query_worker, name="query worker", daemon=True); query_thread.start()
+    query_requests.put((supersede, generation, work, on_result, instrumentation.current() or action))
+    queries_in_flight += 1
+    if queries_in_flight == 1: root.after(QUERY_POLL_MS, poll_query_results)
+
+def is_current(supersede, generation):
+    return supersede is None or query_generations.get(supersede) == generation
+
+def query_worker():
+    db = pool.get()
+    while True:
+        supersede, generation, work, on_result, action = query_requests.get()
+        result = error = None
+        if is_current(supersede, generation):
+            try:
+                with instrumentation.operation(action, "worker"): result = work(db)
+            except Exception as e:
+                if db.in_transaction: db.rollback()
+                error = e
+        query_results.put((supersede, generation, on_result, result, error, action))
+
+def poll_query_results():
+    """Apply every query that finished since the last poll; their redraws are coalesced"""
+    global queries_in_flight
+    try:
+        while True:
+            supersede, generation, on_result, result, error, action = query_results.get_nowait()
+            queries_in_flight -= 1
+            if is_current(supersede, generation):
+                with instrumentation.operation(action, "apply"): on_result(result, error)
+    except queue.Empty:
+        pass
+    if queries_in_flight: root.after(QUERY_POLL_MS, poll_query_results)
+
+# --- Coalesced Redraws ---
+pending_redraws = set()    # "stripes", "totals", "headings" to refresh at the next idle
+
+def schedule_redraw(*parts):
+    """Queue window-wide refreshes; however many actions ask, each runs once per idle"""
+    first = not pending_redraws
+    pending_redraws.update(parts)
+    if first: root.after_idle(flush_redraws)
+
+@timed("redraw")
+def flush_redraws():
+    parts = set(pending_redraws); pending_redraws.clear()
+    if "stripes" in parts: restripe_rows()
+    if "headings" in parts: update_sort_headings()
+    if "totals" in parts: update_totals()
+
 # --- Core Functions ---
+@timed("add_product")
 def add_product():
-    try:
-        name=name_entry.get().strip(); price_str=price_entry.get().strip(); qty_str=qty_entry.get().strip()
-        price, qty = validate_product_input(name, price_str, qty_str)
-        # Add current date/time
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
-                      (name,price,qty,current_time)); conn.commit()
-        load_products(); clear_entries(); messagebox.showinfo("Success","✅ Product added successfully")
-    except Exception as e: messagebox.showerror("Error",str(e))
+    name=name_entry.get().strip(); price_str=price_entry.get().strip(); qty_str=qty_entry.get().strip()
+    try: core.validate_product_input(name, price_str, qty_str)
+    except ValueError as e: messagebox.showerror("Error",str(e)); return
+
+    def added(pid, error):
+        if error: messagebox.showerror("Error",str(error)); return
+        refresh_product_row(pid); schedule_redraw("totals")
+        clear_entries(); root.after_idle(messagebox.showinfo, "Success", "✅ Product added successfully")
+    location = current_location
+    submit_query(lambda db: core.add_product(db, name, price_str, qty_str, location=location), added, action="product added")
 
+@timed("update_product")
 def update_product():
     sel = tree.selection()
     if not sel: messagebox.showwarning("Warning", "Select a product"); return
     item_id = tree.item(sel[0])['values'][0]
-    try:
-        name=name_entry.get().strip(); price_str=price_entry.get().strip(); qty_str=qty_entry.get().strip()
-        price, qty = validate_product_input(name, price_str, qty_str)
-        # Add current date/time
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute("UPDATE products SET name=?, price=?, quantity=?, updated_at=? WHERE id=?",
-                       (name, price, qty, current_time, item_id)); conn.commit()
-        load_products(); clear_entries(); messagebox.showinfo("Success","✅ Product updated successfully")
-    except Exception as e: messagebox.showerror("Error",f"Failed to update product: {str(e)}"); conn.rollback()
+    name=name_entry.get().strip(); price_str=price_entry.get().strip(); qty_str=qty_entry.get().strip()
+    try: qty = core.validate_product_input(name, price_str, qty_str)[1]
+    except ValueError as e: messagebox.showerror("Error",f"Failed to update product: {str(e)}"); return
+
+    def updated(found, error):
+        if error: messagebox.showerror("Error",f"Failed to update product: {str(error)}"); return
+        if not found:
+            remove_product_row(item_id); schedule_redraw("totals"); clear_entries()
+            messagebox.showwarning("Warning", "This product no longer exists - it may have been deleted on another terminal"); return
+        refresh_product_row(item_id); schedule_redraw("totals")
+        clear_entries(); root.after_idle(messagebox.showinfo, "Success", "✅ Product updated successfully")
+    location = current_location
+
+    def update(db):
+        if location is None and core.stocked_locations(db, item_id) > 1:
+            product = core.get_product(db, item_id)
+            if product and product[3] != qty:
+                raise ValueError("It is stocked at several locations - pick the location whose quantity changed")
+        return core.update_product(db, item_id, name, price_str, qty_str, location=location)
+    submit_query(update, updated, action="product updated")
 
+@timed("delete_product")
 def delete_product():
     sel=tree.selection(); 
     if not sel: messagebox.showwarning("Warning","Select product"); return
     vals=tree.item(sel[0])["values"]
-    if messagebox.askyesno("Confirm Delete",f"Delete '{vals[1]}'?"):
-        cursor.execute("DELETE FROM products WHERE id=?",(vals[0],)); conn.commit(); load_products(); clear_entries()
+    where = " from every location" if current_location is not None else ""
+    if messagebox.askyesno("Confirm Delete",f"Delete '{vals[1]}'{where}?"):
+        def deleted(found, error):
+            if error: messagebox.showerror("Error",f"Failed to delete product: {error}"); return
+            remove_product_row(vals[0]); schedule_redraw("totals"); clear_entries()
+        submit_query(lambda db: core.delete_product(db, vals[0]), deleted, action="product deleted")
 
-def clear_entries(): 
-    for e in [name_entry,price_entry,qty_entry,search_entry]: e.delete(0,tk.END)
+def clear_entries(search=False):
+    """Empty the product fields; search=True also empties the search box and lists every product again.
 
+    Adds and updates patch their row into the current (possibly filtered) list, so
+    they leave the search text alone to keep it matching what the table shows."""
+    for e in [name_entry,price_entry,qty_entry]: e.delete(0,tk.END)
+    if search and search_entry.get(): search_entry.delete(0,tk.END); search_product()
+
+@timed("search_product")
 def search_product():
-    text=search_entry.get().strip().lower()
-    for i in tree.get_children(): tree.delete(i)
-    cursor.execute("SELECT * FROM products WHERE LOWER(name) LIKE ?",(f"%{text}%",))
-    rows=cursor.fetchall()
-    if not rows: tree.insert("", "end", values=("", "No matching products","","","")); return
-    for i,row in enumerate(rows):
-        val=(row[0],row[1],f"₦{row[2]:,.2f}",f"{row[3]:,}",f"₦{row[2]*row[3]:,.2f}")
-        tree.insert("", "end", values=val, tags=('evenrow' if i%2==0 else 'oddrow',))
-    update_totals()
+    global search_after_id, last_search_text
+    if search_after_id: root.after_cancel(search_after_id); search_after_id = None
+    text=search_entry.get().strip(); last_search_text = text
+    if not text: load_products(); return
+    # Keep a column sort the user picked; otherwise results come in relevance order
+    sort = sorted_by
+
+    def search(db):
+        results = located(core.search_view(db, text, fts_enabled))
+        if sort: results = core.sorted_view(results, SORT_FIELDS[sort[0]], desc=sort[1])
+        return results
+
+    if not fts_enabled:
+        set_product_view(search(None)); return  # LIKE filters are answered by the product cache
+    # A newer search, sort or reload supersedes this one while it is still running
+    submit_query(lambda db: (lambda results: (results, core.fetch_page(db, results, limit=PAGE_SIZE)))(search(db)),
+                 lambda result, error: show_view_result(result and result + (False,), error), supersede="view", action="search results")
+
+def schedule_search(event=None):
+    """Search as you type: restart the debounce timer on every keystroke"""
+    global search_after_id
+    if event is not None and event.keysym == "Escape":
+        search_entry.delete(0, tk.END)
+    # Ignore keys that did not change the text (arrows, Shift, the Return that already searched)
+    if search_entry.get().strip() == last_search_text: return
+    if search_after_id: root.after_cancel(search_after_id)
+    search_after_id = root.after(SEARCH_DEBOUNCE_MS, search_product)
 
+@timed("load_products")
 def load_products():
-    for i in tree.get_children(): tree.delete(i)
-    cursor.execute("SELECT * FROM products ORDER BY id DESC"); rows=cursor.fetchall()
-    for i,row in enumerate(rows):
-        # Handle the updated_at column (index 4)
-        updated_at = row[4] if len(row) > 4 else "N/A"
-        # Format the date nicely if it exists
-        if updated_at and updated_at != "N/A":
-            try:
-                # Convert database timestamp to readable format
-                dt = datetime.strptime(updated_at, "%Y-%m-%d %H:%M:%S")
-                formatted_date = dt.strftime("%m/%d/%Y %I:%M %p")
-            except:
-                formatted_date = updated_at
+    global sorted_by
+    sorted_by = None
+    set_product_view()
+
+# --- Paged Product View ---
+def format_product_row(row):
+    """Turn a (id, name, price, quantity, updated_at, ...) row into Treeview values"""
+    updated_at = row[4]
+    # Format the date nicely if it exists
+    if updated_at:
+        try:
+            # Convert database timestamp to readable format
+            dt = datetime.strptime(updated_at, "%Y-%m-%d %H:%M:%S")
+            formatted_date = dt.strftime("%m/%d/%Y %I:%M %p")
+        except:
+            formatted_date = updated_at
+    else:
+        formatted_date = "Never"
+    return (row[0],row[1],f"₦{row[2]:,.2f}",f"{row[3]:,}",f"₦{row[2]*row[3]:,.2f}",formatted_date)
+
+def display_values(row):
+    """Treeview values for row, formatted once per product version.
+
+    The memo only applies when row is the cached product itself: a location view's
+    row carries that location's quantity, and a stale cache may lag the SQL row."""
+    if products.row(row[0]) == tuple(row[:5]): return products.display(row[0], format_product_row)
+    return format_product_row(row)
+
+def load_product_cache():
+    """Fill the product cache on the query worker, then swap it in; until then SQLite (or the old cache) serves the views"""
+    global cache_reload_pending
+    if cache_reload_pending: return
+    cache_reload_pending = True
+
+    def build(db):
+        cache = product_cache.ProductCache(); cache.load(db)
+        return cache
+
+    def install(cache, error):
+        global products, cache_reload_pending
+        cache_reload_pending = False
+        if error: return  # Keep paging from SQLite
+        replaced, products = products.loaded, cache
+        refresh_product_cache(); schedule_redraw("totals")
+        # A cached window holds rows of the cache just replaced
+        if replaced and window_cached: set_product_view(view)
+    submit_query(build, install, action="install product cache")
+
+def refresh_product_cache():
+    """Catch the product cache up on the Tk thread when only a few products changed.
+
+    A backlog too large to patch (an import or sync elsewhere) is reloaded on the
+    query worker instead; the stale cache keeps serving until the new one is in."""
+    if cache_reload_pending: return
+    if products.refresh(conn, reload=False) is None: load_product_cache()
+
+def from_cache(v):
+    """Whether view v is paged from the product cache; a window keeps the source it started with"""
+    return window_cached if v is view else products.loaded and products.serves(v)
+
+def fetch_view_page(v, before, after, on_result, supersede=None, action="fetch page"):
+    """Fetch a page of view v: straight from the product cache when it serves v, else on the query worker"""
+    if from_cache(v):
+        # Catching up is one index lookup when nothing changed
+        refresh_product_cache()
+        rows = products.fetch_page(v, before, after, PAGE_SIZE)
+        instrumentation.count("cache rows", len(rows))
+        on_result(rows, None)
+    else:
+        submit_query(lambda db: core.fetch_page(db, v, before, after, PAGE_SIZE), on_result, supersede, action)
+
+def insert_page(rows, index):
+    """Insert a fetched page into the Treeview at index ("end" or 0) and track it"""
+    page = {"first": core.row_key(rows[0]), "last": core.row_key(rows[-1]), "iids": []}
+    position = "end" if index == "end" else index
+    for row in rows:
+        iid = tree.insert("", position, iid=str(row[0]), values=display_values(row))
+        page["iids"].append(iid); row_keys[iid] = core.row_key(row)
+        if position != "end": position += 1
+    instrumentation.count("tree inserts", len(rows))
+    if index == "end": window_pages.append(page)
+    else: window_pages.insert(0, page)
+
+def drop_page(from_end):
+    """Discard the page furthest from the viewport, keeping the view where it is"""
+    page = window_pages.pop() if from_end else window_pages.pop(0)
+    anchor = tree.identify_row(1)
+    live = [iid for iid in page["iids"] if tree.exists(iid)]
+    for iid in live: row_keys.pop(iid, None)
+    if live: tree.delete(*live)
+    instrumentation.count("tree deletes", len(live))
+    if anchor and tree.exists(anchor):
+        children = tree.get_children()
+        tree.yview_moveto(tree.index(anchor) / max(len(children), 1))
+
+def restripe_rows():
+    """Re-apply alternating row colours to the (bounded) visible window"""
+    for i, iid in enumerate(tree.get_children()):
+        tree.item(iid, tags=('evenrow' if i%2==0 else 'oddrow',))
+
+def set_product_view(new_view=None):
+    """Show the first page of new_view (default: all products at the selected location), replacing the current window"""
+    new_view = new_view or located(core.make_view())
+    cached = from_cache(new_view)
+    fetch_view_page(new_view, None, None, lambda rows, error: show_view_result((new_view, rows, cached), error),
+                    supersede="view", action="show view")
+
+def show_view_result(result, error):
+    """Replace the window with the first page of a freshly fetched view"""
+    global view, window_cached, window_at_start, window_at_end, page_fetch_pending
+    if error: messagebox.showerror("Error", f"Could not load products: {error}"); return
+    new_view, rows, cached = result
+    view = new_view; window_cached = products.loaded and products.serves(view)
+    # SQLite and the cache spell some sort keys differently, so a cached window starts from the cache
+    if window_cached and not cached:
+        refresh_product_cache(); rows = products.fetch_page(view, limit=PAGE_SIZE)
+    window_pages.clear(); row_keys.clear(); page_fetch_pending = False
+    children = tree.get_children()
+    tree.delete(*children); instrumentation.count("tree deletes", len(children))
+    window_at_start = True; window_at_end = len(rows) < PAGE_SIZE
+    if rows: insert_page(rows, "end")
+    else: tree.insert("", "end", iid="empty", values=("", "No matching products","","","",""))
+    schedule_redraw("stripes", "headings", "totals"); measure_render()
+
+def on_tree_scroll(first, last):
+    """yscrollcommand for the product tree: update the scrollbar and prefetch pages near the edges"""
+    global page_fetch_pending
+    tree_scroll.set(first, last)
+    if page_fetch_pending or not window_pages: return
+    first, last = float(first), float(last)
+    if last >= 1 - PREFETCH_MARGIN and not window_at_end: direction = "down"
+    elif first <= PREFETCH_MARGIN and not window_at_start: direction = "up"
+    else: return
+    # Defer the fetch: mutating the tree from inside its own scroll callback re-enters it
+    page_fetch_pending = True
+    root.after_idle(lambda: load_adjacent_page(direction))
+
+@timed("load_adjacent_page")
+def load_adjacent_page(direction):
+    """Slide the window one page up or down, dropping the page on the far side"""
+    key = window_pages[-1]["last"] if direction == "down" else window_pages[0]["first"]
+    fetched_view = view
+
+    def slide(rows, error):
+        global page_fetch_pending, window_at_start, window_at_end
+        if fetched_view is not view: return  # The view was replaced while this page was loading
+        page_fetch_pending = False
+        if error: return
+        if direction == "down":
+            if len(rows) < PAGE_SIZE: window_at_end = True
+            if not rows: return
+            insert_page(rows, "end")
+            if len(window_pages) > MAX_WINDOW_PAGES: drop_page(from_end=False); window_at_start = False
         else:
-            formatted_date = "Never"
-            
-        val=(row[0],row[1],f"₦{row[2]:,.2f}",f"{row[3]:,}",f"₦{row[2]*row[3]:,.2f}",formatted_date)
-        tree.insert("", "end", values=val, tags=('evenrow' if i%2==0 else 'oddrow',))
-    update_totals()
+            if len(rows) < PAGE_SIZE: window_at_start = True
+            if not rows: return
+            anchor = tree.identify_row(1)
+            insert_page(rows, 0)
+            if anchor: tree.yview_moveto(tree.index(anchor) / max(len(tree.get_children()), 1))
+            if len(window_pages) > MAX_WINDOW_PAGES: drop_page(from_end=True); window_at_end = False
+        schedule_redraw("stripes"); measure_render()
+
+    if direction == "down": fetch_view_page(view, key, None, slide, action="scroll")
+    else: fetch_view_page(view, None, key, slide, action="scroll")
+
+def refresh_product_row(pid):
+    """Patch a single product into the window after an add or update, without reloading"""
+    fetched_view = view
+    def patch(row, error):
+        if fetched_view is view and not error: patch_product_row(pid, row)
+    if window_cached:
+        refresh_product_cache(); patch(products.fetch_view_row(view, pid), None)
+    else:
+        submit_query(lambda db: core.fetch_view_row(db, fetched_view, pid), patch, action="refresh row")
 
+def patch_product_row(pid, row):
+    iid = str(pid)
+    if tree.exists(iid):
+        if row is not None and core.row_key(row) == row_keys.get(iid):
+            tree.item(iid, values=display_values(row)); return
+        remove_product_row(pid)
+    if row is None: return  # Not part of the current view (e.g. no longer matches the search)
+    key = core.row_key(row)
+    # Find the first windowed row that should follow the new one
+    children = tree.get_children()
+    index = next((i for i, child in enumerate(children)
+                  if child in row_keys and core.key_precedes(view, key, row_keys[child])), None)
+    if index == 0 and not window_at_start: return  # Belongs above the window
+    if index is None and not window_at_end and window_pages: return  # Belongs below the window
+    if tree.exists("empty"): tree.delete("empty")
+    if not window_pages: window_pages.append({"first": key, "last": key, "iids": []})
+    neighbour = children[index] if index is not None else None
+    page = next((p for p in window_pages if neighbour in p["iids"]), window_pages[-1])
+    if index is None: index = "end"
+    tree.insert("", index, iid=iid, values=display_values(row)); instrumentation.count("tree inserts")
+    page["iids"].append(iid); row_keys[iid] = key
+    # Widen the bounds of the page the row joined: once the pages around it are dropped,
+    # an inner page becomes an outer one whose bounds drive the next keyset fetch
+    if core.key_precedes(view, key, page["first"]): page["first"] = key
+    if core.key_precedes(view, page["last"], key): page["last"] = key
+    schedule_redraw("stripes")
+
+def remove_product_row(pid):
+    """Drop a single product from the window after a delete"""
+    iid = str(pid)
+    if not tree.exists(iid): return
+    tree.delete(iid); row_keys.pop(iid, None); instrumentation.count("tree deletes")
+    for page in window_pages:
+        if iid in page["iids"]: page["iids"].remove(iid); break
+    schedule_redraw("stripes")
+
+@timed("update_totals")
 def update_totals():
-    cursor.execute("SELECT SUM(quantity),SUM(price*quantity) FROM products"); r=cursor.fetchone()
-    total_qty_label.config(text=f"{int(r[0] or 0):,}"); total_value_label.config(text=f"₦{float(r[1] or 0):,.2f}")
+    if current_location is not None:
+        # One row of the trigger-maintained per-location rollup
+        location = current_location
+        submit_query(lambda db: core.read_totals(db, location), lambda totals, error: error or show_totals(*totals), action="totals"); return
+    if not products.loaded:
+        # The product cache is still loading: read the trigger-maintained totals off the UI thread
+        submit_query(core.read_totals, lambda totals, error: error or show_totals(*totals), action="totals"); return
+    refresh_product_cache()
+    show_totals(*products.totals())
+
+def show_totals(qty, value):
+    total_qty_label.config(text=f"{qty:,}"); total_value_label.config(text=f"₦{value:,.2f}")
+
+# --- Locations ---
+def located(v):
+    """v limited to the selected location, if one is selected"""
+    return v if current_location is None else core.location_view(v, current_location)
+
+def create_location_picker(parent):
+    global location_box
+    ttk.Label(parent, text="📍", font=("Segoe UI",12)).pack(side="left", padx=(15,2))
+    location_box = ttk.Combobox(parent, state="readonly", width=22); location_box.pack(side="left", padx=5, ipady=3)
+    location_box.bind("<<ComboboxSelected>>", select_location)
+    create_modern_button(parent,"📍 Locations","secondary",show_locations).pack(side="left")
+    refresh_locations()
+
+def refresh_locations():
+    """Reload the location choices on the query worker, keeping the current selection"""
+    def show(locations, error):
+        if error: messagebox.showerror("Error", f"Could not load locations: {error}"); return
+        location_ids.clear(); location_ids[ALL_LOCATIONS] = None
+        for lid, name in locations: location_ids[name] = lid
+        location_box.config(values=list(location_ids))
+        location_box.set(next((name for name, lid in location_ids.items() if lid == current_location), ALL_LOCATIONS))
+    submit_query(core.list_locations, show, action="locations")
+
+def select_location(event=None):
+    """Limit the listing, totals and export to the picked location, keeping the search and sort"""
+    global current_location
+    current_location = location_ids.get(location_box.get())
+    if search_entry.get().strip(): search_product(); return
+    v = located(core.make_view())
+    if sorted_by: v = core.sorted_view(v, SORT_FIELDS[sorted_by[0]], desc=sorted_by[1])
+    set_product_view(v)
+
+def show_locations():
+    """Stock per location from the maintained rollup, with a form to add a location"""
+    window = tk.Toplevel(root); window.title("📍 Locations"); window.geometry("640x420"); window.transient(root)
+    columns = ("Location", "Products", "Quantity", "Value")
+    table = ttk.Treeview(window, columns=columns, show="headings")
+    for col in columns: table.heading(col, text=col); table.column(col, anchor="w" if col == "Location" else "e", width=140)
+    table.pack(fill="both", expand=True, padx=20, pady=(15,5))
+
+    def fill():
+        def show(rows, error):
+            if not window.winfo_exists(): return
+            if error: messagebox.showerror("Error", f"Could not load locations: {error}", parent=window); return
+            table.delete(*table.get_children())
+            for _, name, count, qty, value in rows:
+                table.insert("", "end", values=(name, f"{count:,}", f"{qty:,}", f"₦{value:,.2f}"))
+        submit_query(core.location_totals, show, action="location totals")
+
+    def add():
+        name = name_box.get()
+
+        def added(location, error):
+            # A long write elsewhere (e.g. a bulk import) can hold the lock past the busy timeout
+            if error:
+                message = str(error) if isinstance(error, ValueError) else f"Could not add the location: {error}"
+                if window.winfo_exists(): messagebox.showerror("Error", message, parent=window)
+                return
+            if window.winfo_exists(): name_box.delete(0, tk.END); fill()
+            refresh_locations()
+        submit_query(lambda db: core.add_location(db, name), added, action="location added")
+
+    add_frame = ttk.Frame(window); add_frame.pack(fill="x", padx=20, pady=(5,15))
+    name_box = ttk.Entry(add_frame, style="Modern.TEntry"); name_box.pack(side="left", fill="x", expand=True, padx=5, ipady=3)
+    name_box.bind("<Return>", lambda e: add())
+    create_modern_button(add_frame, "➕ Add Location", "success", add).pack(side="left")
+    fill()
 
 def on_tree_select(event=None):
     sel=tree.selection(); 
@@ -397,75 +832,430 @@ def on_tree_select(event=None):
 
 def logout():
     if messagebox.askyesno("Logout","Are you sure?"):
-        inventory_frame.pack_forget(); setup_login_frame()
+        inventory_frame.pack_forget(); show_login()
 
 def show_inventory():
-    login_frame.pack_forget(); inventory_frame.pack(fill="both",expand=True); load_products(); update_clock()
+    # The inventory screen is only built once someone has logged in
+    if not inventory_frame.winfo_children(): create_inventory_frame(); schedule_maintenance(MAINTENANCE_FIRST_CHECK_MS)
+    login_frame.pack_forget(); inventory_frame.pack(fill="both",expand=True)
+    if not products.loaded: load_product_cache()
+    load_products(); update_clock()
 
 def update_clock():
     time_str=datetime.now().strftime("%I:%M:%S %p"); date_str=datetime.now().strftime("%B %d, %Y")
     if clock_label and clock_label.winfo_exists(): clock_label.config(text=f"🕒 {date_str} | {time_str}"); root.after(1000,update_clock)
 
+# --- Background Jobs ---
+JOB_POLL_MS = 100          # how often the UI drains a worker's progress queue
+
+def run_background_job(title, work, on_done, action=None):
+    """Run work(progress, cancelled) on a worker thread behind a modal progress dialog.
+
+    work reports with progress(done, total, text) and should stop early once
+    cancelled.is_set(). The Tk side only ever touches the queue, via root.after
+    polling; on_done(result, error) runs back on the main thread. With
+    instrumentation on, both are charged to the operation action (default: title)."""
+    action = action or title
+    events = queue.Queue(); cancelled = threading.Event()
+
+    dialog = tk.Toplevel(root); dialog.title(title); dialog.transient(root); dialog.resizable(False, False)
+    status = tk.Label(dialog, text="Starting…", font=("Segoe UI",11), anchor="w", width=48); status.pack(padx=20, pady=(20,5), fill="x")
+    bar = ttk.Progressbar(dialog, mode="determinate", length=360, maximum=1); bar.pack(padx=20, pady=5)
+    cancel_btn = ttk.Button(dialog, text="Cancel", style="danger.TButton", command=cancelled.set); cancel_btn.pack(pady=(5,20))
+    dialog.protocol("WM_DELETE_WINDOW", cancelled.set)
+    dialog.grab_set()
+
+    def worker():
+        try:
+            with instrumentation.operation(action, "worker"):
+                result = work(lambda done, total, text="": events.put(("progress", done, total, text)), cancelled)
+            events.put(("done", result, None))
+        except Exception as e:
+            events.put(("done", None, e))
+
+    def poll():
+        latest = None
+        try:
+            while True:
+                event = events.get_nowait()
+                if event[0] == "done":
+                    dialog.grab_release(); dialog.destroy()
+                    with instrumentation.operation(action, "apply"): on_done(event[1], event[2])
+                    return
+                latest = event
+        except queue.Empty:
+            pass
+        # Only the newest progress report is worth drawing
+        if latest:
+            _, done, total, text = latest
+            bar.configure(maximum=max(total, 1), value=done)
+            status.config(text=text or f"{done:,} / {total:,}")
+        if cancelled.is_set(): cancel_btn.configure(state="disabled"); status.config(text="Cancelling…")
+        root.after(JOB_POLL_MS, poll)
+
+    threading.Thread(target=worker, name=title, daemon=True).start()
+    root.after(JOB_POLL_MS, poll)
+
+# --- Export ---
 def export_csv():
     """Export products to a CSV file with a calculated Total Value column."""
     filename = filedialog.asksaveasfilename(
         defaultextension=".csv",
-        filetypes=[("CSV Files", "*.csv")],
+        filetypes=[("CSV Files", "*.csv"), ("Compressed CSV", "*.csv.gz")],
         title="Save inventory as CSV"
     )
     if not filename:
         return  # User cancelled
 
-    # Only select the columns we need
-    cursor.execute("SELECT id, name, price, quantity FROM products")
-    rows = cursor.fetchall()
+    location = current_location
+    def finished(count, error):
+        if isinstance(error, core.ExportCancelled): messagebox.showinfo("Export Cancelled", "Export cancelled - no file was written")
+        elif error: messagebox.showerror("Export Failed", f"❌ Could not export products: {error}")
+        else:
+            where = f" at {location_box.get()}" if location is not None else ""
+            messagebox.showinfo("Export Complete", f"✅ Exported {count:,} products{where} to:\n{filename}")
 
-    # Write the CSV with a computed Total column
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(["ID", "Name", "Price", "Quantity", "Total Value"])
+    run_background_job("Exporting products",
+                       lambda progress, cancelled: core.write_products_csv(db_path, filename, progress, cancelled, location=location),
+                       finished, action="export_csv")
 
-        for r in rows:
-            pid, name, price, qty = r
-            try:
-                total_value = float(price) * int(qty)
-            except (ValueError, TypeError):
-                total_value = 0.0  # fallback if any bad data
-            writer.writerow([
-                pid,
-                name,
-                f"{float(price):.2f}",
-                qty,
-                f"{total_value:.2f}"
-            ])
 
-    messagebox.showinfo("Export Complete",
-                        f"✅ Exported {len(rows)} products to:\n{filename}")
+# --- Reports ---
+def show_reports():
+    """Open the reports window: valuation by price band, ABC classes, low stock and top movers"""
+    import reports  # loads NumPy, so only when asked for
+    if not reports.available():
+        messagebox.showerror("Reports", "Reports need NumPy - install it with: pip install numpy"); return
+    # Copying the cache columns is quick; the NumPy work and the SQL run on the query worker
+    refresh_product_cache()
+    arrays = reports.load_products(None, products) if products.loaded and not cache_reload_pending else None
+    submit_query(lambda db: reports.build_report(db, arrays=arrays), show_report, action="reports")
+
+def show_report(report, error):
+    if error: messagebox.showerror("Error", f"Could not build reports: {error}"); return
+    import reports
+    window = tk.Toplevel(root); window.title("📊 Inventory Reports"); window.geometry("900x560"); window.transient(root)
+    tk.Label(window, text=report["summary"], font=("Segoe UI",11,"bold"), anchor="w").pack(fill="x", padx=20, pady=(15,5))
+    notebook = ttk.Notebook(window); notebook.pack(fill="both", expand=True, padx=20, pady=5)
+    for section in report["sections"]:
+        frame = ttk.Frame(notebook, padding=10)
+        title = section["title"] if section["count"] == len(section["rows"]) else f"{section['title']} ({section['count']:,})"
+        notebook.add(frame, text=title)
+        headings = [heading for heading, _ in section["columns"]]
+        table = ttk.Treeview(frame, columns=headings, show="headings")
+        for heading in headings: table.heading(heading, text=heading); table.column(heading, anchor="center", width=140)
+        for row in section["rows"]: table.insert("", "end", values=reports.format_row(section["columns"], row))
+        scroll = ttk.Scrollbar(frame, orient="vertical", command=table.yview); table.configure(yscrollcommand=scroll.set)
+        table.pack(side="left", fill="both", expand=True); scroll.pack(side="right", fill="y")
+    create_modern_button(window, "📤 Export Report", "primary", lambda: export_report(report)).pack(pady=(5,15))
+
+def export_report(report):
+    filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")], title="Save report as CSV")
+    if not filename: return
+    import reports
+    try: reports.write_report_csv(report, filename)
+    except OSError as e: messagebox.showerror("Export Failed", f"❌ Could not save the report: {e}"); return
+    messagebox.showinfo("Export Complete", f"✅ Report saved to:\n{filename}")
+
+# --- Diagnostics ---
+def show_diagnostics(event=None):
+    """Hidden diagnostics panel (Ctrl+Shift+D): per-operation timings, recording and cProfile toggles"""
+    global diagnostics_window
+    if diagnostics_window is not None and diagnostics_window.winfo_exists():
+        diagnostics_window.lift(); return
+    window = diagnostics_window = tk.Toplevel(root); window.title("🩺 Diagnostics"); window.geometry("980x560")
+    status = tk.Label(window, font=("Segoe UI",10), anchor="w"); status.pack(fill="x", padx=20, pady=(15,5))
+    columns = ("Operation", "Metric", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Total ms")
+    table = ttk.Treeview(window, columns=columns, show="headings", height=14)
+    for col in columns: table.heading(col, text=col); table.column(col, width=200 if col == "Operation" else 95, anchor="w" if col in columns[:2] else "e")
+    table.pack(fill="both", expand=True, padx=20, pady=5)
+    buttons = ttk.Frame(window); buttons.pack(pady=(5,15))
 
+    def refresh():
+        if not window.winfo_exists(): return
+        sql = "SQL timing on" if instrumentation.installed() else "SQL timing off (start with --diagnostics)"
+        status.config(text=f"{'⏺ Recording' if instrumentation.enabled else '⏸ Paused'} · {sql}"
+                           f"{' · 🧪 Profiling' if instrumentation.profiling() else ''}")
+        table.delete(*table.get_children())
+        for op, metric, summary, n in instrumentation.rows():
+            times = ("", "", "", "", "") if summary is None else tuple(f"{summary[k]:,.2f}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms", "total_ms"))
+            table.insert("", "end", values=(op, metric, f"{n:,}") + times)
+        window.after(DIAGNOSTICS_REFRESH_MS, refresh)
 
+    def toggle_recording():
+        if instrumentation.enabled: instrumentation.disable()
+        else: instrumentation.enable()
+        record_btn.config(text="⏸ Pause" if instrumentation.enabled else "⏺ Record")
+
+    def save():
+        filename = filedialog.asksaveasfilename(parent=window, defaultextension=".json", title="Save diagnostics",
+                                                filetypes=[("JSON", "*.json"), ("CSV Files", "*.csv")])
+        if not filename: return
+        try: instrumentation.dump(filename)
+        except OSError as e: messagebox.showerror("Save Failed", f"❌ Could not save diagnostics: {e}", parent=window)
+
+    def toggle_profile():
+        if not instrumentation.profiling():
+            instrumentation.start_profile(); profile_btn.config(text="⏹ Stop cProfile"); return
+        profile_btn.config(text="🧪 cProfile")
+        filename = filedialog.asksaveasfilename(parent=window, defaultextension=".prof", title="Save profile (optional)",
+                                                filetypes=[("cProfile stats", "*.prof")])
+        text = instrumentation.stop_profile(filename or None)
+        output = tk.Toplevel(window); output.title("🧪 cProfile - top functions by cumulative time")
+        box = tk.Text(output, font=("Consolas",9), wrap="none", width=140, height=40); box.pack(fill="both", expand=True)
+        box.insert("1.0", text); box.config(state="disabled")
+
+    record_btn = create_modern_button(buttons, "⏸ Pause" if instrumentation.enabled else "⏺ Record", "primary", toggle_recording)
+    profile_btn = create_modern_button(buttons, "⏹ Stop cProfile" if instrumentation.profiling() else "🧪 cProfile", "warning", toggle_profile)
+    for btn in (record_btn, create_modern_button(buttons, "🧹 Reset", "danger", instrumentation.reset),
+                create_modern_button(buttons, "💾 Save", "success", save), profile_btn):
+        btn.pack(side="left", padx=5)
+    refresh()
+
+# --- Import ---
+def import_csv():
+    """Bulk-import products from a CSV price list in the background"""
+    filename = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv"), ("Compressed CSV", "*.csv.gz")],
+                                          title="Import products from CSV")
+    if not filename:
+        return  # User cancelled
+    reject_filename = core.rejects_filename(filename)
+    start = time.perf_counter()
+
+    def finished(result, error):
+        if isinstance(error, core.ImportCancelled): messagebox.showinfo("Import Cancelled", "Import cancelled - no products were added"); return
+        if error: messagebox.showerror("Import Failed", f"❌ Could not import products: {error}"); return
+        imported, rejected = result
+        rate = imported / max(time.perf_counter() - start, 1e-9)
+        load_products()
+        message = f"✅ Imported {imported:,} products ({rate:,.0f} rows/s)"
+        if rejected: message += f"\n⚠️ {rejected:,} invalid rows written to:\n{reject_filename}"
+        messagebox.showinfo("Import Complete", message)
+
+    run_background_job("Importing products",
+                       lambda progress, cancelled: core.import_products_csv(db_path, filename, reject_filename, progress, cancelled),
+                       finished, action="import_csv")
+
+
+@timed("sort_treeview")
 def sort_treeview(col, reverse):
-    l=[(tree.set(k,col),k) for k in tree.get_children('')]
-    try:
-        if col in ['Price','Quantity','Total Value']: l.sort(key=lambda t: float(str(t[0]).replace('₦','').replace(',','')), reverse=reverse)
-        else: l.sort(reverse=reverse)
-    except: l.sort(reverse=reverse)
-    for index,(val,k) in enumerate(l): tree.move(k,'',index); tree.item(k, tags=('evenrow' if index%2==0 else 'oddrow',))
-    tree.heading(col, command=lambda: sort_treeview(col, not reverse))
+    """Re-query the current view (search filter included) ordered by col in SQL; only the first page is rendered"""
+    global sorted_by
+    sorted_by = (col, reverse)
+    set_product_view(core.sorted_view(view, SORT_FIELDS[col], desc=reverse))
+
+def update_sort_headings():
+    """Show the sort arrow on the sorted column; clicking it again flips the direction"""
+    for col, title in column_titles.items():
+        if sorted_by and sorted_by[0] == col:
+            tree.heading(col, text=f"{title} {'▼' if sorted_by[1] else '▲'}", command=lambda c=col: sort_treeview(c, not sorted_by[1]))
+        else:
+            tree.heading(col, text=title, command=lambda c=col: sort_treeview(c, False))
+
+# --- Maintenance ---
+MAINTENANCE_FIRST_CHECK_MS = 60 * 1000     # look for due maintenance a minute after the inventory opens...
+MAINTENANCE_CHECK_MS = 15 * 60 * 1000      # ...and every 15 minutes after that
+MAINTENANCE_POLL_MS = 500
+maintenance_running = False
+
+def schedule_maintenance(delay=MAINTENANCE_CHECK_MS):
+    root.after(delay, run_due_maintenance)
+
+def run_due_maintenance():
+    """Run the due maintenance tasks (see maintenance.SCHEDULE) on a thread and connection of their own"""
+    global maintenance_running
+    if maintenance_running: return
+    maintenance_running = True
+    outcome = {}
+
+    def worker():
+        try:
+            with instrumentation.operation("maintenance", "worker"): outcome["entries"] = maintenance.run_due(db_path)
+        except Exception as e:
+            outcome["error"] = e
+
+    def poll():
+        global maintenance_running
+        if thread.is_alive(): root.after(MAINTENANCE_POLL_MS, poll); return
+        maintenance_running = False; schedule_maintenance()
+        # Runs are logged to maintenance_log; only failures need the user's attention
+        problems = [f"{e['task']}: {e['result']}" for e in outcome.get("entries", []) if not e["ok"]]
+        if "error" in outcome: problems.append(str(outcome["error"]))
+        if problems: messagebox.showwarning("Database Maintenance", "⚠️ Maintenance found a problem:\n" + "\n".join(problems))
+
+    thread = threading.Thread(target=worker, name="maintenance", daemon=True); thread.start()
+    root.after(MAINTENANCE_POLL_MS, poll)
+
+def backup_database():
+    """Save a copy of the live database, a few pages at a time behind a progress dialog"""
+    filename = filedialog.asksaveasfilename(defaultextension=".db", filetypes=[("SQLite Database", "*.db")], title="Back up database",
+                                            initialfile=f"{os.path.splitext(os.path.basename(db_path))[0]}-{datetime.now():%Y%m%d}.db")
+    if not filename: return
+    if os.path.abspath(filename) == os.path.abspath(db_path):
+        messagebox.showerror("Backup Failed", "❌ Choose a different file from the database itself"); return
+
+    def work(progress, cancelled):
+        source = database.connect(db_path)
+        try: return maintenance.backup(source, filename, lambda done, total: progress(done, total, f"Copied {done:,} of {total:,} pages"), cancelled.is_set)
+        finally: source.close()
+
+    def finished(pages, error):
+        if isinstance(error, maintenance.BackupCancelled): messagebox.showinfo("Backup Cancelled", "Backup cancelled - no file was written")
+        elif error: messagebox.showerror("Backup Failed", f"❌ Could not back up the database: {error}")
+        else: messagebox.showinfo("Backup Complete", f"✅ Database backed up to:\n{filename}")
+
+    run_background_job("Backing up database", work, finished, action="backup")
 
 # --- Initialize App ---
-def initialize_app():
+def load_ui_modules():
+    """Import the GUI toolkits; deferred so headless commands never load Tk"""
+    global tk, ttk, messagebox, filedialog, tb
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+    import ttkbootstrap as tb
+
+def initialize_app(measure_startup=False):
     global root, style, login_frame, inventory_frame
+    load_ui_modules()
     root=tb.Window(title="Optiedge Inventory System",themename="litera"); root.state('zoomed'); root.minsize(1000,700)
     root.iconbitmap("logo.ico")
 
     style=tb.Style(theme="litera"); setup_styles()
     login_frame=tk.Frame(root); inventory_frame=tk.Frame(root)
-    setup_login_frame(); create_inventory_frame()
+    setup_login_frame()
+    root.bind_all("<Control-Shift-D>", show_diagnostics)
     root.protocol("WM_DELETE_WINDOW", lambda: sys.exit(0))
+    if measure_startup: root.after_idle(report_startup)
     root.mainloop()
+
+def report_startup():
+    """--measure-startup: print the time to a drawn login window and quit"""
+    root.update()
+    print(f"time-to-login-window {time.perf_counter() - STARTED:.4f}", flush=True)
+    root.destroy()
     
 
+# --- Command Line ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Optiedge Inventory System")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--check-totals", action="store_true",
+                        help="verify the cached inventory totals against a full recompute and exit")
+    parser.add_argument("--rebuild-totals", action="store_true",
+                        help="recompute the cached inventory totals from products and exit")
+    parser.add_argument("--export", metavar="FILE",
+                        help="export products to FILE (gzipped if it ends in .gz) and exit")
+    parser.add_argument("--location", metavar="NAME",
+                        help="limit --export and --check-totals to the stock held at location NAME")
+    parser.add_argument("--locations", action="store_true", help="print stock per location and exit")
+    parser.add_argument("--import", dest="import_file", metavar="FILE",
+                        help="bulk-import products from a CSV FILE (read compressed if it ends in .gz) and exit "
+                             "(invalid rows go to FILE.rejects.csv)")
+    parser.add_argument("--stock-at", metavar="WHEN",
+                        help="print stock level and value at 'YYYY-MM-DD[ HH:MM:SS]' (a date means end of day) and exit")
+    parser.add_argument("--snapshot", action="store_true", help="take a stock snapshot now and exit")
+    parser.add_argument("--backup", metavar="FILE", help="copy the database to FILE with SQLite's online backup and exit")
+    parser.add_argument("--maintain", action="store_true",
+                        help="run every maintenance task now (integrity check, backup, vacuum, optimize), print the log and exit")
+    parser.add_argument("--sync", metavar="PEER",
+                        help="exchange product changes with another terminal's database file or a service URL and exit")
+    parser.add_argument("--report", metavar="FILE", help="write the inventory reports to a CSV FILE and exit (needs NumPy)")
+    parser.add_argument("--report-stalls", action="store_true",
+                        help="log UI stalls over %d ms and print main-thread time per operation on exit" % STALL_WARN_MS)
+    parser.add_argument("--diagnostics", nargs="?", const="", metavar="FILE",
+                        help="record per-operation and SQL timings from startup (Ctrl+Shift+D shows them); "
+                             "with FILE, save them there on exit (.json or .csv)")
+    parser.add_argument("--measure-startup", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def run_command(args):
+    """Run a headless command-line action; returns an exit code, or None to start the GUI"""
+    location = None
+    if args.location:
+        location = core.find_location(conn, args.location)
+        if location is None: print(f"❌ No location called {args.location}"); return 1
+    if args.rebuild_totals:
+        qty, value = core.rebuild_totals(conn)
+        print(f"Totals rebuilt: {qty:,} items, ₦{value:,.2f}")
+        return 0
+    if args.check_totals:
+        ok, cached, actual = core.check_totals(conn, location=location)
+        print(f"Cached:     {cached[0]:,} items, ₦{cached[1]:,.2f}")
+        print(f"Recomputed: {actual[0]:,} items, ₦{actual[1]:,.2f}")
+        print("✅ Totals are consistent" if ok else "❌ Totals are out of date - run with --rebuild-totals")
+        return 0 if ok else 1
+    if args.export:
+        start = time.perf_counter()
+        with instrumentation.operation("export_csv", "worker"): count = core.write_products_csv(db_path, args.export, location=location)
+        print(f"Exported {count:,} products to {args.export} in {time.perf_counter() - start:.1f}s")
+        return 0
+    if args.locations:
+        for _, name, count, qty, value in core.location_totals(conn):
+            print(f"{name:30}{count:>10,} products{qty:>12,} items   ₦{value:,.2f}")
+        return 0
+    if args.import_file:
+        start = time.perf_counter()
+        try:
+            with instrumentation.operation("import_csv", "worker"): imported, rejected = core.import_products_csv(db_path, args.import_file)
+        except (OSError, ValueError, sqlite3.Error) as e: print(f"❌ Import failed, nothing was imported: {e}"); return 1
+        elapsed = time.perf_counter() - start
+        print(f"Imported {imported:,} products in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):,.0f} rows/s)")
+        if rejected: print(f"{rejected:,} invalid rows written to {core.rejects_filename(args.import_file)}")
+        return 0
+    if args.stock_at:
+        when = args.stock_at.strip()
+        if len(when) == 10: when += " 23:59:59"
+        try: qty, value = ledger.stock_value_at(conn, when)
+        except ValueError as e: print(f"❌ {e}"); return 1
+        print(f"Stock at {when}: {qty:,} items, ₦{value:,.2f}")
+        return 0
+    if args.snapshot:
+        print(f"Snapshot {ledger.take_snapshot(conn)} taken")
+        return 0
+    if args.backup:
+        start = time.perf_counter()
+        pages = maintenance.backup(conn, args.backup)
+        print(f"Backed up {pages:,} pages to {args.backup} in {time.perf_counter() - start:.1f}s")
+        return 0
+    if args.maintain:
+        entries = maintenance.run_due(db_path, list(maintenance.SCHEDULE), force=True)
+        for entry in entries: print(maintenance.format_entry(entry))
+        return 0 if all(entry["ok"] for entry in entries) else 1
+    if args.sync:
+        import sync
+        start = time.perf_counter()
+        peer = None
+        try: peer = sync.open_peer(args.sync); result = sync.sync(conn, peer)
+        except (OSError, ValueError, sqlite3.Error) as e: print(f"❌ Sync failed: {e}"); return 1
+        finally:
+            if peer: peer.close()
+        got, sent = result["received"], result["sent"]
+        print(f"Synced with {result['peer']} in {time.perf_counter() - start:.1f}s")
+        print(f"Received: {got['inserted']:,} new, {got['updated']:,} updated, {got['deleted']:,} deleted, {got['skipped']:,} kept ours")
+        print(f"Sent:     {sent['rows']:,} changes: {sent['inserted']:,} new, {sent['updated']:,} updated, {sent['deleted']:,} deleted, "
+              f"{sent['skipped']:,} kept theirs")
+        return 0
+    if args.report:
+        import reports
+        if not reports.available(): print("❌ Reports need NumPy - install it with: pip install numpy"); return 1
+        start = time.perf_counter()
+        report = reports.build_report(conn)
+        reports.write_report_csv(report, args.report)
+        print(f"{report['summary']}\nReport written to {args.report} in {time.perf_counter() - start:.1f}s")
+        return 0
+    return None
+
 # --- Main ---
 if __name__=="__main__":
-    conn,cursor=init_database()
-    initialize_app()
\ No newline at end of file
+    args=parse_args()
+    if args.diagnostics is not None:
+        # Before any connection is opened, so every one of them times its statements
+        instrumentation.install(); instrumentation.enable()
+        if args.diagnostics: atexit.register(instrumentation.dump, args.diagnostics)
+    conn,cursor=init_database(args.db)
+    code=run_command(args)
+    if code is not None: sys.exit(code)
+    if args.report_stalls:
+        instrumentation.enable(); instrumentation.stall_warn_ms = STALL_WARN_MS
+        atexit.register(print_stall_report)
+    initialize_app(args.measure_startup)
\ No newline at end of file
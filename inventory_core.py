@@ -0,0 +1,378 @@
+"""UI-free inventory logic: products, search, totals, export and import.
+
+The Tk app and the HTTP service are both clients of this module. Functions take
+the sqlite3 connection to use, so each caller decides which thread runs them
+(see database.ConnectionPool)."""
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+import database
+
+PRODUCT_COLUMNS = "products.id, products.name, products.price, products.quantity, products.updated_at"
+DEFAULT_PAGE_SIZE = 100
+RANKED_SEARCH_LIMIT = 2000 # rank by relevance only when a search matches at most this many rows
+
+def timestamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# --- Validation ---
+def validate_product_input(name, price_str, qty_str):
+    if not name: raise ValueError("Name is required")
+    if not price_str or not qty_str: raise ValueError("Price and Quantity required")
+    try:
+        price = float(price_str.replace('₦','').replace(',',''))
+        qty = int(qty_str.replace(',',''))
+        if price<0 or qty<0: raise ValueError
+        return price, qty
+    except:
+        raise ValueError("Invalid Price or Quantity")
+
+# --- Products ---
+def add_product(conn, name, price_str, qty_str, commit=True, location=None):
+    """Validate and insert a product, stocked at location (default: the default location); returns its id"""
+    price, qty = validate_product_input(name, price_str, qty_str)
+    if location is not None: conn.execute("UPDATE ledger_context SET location_id=? WHERE id = 1", (location,))
+    try:
+        cur = conn.execute("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                           (name, price, qty, timestamp()))
+    finally:
+        if location is not None: conn.execute("UPDATE ledger_context SET location_id=NULL WHERE id = 1")
+    if commit: conn.commit()
+    return cur.lastrowid
+
+def update_product(conn, pid, name, price_str, qty_str, commit=True, location=None):
+    """Validate and overwrite a product; returns False if it does not exist.
+
+    With a location, qty is the stock held there; without one it is the total over
+    every location: an increase lands on the default location, and a reduction is
+    taken from the default location first, then from wherever stock is left."""
+    price, qty = validate_product_input(name, price_str, qty_str)
+    if location is None:
+        cur = conn.execute("UPDATE products SET name=?, price=?, quantity=?, updated_at=? WHERE id=?",
+                           (name, price, qty, timestamp(), pid))
+    else:
+        cur = conn.execute("UPDATE products SET name=?, price=?, updated_at=? WHERE id=?", (name, price, timestamp(), pid))
+        if cur.rowcount: set_location_stock(conn, location, pid, qty)
+    if commit: conn.commit()
+    return cur.rowcount > 0
+
+def delete_product(conn, pid, commit=True):
+    """Delete a product; returns False if it did not exist"""
+    cur = conn.execute("DELETE FROM products WHERE id=?", (pid,))
+    if commit: conn.commit()
+    return cur.rowcount > 0
+
+def get_product(conn, pid):
+    """(id, name, price, quantity, updated_at) or None"""
+    return conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id=?", (pid,)).fetchone()
+
+def product_dict(row):
+    return {"id": row[0], "name": row[1], "price": row[2], "quantity": row[3],
+            "total_value": row[2] * row[3], "updated_at": row[4]}
+
+def check_login(conn, username, password):
+    return conn.execute("SELECT 1 FROM users WHERE username=? AND password=?", (username, password)).fetchone() is not None
+
+# --- Locations ---
+DEFAULT_LOCATION = database.DEFAULT_LOCATION
+
+def list_locations(conn):
+    """[(id, name)] in name order"""
+    return conn.execute("SELECT id, name FROM locations ORDER BY name").fetchall()
+
+def find_location(conn, name):
+    """Id of the location called name (any case), or None"""
+    r = conn.execute("SELECT id FROM locations WHERE name = ?", (name.strip(),)).fetchone()
+    return r[0] if r else None
+
+def add_location(conn, name, commit=True):
+    """Create a location; returns its id. Raises ValueError for a blank or taken name"""
+    name = name.strip()
+    if not name: raise ValueError("Location name is required")
+    try: cur = conn.execute("INSERT INTO locations (name) VALUES (?)", (name,))
+    except sqlite3.IntegrityError: raise ValueError(f"There is already a location called {name}")
+    if commit: conn.commit()
+    return cur.lastrowid
+
+def set_location_stock(conn, location, pid, qty, commit=False):
+    """Set the stock of a product at one location (adding it there if needed); products.quantity follows"""
+    conn.execute("""INSERT INTO location_stock (location_id, id, name, price, quantity, updated_at)
+                    SELECT ?, id, name, price, ?, updated_at FROM products WHERE id = ?
+                    ON CONFLICT(location_id, id) DO UPDATE SET quantity = excluded.quantity""", (location, qty, pid))
+    if commit: conn.commit()
+
+def stocked_locations(conn, pid):
+    """How many locations hold stock of a product"""
+    return conn.execute("SELECT COUNT(*) FROM location_stock WHERE id = ? AND quantity != 0", (pid,)).fetchone()[0]
+
+def location_view(view, location):
+    """view limited to the products stocked at location, showing that location's quantities.
+
+    location_stock mirrors the products columns, so the same listing runs over the
+    location's partition, with the location's own sort indexes."""
+    assert view["source"].startswith("products")
+    where = "products.location_id = ?" + (f" AND ({view['where']})" if view["where"] else "")
+    located = dict(view, source="location_stock AS products" + view["source"][len("products"):], where=where,
+                   params=(location,) + tuple(view["params"]), location=location)
+    located.pop("contains", None)   # the product cache holds totals over every location
+    return located
+
+def location_totals(conn):
+    """[(id, name, products, total quantity, total value)] for every location, from the maintained rollup"""
+    return conn.execute("""SELECT l.id, l.name, COALESCE(t.products, 0), COALESCE(t.total_quantity, 0), COALESCE(t.total_value, 0)
+                           FROM locations l LEFT JOIN location_totals t ON t.location_id = l.id ORDER BY l.name""").fetchall()
+
+# --- Views & Paging ---
+def make_view(where="", params=(), source="products", sort="products.id", desc=True):
+    """A product listing: FROM source, WHERE condition/params, keyset-ordered by (sort, id)"""
+    return {"source": source, "where": where, "params": tuple(params), "sort": sort, "desc": desc}
+
+def row_key(row):
+    """Keyset position of a fetched row: (sort value, id)"""
+    return (row[5], row[0])
+
+def key_precedes(view, a, b):
+    """True if key a is listed before key b in view"""
+    return a > b if view["desc"] else a < b
+
+def fetch_page(conn, view, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Fetch one keyset page of view in display order.
+
+    Pass before=key to page downwards (rows after that key) or after=key to
+    page upwards (rows before it). Only the page itself is materialized.
+    Rows are (id, name, price, quantity, updated_at, sort value)."""
+    conds = [f"({view['where']})"] if view["where"] else []
+    params = tuple(view["params"])
+    downwards = after is None
+    key = before if downwards else after
+    # Paging upwards walks the ordering the other way, then flips back to display order
+    descending = view["desc"] if downwards else not view["desc"]
+    if key is not None:
+        op = "<" if descending else ">"
+        # The redundant single-column bound lets SQLite seek the sort index instead of scanning it
+        conds.append(f"{view['sort']} {op}= ? AND ({view['sort']}, products.id) {op} (?, ?)"); params += (key[0],) + tuple(key)
+    sql = f"SELECT {PRODUCT_COLUMNS}, {view['sort']} FROM {view['source']}"
+    if conds: sql += " WHERE " + " AND ".join(conds)
+    order = "DESC" if descending else "ASC"
+    sql += f" ORDER BY {view['sort']} {order}, products.id {order} LIMIT ?"
+    rows = conn.execute(sql, params + (limit,)).fetchall()
+    return rows if downwards else rows[::-1]
+
+def fetch_view_row(conn, view, pid):
+    """Fetch a single product with its sort key, or None if it is outside view"""
+    sql = f"SELECT {PRODUCT_COLUMNS}, {view['sort']} FROM {view['source']} WHERE products.id=?"
+    if view["where"]: sql += f" AND ({view['where']})"
+    return conn.execute(sql, (pid,) + tuple(view["params"])).fetchone()
+
+# Sortable fields and the indexed expression each one orders by (see database migration 4)
+SORT_EXPRESSIONS = {
+    "id": "products.id",
+    "name": "products.name COLLATE NOCASE",
+    "price": "products.price",
+    "quantity": "products.quantity",
+    "total_value": "products.price * products.quantity",
+    "updated_at": "IFNULL(products.updated_at, '')",
+}
+
+def sorted_view(view, field, desc=False):
+    """view re-ordered by one of SORT_EXPRESSIONS, keeping its source and filter"""
+    return dict(view, sort=SORT_EXPRESSIONS[field], desc=desc)
+
+# --- Search ---
+def search_view(conn, text, fts_enabled=True):
+    """View for a search on text (prefix/token match via FTS5, else a LIKE scan).
+
+    Results are ranked by relevance unless the match set is too broad to rank within a
+    keystroke, in which case they are listed newest first straight off the index."""
+    query = build_fts_query(text) if fts_enabled else None
+    if not query:
+        # contains lets product_cache answer the same filter from memory
+        return dict(make_view("LOWER(products.name) LIKE ?", (f"%{text.lower()}%",)), contains=text.lower())
+    matches = conn.execute("SELECT COUNT(*) FROM (SELECT rowid FROM products_fts WHERE products_fts MATCH ? LIMIT ?)",
+                           (query, RANKED_SEARCH_LIMIT + 1)).fetchone()[0]
+    if matches > RANKED_SEARCH_LIMIT:
+        return make_view("products.id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)", (query,))
+    return make_view("products_fts MATCH ?", (query,), sort="products_fts.rank", desc=False,
+                     source="products JOIN products_fts ON products_fts.rowid = products.id")
+
+def build_fts_query(text):
+    """Build an FTS5 query where every word must match as a token prefix, e.g. 'red app' -> '"red"* "app"*'"""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{w}"*' for w in words)
+
+# --- Totals ---
+def read_totals(conn, location=None):
+    """Cached (total quantity, total value), over every location or at one - a single-row lookup"""
+    if location is None: r = conn.execute("SELECT total_quantity, total_value FROM inventory_totals WHERE id = 1").fetchone()
+    else: r = conn.execute("SELECT total_quantity, total_value FROM location_totals WHERE location_id = ?", (location,)).fetchone()
+    return (int(r[0]), float(r[1])) if r else (0, 0.0)
+
+def compute_totals(conn, location=None):
+    """(total quantity, total value) recomputed with a full scan of products (or of the location's stock)"""
+    if location is None: r = conn.execute("SELECT SUM(quantity),SUM(price*quantity) FROM products").fetchone()
+    else: r = conn.execute("SELECT SUM(quantity),SUM(price*quantity) FROM location_stock WHERE location_id = ?", (location,)).fetchone()
+    return int(r[0] or 0), float(r[1] or 0)
+
+def check_totals(conn, tolerance=0.005, location=None):
+    """Compare the cached totals with a full recompute; returns (ok, cached, actual)"""
+    cached, actual = read_totals(conn, location), compute_totals(conn, location)
+    ok = cached[0] == actual[0] and abs(cached[1] - actual[1]) <= tolerance
+    return ok, cached, actual
+
+def rebuild_totals(conn):
+    """Reset the cached totals, overall and per location, from a full recompute (also clears floating point drift)"""
+    qty, value = compute_totals(conn)
+    conn.execute("UPDATE inventory_totals SET total_quantity=?, total_value=? WHERE id = 1", (qty, value))
+    conn.execute("DELETE FROM location_totals")
+    conn.execute("""INSERT INTO location_totals (location_id, products, total_quantity, total_value)
+                    SELECT location_id, COUNT(*), SUM(quantity), SUM(price * quantity) FROM location_stock GROUP BY location_id""")
+    conn.commit()
+    return qty, value
+
+# --- Export ---
+EXPORT_BATCH_SIZE = 5000           # rows pulled from SQLite per fetchmany()
+EXPORT_BUFFER_BYTES = 1 << 20      # write buffer for the output file
+
+class ExportCancelled(Exception):
+    pass
+
+def write_products_csv(path, filename, progress=None, cancelled=None, batch_size=EXPORT_BATCH_SIZE, location=None):
+    """Stream products from the database at path into a CSV file; returns the number of rows.
+
+    With a location, only the products stocked there are written, with that
+    location's quantities; otherwise quantities are totals over every location.
+
+    Rows are read in fetchmany() batches on a connection of its own, so this is
+    safe to run on a worker thread. Output is gzipped when filename ends in .gz.
+    A cancelled (threading.Event) export removes the partial file and raises
+    ExportCancelled."""
+    import csv, gzip   # only exports pay for these
+    src = database.connect(path)
+    try:
+        source, params = ("location_stock WHERE location_id = ?", (location,)) if location is not None else ("products", ())
+        total = src.execute(f"SELECT COUNT(*) FROM {source}", params).fetchone()[0]
+        # Only select the columns we need; Total Value is computed in SQL
+        rows = src.execute(f"SELECT id, name, price, quantity, price * quantity FROM {source} ORDER BY id", params)
+        if filename.endswith(".gz"):
+            f = gzip.open(filename, "wt", newline="", encoding="utf-8", compresslevel=6)
+        else:
+            f = open(filename, "w", newline="", encoding="utf-8", buffering=EXPORT_BUFFER_BYTES)
+        done = 0
+        try:
+            with f:
+                writer = csv.writer(f)
+                writer.writerow(["ID", "Name", "Price", "Quantity", "Total Value"])
+                while True:
+                    batch = rows.fetchmany(batch_size)
+                    if not batch: break
+                    if cancelled is not None and cancelled.is_set(): raise ExportCancelled()
+                    writer.writerows((pid, name, f"{float(price or 0):.2f}", qty, f"{float(total_value or 0):.2f}")
+                                     for pid, name, price, qty, total_value in batch)
+                    done += len(batch)
+                    if progress: progress(done, total, f"Exported {done:,} of {total:,} products")
+        except BaseException:
+            # Never leave a truncated export behind
+            if os.path.exists(filename): os.remove(filename)
+            raise
+        return done
+    finally:
+        src.close()
+
+# --- Import ---
+IMPORT_BATCH_SIZE = 5000           # rows per executemany() batch
+
+class ImportCancelled(Exception):
+    pass
+
+def rejects_filename(filename):
+    """Where import_products_csv() writes the rows it rejects from filename"""
+    if filename.endswith(".gz"): filename = filename[:-3]
+    return os.path.splitext(filename)[0] + ".rejects.csv"
+
+def _csv_rows(reader, csv_error):
+    """reader's rows, raising ValueError for text that is not UTF-8 or not CSV"""
+    try: yield from reader
+    except UnicodeDecodeError:
+        raise ValueError("The file is not UTF-8 text - save it as CSV UTF-8") from None
+    except csv_error as e:
+        raise ValueError(f"Line {reader.line_num}: {e}") from None
+
+def import_products_csv(path, filename, reject_filename=None, progress=None, cancelled=None, batch_size=IMPORT_BATCH_SIZE):
+    """Bulk-load products from a CSV file into the database at path; returns (imported, rejected).
+
+    The file needs Name, Price and Quantity columns (an ID column, as written by
+    export, updates those products in place); a .gz file is read compressed, so
+    exports load back as they are. Rows are checked with validate_product_input();
+    failures go to reject_filename with the reason appended. A file that cannot be
+    read as CSV raises ValueError (OSError if it cannot be opened). Everything is
+    inserted in executemany() batches inside a single transaction on a connection
+    of its own, so a cancelled (ImportCancelled) or failed import leaves the
+    database untouched (and writes no rejects file)."""
+    import csv, gzip, io
+    if reject_filename is None: reject_filename = rejects_filename(filename)
+    size = max(os.path.getsize(filename), 1)
+    dest = database.connect(path)
+    start = time.perf_counter(); imported = rejected = 0
+    rejects = reject_writer = None
+    try:
+        with open(filename, "rb") as raw, io.TextIOWrapper(gzip.GzipFile(fileobj=raw) if filename.endswith(".gz") else raw,
+                                                           encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            rows = _csv_rows(reader, csv.Error)
+            header = next(rows, None) or []
+            columns = {h.strip().lower(): i for i, h in enumerate(header)}
+            missing = [c for c in ("name", "price", "quantity") if c not in columns]
+            if missing: raise ValueError(f"Missing column(s): {', '.join(missing)}")
+            name_i, price_i, qty_i, id_i = columns["name"], columns["price"], columns["quantity"], columns.get("id")
+            current_time = timestamp()
+            inserts, upserts = [], []
+
+            def flush():
+                if inserts:
+                    dest.executemany("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)", inserts); inserts.clear()
+                if upserts:
+                    dest.executemany("""INSERT INTO products (id,name,price,quantity,updated_at) VALUES (?,?,?,?,?)
+                        ON CONFLICT(id) DO UPDATE SET name=excluded.name, price=excluded.price,
+                        quantity=excluded.quantity, updated_at=excluded.updated_at""", upserts); upserts.clear()
+
+            dest.execute("BEGIN")
+            for row in rows:
+                if not any(c.strip() for c in row): continue
+                try:
+                    if len(row) <= max(name_i, price_i, qty_i): raise ValueError("Missing columns")
+                    name = row[name_i].strip()
+                    price, qty = validate_product_input(name, row[price_i].strip(), row[qty_i].strip())
+                    pid = row[id_i].strip() if id_i is not None and id_i < len(row) else ""
+                    if pid and not pid.isdigit(): raise ValueError("Invalid ID")
+                except ValueError as e:
+                    if reject_writer is None:
+                        rejects = open(reject_filename, "w", newline="", encoding="utf-8")
+                        reject_writer = csv.writer(rejects); reject_writer.writerow(header + ["Error"])
+                    reject_writer.writerow(row + [str(e)]); rejected += 1
+                    continue
+                if pid: upserts.append((int(pid), name, price, qty, current_time))
+                else: inserts.append((name, price, qty, current_time))
+                imported += 1
+                if len(inserts) + len(upserts) >= batch_size:
+                    flush()
+                    if cancelled is not None and cancelled.is_set(): raise ImportCancelled()
+                    if progress:
+                        rate = imported / max(time.perf_counter() - start, 1e-9)
+                        # Bytes of the file read so far (compressed bytes for a .gz)
+                        progress(min(raw.tell(), size), size, f"Imported {imported:,} products ({rate:,.0f} rows/s)")
+            flush()
+        dest.commit()
+        return imported, rejected
+    except BaseException:
+        dest.rollback()
+        # Nothing was imported, so the rejects of this run would only mislead
+        if rejects:
+            rejects.close(); rejects = None
+            if os.path.exists(reject_filename): os.remove(reject_filename)
+        raise
+    finally:
+        dest.close()
+        if rejects: rejects.close()
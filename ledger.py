@@ -0,0 +1,119 @@
+"""Stock movement ledger: labelled movements, periodic snapshots and point-in-time stock.
+
+Every change to products.quantity or products.price is appended to stock_movements
+by triggers (see database migration 5). Historical stock is the latest snapshot at
+or before the requested time plus the movements recorded after it, so a query costs
+O(snapshot + delta) rather than a replay of the whole history. Snapshots are pruned
+to the opening one, the last of each month and the most recent SNAPSHOTS_KEPT.
+"""
+from datetime import datetime, timedelta
+
+import inventory_core as core
+
+MOVEMENT_KINDS = ("receipt", "sale", "adjustment")
+SNAPSHOT_EVERY_MOVEMENTS = 50000        # take a snapshot once this many movements have piled up...
+SNAPSHOT_MAX_AGE = timedelta(days=1)    # ...or the last one is this old and anything has moved since
+SNAPSHOTS_KEPT = 31                     # recent snapshots kept; older ones only survive as the last of their month
+
+def record_movements(conn, movements, at=None, commit=True):
+    """Apply a batch of stock movements in one transaction; returns how many were recorded.
+
+    movements is an iterable of (product_id, kind, quantity_change) or
+    (product_id, kind, quantity_change, note); sales are negative changes. Each
+    movement updates products.quantity, and the ledger trigger logs it under its
+    kind. Raises ValueError for an unknown product or a movement that would take
+    stock below zero; with commit=False the caller must roll back (or roll back to
+    a savepoint) itself."""
+    at = at or core.timestamp()
+    groups = {}
+    for movement in movements:
+        product_id, kind, change = movement[:3]
+        note = movement[3] if len(movement) > 3 else None
+        if kind not in MOVEMENT_KINDS: raise ValueError(f"Unknown movement kind: {kind}")
+        groups.setdefault((kind, note), []).append((int(change), at, int(product_id), int(change)))
+    count = 0
+    try:
+        for (kind, note), rows in groups.items():
+            conn.execute("UPDATE ledger_context SET kind=?, note=? WHERE id = 1", (kind, note))
+            cur = conn.executemany("UPDATE products SET quantity = quantity + ?, updated_at = ? "
+                                   "WHERE id = ? AND quantity + ? >= 0", rows)
+            if cur.rowcount != len(rows):
+                raise ValueError("Unknown product or not enough stock for a movement")
+            count += len(rows)
+        conn.execute("UPDATE ledger_context SET kind=NULL, note=NULL WHERE id = 1")
+        if commit: conn.commit()
+    except BaseException:
+        if commit: conn.rollback()
+        raise
+    return count
+
+def take_snapshot(conn, commit=True):
+    """Materialize current stock as a snapshot, then prune old ones; returns its id"""
+    last = conn.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements").fetchone()[0]
+    snapshot = conn.execute("INSERT INTO stock_snapshots (taken_at, last_movement_id) VALUES (?, ?)",
+                            (core.timestamp(), last)).lastrowid
+    # Products out of stock add nothing to stock_at(), so they are left out
+    conn.execute("""INSERT INTO stock_snapshot_items (snapshot_id, product_id, quantity, price)
+                    SELECT ?, id, quantity, price FROM products WHERE quantity != 0""", (snapshot,))
+    prune_snapshots(conn, commit=False)
+    if commit: conn.commit()
+    return snapshot
+
+def prune_snapshots(conn, keep=SNAPSHOTS_KEPT, commit=True):
+    """Drop snapshots other than the first, the last of each month and the newest keep; returns how many went.
+
+    Movements are never pruned, so history stays complete: a query that used a
+    dropped snapshot starts from an earlier one and replays more movements."""
+    dropped = [r[0] for r in conn.execute("""
+        SELECT id FROM stock_snapshots WHERE id NOT IN (
+            SELECT MIN(id) FROM stock_snapshots
+            UNION SELECT MAX(id) FROM stock_snapshots GROUP BY substr(taken_at, 1, 7)
+            UNION SELECT id FROM (SELECT id FROM stock_snapshots ORDER BY id DESC LIMIT ?))""", (keep,))]
+    for snapshot in dropped:
+        conn.execute("DELETE FROM stock_snapshot_items WHERE snapshot_id = ?", (snapshot,))
+        conn.execute("DELETE FROM stock_snapshots WHERE id = ?", (snapshot,))
+    if commit: conn.commit()
+    return len(dropped)
+
+def maybe_snapshot(conn):
+    """Take a snapshot if enough movements or time have passed since the last one; returns its id or None"""
+    taken_at, last = conn.execute("SELECT taken_at, last_movement_id FROM stock_snapshots ORDER BY id DESC LIMIT 1").fetchone()
+    pending = conn.execute("SELECT COUNT(*) FROM stock_movements WHERE id > ?", (last,)).fetchone()[0]
+    age = datetime.now() - datetime.strptime(taken_at, "%Y-%m-%d %H:%M:%S")
+    if pending >= SNAPSHOT_EVERY_MOVEMENTS or (pending and age >= SNAPSHOT_MAX_AGE):
+        return take_snapshot(conn)
+    return None
+
+def _base_snapshot(conn, at):
+    row = conn.execute("SELECT id, last_movement_id FROM stock_snapshots WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+                       (at,)).fetchone()
+    if row is None:
+        first = conn.execute("SELECT MIN(taken_at) FROM stock_snapshots").fetchone()[0]
+        raise ValueError(f"No stock history before {first}")
+    return row
+
+def stock_at(conn, at):
+    """Per-product stock at time at ('YYYY-MM-DD HH:MM:SS'): [(product_id, quantity, price)]
+
+    Starts from the latest snapshot taken at or before at and adds the movements
+    recorded after it up to at. The price is the one in force at that time."""
+    snapshot, last = _base_snapshot(conn, at)
+    # GROUP BY with a bare MAX(): SQLite takes price from the row holding the latest movement
+    return conn.execute("""
+        SELECT product_id, SUM(quantity), price, MAX(seq) FROM (
+            SELECT product_id, quantity, price, 0 AS seq FROM stock_snapshot_items WHERE snapshot_id = ?
+            UNION ALL
+            SELECT product_id, quantity_change, price, id FROM stock_movements WHERE id > ? AND created_at <= ?
+        ) GROUP BY product_id HAVING SUM(quantity) != 0 ORDER BY product_id""", (snapshot, last, at)).fetchall()
+
+def stock_value_at(conn, at):
+    """(total quantity, total value) at time at"""
+    qty = value = 0
+    for _, quantity, price, _ in stock_at(conn, at):
+        qty += quantity; value += quantity * price
+    return qty, value
+
+def product_history(conn, product_id, limit=100):
+    """Latest movements of one product, newest first"""
+    return conn.execute("""SELECT id, kind, quantity_change, price, created_at, note FROM stock_movements
+                           WHERE product_id = ? ORDER BY id DESC LIMIT ?""", (product_id, limit)).fetchall()
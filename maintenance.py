@@ -0,0 +1,186 @@
+"""Database upkeep: online backups, incremental vacuum, planner statistics and integrity checks.
+
+Every task runs on its own connection, so the app and the service keep working
+while it does:
+
+    backup       copy the live database with SQLite's online backup, a few hundred
+                 pages per step; between steps other connections read and write freely
+    vacuum       hand free pages (left by deletes) back to the file system with
+                 incremental_vacuum, a small batch per transaction
+    optimize     PRAGMA optimize (ANALYZE where the statistics have gone stale), so the
+                 planner keeps picking the sort and search indexes
+    quick_check  PRAGMA quick_check: the structural half of integrity_check, without
+                 cross-checking every index entry
+
+Each run is logged to maintenance_log (database migration 9) with its duration and
+the database size before and after. run_due() runs whatever SCHEDULE says is due.
+"""
+import glob
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import database
+import inventory_core as core
+
+SCHEDULE = {                    # task -> how often it runs, in the order they run
+    "quick_check": timedelta(days=1),
+    "backup": timedelta(days=1),
+    "vacuum": timedelta(hours=6),
+    "optimize": timedelta(hours=6),
+}
+BACKUP_STEP_PAGES = 256         # pages copied per backup step (1 MB at the default page size)
+STEP_PAUSE = 0.002              # seconds between backup and vacuum steps, to let writers in
+BACKUP_MAX_RESTARTS = 3         # writes elsewhere restart a stepped backup; after this many, copy in one step
+BACKUPS_KEPT = 7                # scheduled backups kept in the backups folder next to the database
+VACUUM_STEP_PAGES = 512         # free pages released per incremental_vacuum transaction
+VACUUM_MIN_FREE_SHARE = 0.10    # vacuum once this share of the file is free pages...
+VACUUM_MIN_FREE_PAGES = 1024    # ...and there are at least this many
+CONVERT_MAX_BYTES = 64 << 20    # largest database a scheduled run switches to incremental auto_vacuum (a full VACUUM)
+ANALYSIS_LIMIT = 1000           # rows PRAGMA optimize samples per index
+
+class BackupCancelled(Exception):
+    pass
+
+class _Restarted(Exception):
+    pass
+
+def database_size(path):
+    """Bytes on disk of the database file and its WAL"""
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+# --- Tasks ---
+def backup(conn, filename, progress=None, cancelled=None, step_pages=BACKUP_STEP_PAGES):
+    """Copy the database behind conn to filename while it stays in use; returns the pages copied.
+
+    The copy is written next to filename and renamed over it once complete, so a
+    failed or cancelled backup never leaves a partial file. progress(done, total)
+    is called after every step; cancelled() returning True stops the copy."""
+    partial = filename + ".part"
+    restarts, last = 0, None
+
+    def step(status, remaining, total):
+        nonlocal restarts, last
+        if cancelled and cancelled(): raise BackupCancelled()
+        if last is not None and remaining > last:
+            # Another connection wrote to the database, so SQLite started over
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS: raise _Restarted()
+        last = remaining
+        if progress: progress(total - remaining, total)
+        time.sleep(STEP_PAUSE)
+
+    target = sqlite3.connect(partial)
+    try:
+        try: conn.backup(target, pages=step_pages, progress=step)
+        except _Restarted:
+            # Under WAL one step only holds a read snapshot, which does not block writers
+            conn.backup(target, pages=-1)
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+        target.close()
+        os.replace(partial, filename)
+        return pages
+    except BaseException:
+        target.close()
+        if os.path.exists(partial): os.remove(partial)
+        raise
+
+def scheduled_backup(conn, path):
+    """Back up to backups/<name>-<time>.db next to the database, keeping the newest BACKUPS_KEPT"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), "backups")
+    os.makedirs(folder, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    filename = os.path.join(folder, f"{stem}-{datetime.now():%Y%m%d-%H%M%S}.db")
+    backup(conn, filename)
+    for old in sorted(glob.glob(os.path.join(folder, f"{stem}-*.db")))[:-BACKUPS_KEPT]: os.remove(old)
+    return f"saved {os.path.getsize(filename) / 1e6:,.1f} MB to {filename}"
+
+def vacuum(conn, path, force=False):
+    """Release free pages; switches an older database to incremental auto_vacuum first (a full VACUUM)"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        if database_size(path) > CONVERT_MAX_BYTES and not force:
+            return "auto_vacuum is off; too large to convert in the background - run inventory.py --maintain"
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL"); conn.execute("VACUUM"); _checkpoint(conn)
+        return "switched to incremental auto_vacuum (full VACUUM)"
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    if not force and (free < VACUUM_MIN_FREE_PAGES or free < pages * VACUUM_MIN_FREE_SHARE):
+        return f"{free:,} free pages of {pages:,}, nothing to do"
+    released = 0
+    while free:
+        # Each call is its own short write transaction
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        released += free - remaining; free = remaining if remaining < free else 0
+        time.sleep(STEP_PAUSE)
+    _checkpoint(conn)
+    return f"released {released:,} free pages"
+
+def _checkpoint(conn):
+    # Under WAL the file only shrinks once the log is copied back, and the log keeps its
+    # size until truncated. PASSIVE copies without holding anyone up; the TRUNCATE after
+    # it, which makes writers wait, then has next to nothing left to copy.
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+def optimize(conn, path):
+    """Refresh planner statistics: a full ANALYZE the first time, then PRAGMA optimize"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        conn.execute("ANALYZE"); conn.commit()
+        return "first ANALYZE"
+    conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+    conn.execute("PRAGMA optimize").fetchall(); conn.commit()
+    return "PRAGMA optimize"
+
+def quick_check(conn, path):
+    """PRAGMA quick_check; raises DatabaseError listing the first problems found"""
+    rows = [r[0] for r in conn.execute("PRAGMA quick_check(20)")]
+    if rows != ["ok"]: raise sqlite3.DatabaseError("; ".join(rows))
+    return "ok"
+
+TASKS = {"quick_check": quick_check, "backup": scheduled_backup, "vacuum": vacuum, "optimize": optimize}
+
+# --- Scheduling ---
+def run_task(conn, path, task, **options):
+    """Run one task, log it to maintenance_log and return the log entry as a dict"""
+    started_at, size_before = core.timestamp(), database_size(path)
+    start = time.perf_counter()
+    try: result, ok = TASKS[task](conn, path, **options), True
+    except (sqlite3.Error, OSError) as e: result, ok = str(e), False
+    entry = {"task": task, "started_at": started_at, "seconds": time.perf_counter() - start,
+             "size_before": size_before, "size_after": database_size(path), "ok": ok, "result": result}
+    conn.execute("INSERT INTO maintenance_log (task, started_at, seconds, size_before, size_after, ok, result) "
+                 "VALUES (:task, :started_at, :seconds, :size_before, :size_after, :ok, :result)", entry)
+    conn.commit()
+    return entry
+
+def due_tasks(conn, now=None):
+    """Tasks whose last run is older than SCHEDULE allows, in SCHEDULE order"""
+    now = now or datetime.now()
+    due = []
+    for task, every in SCHEDULE.items():
+        last = conn.execute("SELECT MAX(started_at) FROM maintenance_log WHERE task = ?", (task,)).fetchone()[0]
+        if last is None or datetime.strptime(last, "%Y-%m-%d %H:%M:%S") <= now - every: due.append(task)
+    return due
+
+def run_due(path, tasks=None, force=False):
+    """Run the due tasks (or the given ones) on a connection of their own; returns their log entries"""
+    conn = database.connect(path)
+    try:
+        options = {"vacuum": {"force": force}}
+        return [run_task(conn, path, task, **options.get(task, {})) for task in (tasks or due_tasks(conn))]
+    finally:
+        conn.close()
+
+def history(conn, limit=50):
+    """The latest log entries, newest first"""
+    rows = conn.execute("SELECT task, started_at, seconds, size_before, size_after, ok, result FROM maintenance_log "
+                        "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    keys = ("task", "started_at", "seconds", "size_before", "size_after", "ok", "result")
+    return [dict(zip(keys, r)) for r in rows]
+
+def format_entry(entry):
+    change = (entry["size_after"] - entry["size_before"]) / 1e6
+    return (f"{entry['started_at']}  {entry['task']:12}{entry['seconds']:8.2f}s  {entry['size_before'] / 1e6:9.1f} MB"
+            f" -> {entry['size_after'] / 1e6:.1f} MB ({change:+.1f})  {'ok' if entry['ok'] else 'FAILED'}: {entry['result']}")
@@ -0,0 +1,241 @@
+"""In-process product cache: compact columnar rows kept current from a change log.
+
+Every change to products is stamped with an increasing version in product_changes
+(see database migration 6). The cache remembers the highest version it has seen,
+so catching up costs one index lookup when nothing changed and otherwise reads
+only the products changed since. Rows live in parallel arrays (ids, prices,
+quantities) and lists of interned strings; sort orders are arrays of ids kept in
+place as rows change. Used by the Tk app, which owns a single connection; a cache
+is not thread-safe.
+"""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+import inventory_core as core
+
+FULL_RELOAD_CHANGES = 5000      # past this many changed rows, reloading beats patching
+
+# Cache sort keys, mirroring inventory_core.SORT_EXPRESSIONS
+SORT_FIELDS = {expression: field for field, expression in core.SORT_EXPRESSIONS.items()}
+
+class ProductCache:
+    def __init__(self):
+        self.loaded = False
+        self.version = 0
+        self.clear()
+
+    def clear(self):
+        self.ids, self.prices, self.quantities, self.versions = array("q"), array("d"), array("q"), array("q")
+        self.names, self.lowered, self.updated = [], [], []
+        self.positions = {}             # product id -> index into the columns
+        self.orders = {}                # sort field -> array of ids, ascending by (key, id)
+        self.formatted = {}             # product id -> (row version, display values)
+        self.total_quantity, self.total_value = 0, 0.0
+
+    # --- Loading & Invalidation ---
+    def load(self, conn):
+        """Read every product; the version and rows come from one read transaction"""
+        self.clear()
+        own_transaction = not conn.in_transaction
+        if own_transaction: conn.execute("BEGIN")
+        try:
+            self.version = current_version(conn)
+            rows = conn.execute("SELECT id, name, price, quantity, updated_at FROM products").fetchall()
+        finally:
+            if own_transaction: conn.commit()
+        intern = sys.intern
+        self.ids = array("q", [r[0] for r in rows])
+        self.prices = array("d", [r[2] for r in rows])
+        self.quantities = array("q", [r[3] for r in rows])
+        self.versions = array("q", bytes(self.versions.itemsize * len(rows)))
+        self.names = [intern(r[1]) for r in rows]
+        # lower() of an already lower-case name interns to the name itself, so it costs nothing extra
+        self.lowered = [intern(name.lower()) for name in self.names]
+        self.updated = [intern(r[4]) if r[4] else None for r in rows]
+        self.positions = dict(zip(self.ids, range(len(rows))))
+        self.total_quantity = sum(self.quantities)
+        self.total_value = sum(price * qty for price, qty in zip(self.prices, self.quantities))
+        self.loaded = True
+
+    def refresh(self, conn, reload=True):
+        """Catch up with changes since the last refresh; returns how many products changed.
+
+        An unloaded cache, or one more than FULL_RELOAD_CHANGES changes behind, is
+        reloaded whole; with reload=False it is left as it is and None returned, so
+        the caller can reload it somewhere a full read does no harm."""
+        if not self.loaded:
+            if not reload: return None
+            self.load(conn); return len(self.ids)
+        if current_version(conn) == self.version: return 0
+        changes = conn.execute("""SELECT c.product_id, c.version, p.name, p.price, p.quantity, p.updated_at
+                                  FROM product_changes c LEFT JOIN products p ON p.id = c.product_id
+                                  WHERE c.version > ? ORDER BY c.version LIMIT ?""",
+                               (self.version, FULL_RELOAD_CHANGES + 1)).fetchall()
+        if len(changes) > FULL_RELOAD_CHANGES:
+            if not reload: return None
+            self.load(conn); return len(self.ids)
+        for pid, version, name, price, quantity, updated_at in changes:
+            row = (pid, name, price, quantity, updated_at)
+            if name is None:
+                if pid in self.positions: self._remove(pid)
+            elif pid in self.positions: self._update(row, version)
+            else: self._append(row, version)
+            self.version = version
+        return len(changes)
+
+    def _append(self, row, version):
+        pid, name, price, quantity, updated_at = row
+        name = sys.intern(name)
+        self.positions[pid] = len(self.ids)
+        self.ids.append(pid); self.prices.append(price); self.quantities.append(quantity); self.versions.append(version)
+        # lower() of an already lower-case name interns to the name itself, so it costs nothing extra
+        self.names.append(name); self.lowered.append(sys.intern(name.lower()))
+        self.updated.append(sys.intern(updated_at) if updated_at else None)
+        self.total_quantity += quantity; self.total_value += price * quantity
+        for field, order in self.orders.items():
+            key = (self.sort_key(field, len(self.ids) - 1), pid)
+            order.insert(bisect_left(order, key, key=self._order_key(field)), pid)
+
+    def _update(self, row, version):
+        """Overwrite a product in place; it only moves in the sort orders whose key changed"""
+        pid, name, price, quantity, updated_at = row
+        p = self.positions[pid]
+        moves = [(field, order, self.sort_key(field, p)) for field, order in self.orders.items()]
+        moves = [(field, order, key, bisect_left(order, (key, pid), key=self._order_key(field))) for field, order, key in moves]
+        self.total_quantity += quantity - self.quantities[p]
+        self.total_value += price * quantity - self.prices[p] * self.quantities[p]
+        name = sys.intern(name)
+        self.prices[p], self.quantities[p], self.versions[p] = price, quantity, version
+        self.names[p], self.lowered[p] = name, sys.intern(name.lower())
+        self.updated[p] = sys.intern(updated_at) if updated_at else None
+        for field, order, old_key, index in moves:
+            key = self.sort_key(field, p)
+            if key == old_key: continue
+            del order[index]
+            order.insert(bisect_left(order, (key, pid), key=self._order_key(field)), pid)
+
+    def _remove(self, pid):
+        """Drop a product, moving the last row into its slot to keep the columns dense"""
+        p = self.positions[pid]
+        for field, order in self.orders.items():
+            del order[bisect_left(order, (self.sort_key(field, p), pid), key=self._order_key(field))]
+        del self.positions[pid]
+        self.total_quantity -= self.quantities[p]; self.total_value -= self.prices[p] * self.quantities[p]
+        self.formatted.pop(pid, None)
+        last = len(self.ids) - 1
+        if p != last:
+            for column in (self.ids, self.prices, self.quantities, self.versions, self.names, self.lowered, self.updated):
+                column[p] = column[last]
+            self.positions[self.ids[p]] = p
+        for column in (self.ids, self.prices, self.quantities, self.versions, self.names, self.lowered, self.updated):
+            del column[last]
+
+    # --- Reading ---
+    def row(self, pid):
+        """(id, name, price, quantity, updated_at) or None"""
+        p = self.positions.get(pid)
+        if p is None: return None
+        return (pid, self.names[p], self.prices[p], self.quantities[p], self.updated[p])
+
+    def totals(self):
+        return self.total_quantity, self.total_value
+
+    def display(self, pid, format_row):
+        """format_row(row) for a cached product, memoized until the product changes; None if not cached"""
+        p = self.positions.get(pid)
+        if p is None: return None
+        memo = self.formatted.get(pid)
+        if memo is None or memo[0] != self.versions[p]:
+            memo = self.formatted[pid] = (self.versions[p], format_row(self.row(pid)))
+        return memo[1]
+
+    def sort_key(self, field, p):
+        """Python equivalent of the SQL sort expression for field, for the row at position p"""
+        if field == "id": return self.ids[p]
+        if field == "name": return self.lowered[p]
+        if field == "price": return self.prices[p]
+        if field == "quantity": return self.quantities[p]
+        if field == "total_value": return self.prices[p] * self.quantities[p]
+        return self.updated[p] or ""
+
+    def _order_key(self, field):
+        positions = self.positions
+        return lambda pid: (self.sort_key(field, positions[pid]), pid)
+
+    def column_keys(self, field):
+        """sort_key() for every position at once"""
+        if field == "id": return self.ids
+        if field == "name": return self.lowered
+        if field == "price": return self.prices
+        if field == "quantity": return self.quantities
+        if field == "total_value": return [price * qty for price, qty in zip(self.prices, self.quantities)]
+        return [updated or "" for updated in self.updated]
+
+    def order(self, field):
+        """Ids ascending by (field, id), built on first use and patched in place afterwards"""
+        order = self.orders.get(field)
+        if order is None:
+            if field == "id": order = array("q", sorted(self.ids))
+            else: order = array("q", [pid for _, pid in sorted(zip(self.column_keys(field), self.ids))])
+            self.orders[field] = order
+        return order
+
+    # --- Views ---
+    def serves(self, view):
+        """True if view can be paged from the cache: every product, or a substring filter on names"""
+        return (self.loaded and view["source"] == "products" and view["sort"] in SORT_FIELDS
+                and (not view["where"] or view.get("contains") is not None))
+
+    def fetch_page(self, view, before=None, after=None, limit=core.DEFAULT_PAGE_SIZE):
+        """Same contract as inventory_core.fetch_page, served from memory"""
+        field = SORT_FIELDS[view["sort"]]
+        ids, order_key = self.order(field), self._order_key(field)
+        downwards = after is None
+        key = before if downwards else after
+        # Display order is the ascending order, or its reverse for descending views;
+        # the page is the limit rows next to key below it (towards the start) or above it
+        below = view["desc"] == downwards
+        if key is None: bound = len(ids) if below else 0
+        else: bound = (bisect_left if below else bisect_right)(ids, tuple(key), key=order_key)
+        text = view.get("contains")
+        if text is None:
+            page = ids[max(bound - limit, 0):bound] if below else ids[bound:bound + limit]
+            if view["desc"]: page = page[::-1]
+        else:
+            # Walk outwards from the bound until a page of matches is found, like SQLite's LIKE scan
+            lowered, positions, page = self.lowered, self.positions, []
+            for i in (range(bound - 1, -1, -1) if below else range(bound, len(ids))):
+                if text in lowered[positions[ids[i]]]:
+                    page.append(ids[i])
+                    if len(page) == limit: break
+            if not downwards: page.reverse()
+        rows = []
+        for pid in page:
+            p = self.positions[pid]
+            rows.append((pid, self.names[p], self.prices[p], self.quantities[p], self.updated[p], self.sort_key(field, p)))
+        return rows
+
+    def fetch_view_row(self, view, pid):
+        """Same contract as inventory_core.fetch_view_row, served from memory"""
+        p = self.positions.get(pid)
+        if p is None: return None
+        text = view.get("contains")
+        if text is not None and text not in self.lowered[p]: return None
+        return self.row(pid) + (self.sort_key(SORT_FIELDS[view["sort"]], p),)
+
+    def memory_bytes(self):
+        """Approximate bytes held by the cache: containers plus each distinct string once"""
+        containers = [self.ids, self.prices, self.quantities, self.versions, self.names, self.lowered,
+                      self.updated, self.positions, self.formatted, *self.orders.values()]
+        size = sum(sys.getsizeof(c) for c in containers)
+        seen = set()
+        for s in chain(self.names, self.lowered, self.updated):
+            if s is not None and id(s) not in seen:
+                seen.add(id(s)); size += sys.getsizeof(s)
+        return size
+
+def current_version(conn):
+    """Highest change version recorded - an index lookup"""
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM product_changes").fetchone()[0]
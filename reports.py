@@ -0,0 +1,162 @@
+"""Inventory reports computed with NumPy: valuation by price band, low stock, ABC classes and top movers.
+
+Products, and the recent sales in the stock ledger, are loaded into NumPy arrays in
+one pass; each report is then a few whole-array operations instead of a Python loop
+per product. NumPy is optional - available() tells whether reports can be built.
+"""
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PRICE_BANDS = (0, 1000, 5000, 20000, 100000)    # ₦ lower bound of each price band
+ABC_SHARES = (0.80, 0.95)       # cumulative value share closing classes A and B; the rest is C
+DEMAND_DAYS = 30                # sales window for daily demand and top movers
+LEAD_TIME_DAYS = 7              # restock lead time: reorder when stock covers less than this
+LOW_STOCK_QUANTITY = 10         # reorder point for products without recent sales
+TOP_MOVERS = 20
+MAX_REPORT_ROWS = 1000          # rows kept per list section (the count covers all of them)
+
+def available():
+    return np is not None
+
+# --- Loading ---
+def load_products(conn, cache=None):
+    """(ids, prices, quantities) arrays, copied from a loaded product_cache or read in bulk"""
+    if cache is not None and cache.loaded:
+        # The cache columns are already packed machine arrays, so this is three memcpys
+        return (np.frombuffer(cache.ids, dtype=np.int64).copy(), np.frombuffer(cache.prices, dtype=np.float64).copy(),
+                np.frombuffer(cache.quantities, dtype=np.int64).copy())
+    count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    rows = np.fromiter(conn.execute("SELECT id, price, quantity FROM products"),
+                       dtype=[("id", np.int64), ("price", np.float64), ("quantity", np.int64)], count=count)
+    return rows["id"], rows["price"], rows["quantity"]
+
+def load_sales(conn, since):
+    """(product ids, units sold) arrays of the sales recorded since 'YYYY-MM-DD HH:MM:SS', summed per product in SQL"""
+    rows = np.fromiter(conn.execute("""SELECT product_id, -SUM(quantity_change) FROM stock_movements
+                                       WHERE created_at >= ? AND kind = 'sale' GROUP BY product_id""", (since,)),
+                       dtype=[("product_id", np.int64), ("units", np.int64)])
+    return rows["product_id"], rows["units"]
+
+def per_product(ids, product_ids, amounts):
+    """Sum amounts per entry of ids, given as (product_ids, amounts) pairs; unknown products are ignored"""
+    order = np.argsort(ids)
+    slots = np.searchsorted(ids, product_ids, sorter=order)
+    slots[slots == len(ids)] = 0
+    found = ids[order[slots]] == product_ids if len(ids) else np.zeros(len(product_ids), bool)
+    return np.bincount(order[slots[found]], weights=amounts[found], minlength=len(ids))
+
+def product_names(conn, ids):
+    """{id: name} for a short list of ids, in one query"""
+    if not len(ids): return {}
+    placeholders = ",".join("?" * len(ids))
+    return dict(conn.execute(f"SELECT id, name FROM products WHERE id IN ({placeholders})", [int(i) for i in ids]))
+
+# --- Reports ---
+def valuation_by_band(prices, quantities, bands=PRICE_BANDS):
+    """[(band, products, units, value, share of value)] per price band"""
+    band = np.digitize(prices, bands[1:])
+    values = prices * quantities
+    count = np.bincount(band, minlength=len(bands))
+    units = np.bincount(band, weights=quantities, minlength=len(bands))
+    value = np.bincount(band, weights=values, minlength=len(bands))
+    total = value.sum() or 1.0
+    labels = [f"₦{low:,} - ₦{high:,}" for low, high in zip(bands, bands[1:])] + [f"₦{bands[-1]:,}+"]
+    return [(labels[i], int(count[i]), int(units[i]), float(value[i]), float(value[i] / total)) for i in range(len(bands))]
+
+def abc_classes(values, shares=ABC_SHARES):
+    """Class per product (0=A, 1=B, 2=C): A holds the top shares[0] of value, B the next slice up to shares[1]"""
+    # Ties may come out in any order: the class sizes only depend on the sorted values
+    order = np.argsort(-values)
+    total = values.sum()
+    # Share of value held by the products ranked above each one: a product joins A while that is under 80%
+    before = (np.cumsum(values[order]) - values[order]) / (total or 1.0)
+    classes = np.empty(len(values), dtype=np.int8)
+    classes[order] = np.searchsorted(np.asarray(shares), before, side="right")
+    return classes
+
+def abc_summary(values, classes):
+    """[(class, products, share of products, value, share of value)]"""
+    count = np.bincount(classes, minlength=3)
+    value = np.bincount(classes, weights=values, minlength=3)
+    n, total = max(len(values), 1), value.sum() or 1.0
+    return [(name, int(count[i]), float(count[i] / n), float(value[i]), float(value[i] / total)) for i, name in enumerate("ABC")]
+
+def low_stock(quantities, daily_demand, lead_time_days=LEAD_TIME_DAYS, floor=LOW_STOCK_QUANTITY):
+    """(positions, reorder points, days of cover) of products at or below their reorder point, most urgent first"""
+    reorder = np.where(daily_demand > 0, np.ceil(daily_demand * lead_time_days), floor)
+    low = np.flatnonzero(quantities <= reorder)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(daily_demand[low] > 0, quantities[low] / daily_demand[low], np.inf)
+    urgent = np.lexsort((quantities[low] - reorder[low], cover))
+    low = low[urgent]
+    return low, reorder[low], cover[urgent]
+
+def top_movers(ids, units_sold, n=TOP_MOVERS):
+    """Positions of the n products with the most units sold, best first (ties by id)"""
+    n = min(n, int(np.count_nonzero(units_sold > 0)))
+    if n == 0: return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-units_sold, n - 1)[:n]
+    return top[np.lexsort((ids[top], -units_sold[top]))]
+
+def build_report(conn, cache=None, now=None, arrays=None):
+    """Every report as {"summary": text, "sections": [{"title", "columns", "rows", "count"}]}.
+
+    columns are (heading, kind) with kind one of text, int, money, percent, days;
+    list sections keep their first MAX_REPORT_ROWS rows, count says how many there were.
+    arrays, if given, are the (ids, prices, quantities) from load_products()."""
+    now = now or datetime.now()
+    ids, prices, quantities = arrays if arrays is not None else load_products(conn, cache)
+    values = prices * quantities
+    sale_ids, sale_units = load_sales(conn, (now - timedelta(days=DEMAND_DAYS)).strftime("%Y-%m-%d %H:%M:%S"))
+    sold = per_product(ids, sale_ids, sale_units)
+    classes = abc_classes(values)
+    low, reorder, cover = low_stock(quantities, sold / DEMAND_DAYS)
+    movers = top_movers(ids, sold)
+    shown = low[:MAX_REPORT_ROWS]
+    names = product_names(conn, np.concatenate([ids[shown], ids[movers]]))
+    return {
+        "summary": f"{len(ids):,} products · {int(quantities.sum()):,} units · ₦{float(values.sum()):,.2f} "
+                   f"· generated {now.strftime('%Y-%m-%d %H:%M')}",
+        "sections": [
+            {"title": "Valuation by price band", "count": len(PRICE_BANDS),
+             "columns": [("Price band", "text"), ("Products", "int"), ("Units", "int"), ("Value", "money"), ("Share", "percent")],
+             "rows": valuation_by_band(prices, quantities)},
+            {"title": "ABC classification", "count": 3,
+             "columns": [("Class", "text"), ("Products", "int"), ("Share of products", "percent"), ("Value", "money"), ("Share of value", "percent")],
+             "rows": abc_summary(values, classes)},
+            {"title": "Low stock", "count": len(low),
+             "columns": [("ID", "int"), ("Name", "text"), ("Quantity", "int"), ("Reorder point", "int"), ("Days of cover", "days")],
+             "rows": [(int(ids[i]), names.get(int(ids[i]), ""), int(quantities[i]), int(r), float(c))
+                      for i, r, c in zip(shown, reorder, cover)]},
+            {"title": f"Top movers ({DEMAND_DAYS} days)", "count": len(movers),
+             "columns": [("ID", "int"), ("Name", "text"), ("Units sold", "int"), ("In stock", "int"), ("Class", "text")],
+             "rows": [(int(ids[i]), names.get(int(ids[i]), ""), int(sold[i]), int(quantities[i]), "ABC"[classes[i]])
+                      for i in movers]},
+        ],
+    }
+
+# --- Output ---
+def format_value(kind, value):
+    if kind == "money": return f"₦{value:,.2f}"
+    if kind == "int": return f"{value:,}"
+    if kind == "percent": return f"{value:.1%}"
+    if kind == "days": return "no sales" if value == float("inf") else f"{value:,.1f}"
+    return value
+
+def format_row(columns, row):
+    return tuple(format_value(kind, value) for (_, kind), value in zip(columns, row))
+
+def write_report_csv(report, filename):
+    """Write every section, one block after another, with raw (unformatted) numbers"""
+    import csv
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([report["summary"]])
+        for section in report["sections"]:
+            writer.writerow([]); writer.writerow([section["title"]])
+            writer.writerow([heading for heading, _ in section["columns"]])
+            writer.writerows(section["rows"])
@@ -0,0 +1,313 @@
+"""Local HTTP/JSON service over inventory_core, so several POS terminals can share one database.
+
+    python service.py [--db FILE] [--host 127.0.0.1] [--port 8765] [--workers 8]
+
+Endpoints (all JSON):
+    GET    /health
+    GET    /products?limit=100&before=<id>   newest first, keyset paged ("next" is the next before)
+    GET    /products/<id>
+    GET    /search?q=<text>&limit=100
+    GET    /totals
+    POST   /products          {"name": ..., "price": ..., "quantity": ...}
+    PUT    /products/<id>     {"name": ..., "price": ..., "quantity": ...}
+    DELETE /products/<id>
+    POST   /movements         {"movements": [{"product_id": 1, "kind": "sale", "change": -2, "note": ...}, ...]}
+    GET    /stock?at=YYYY-MM-DD HH:MM:SS   stock level and value at that time
+    GET    /sync?site=<site id>               this database's site id and what it has received from that site
+    GET    /sync/changes?since=<version>      changeset of everything changed after version (see sync.py)
+    POST   /sync/changes      a changeset to apply
+
+Reads run on a bounded thread pool, one SQLite connection per thread. Writes are
+queued and applied by a single writer thread, which commits whatever arrived
+within a couple of milliseconds of each other as one transaction.
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import database
+import inventory_core as core
+import ledger
+import maintenance
+import sync
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+READ_WORKERS = 8
+MAX_PAGE_SIZE = 500
+WRITE_BATCH_SIZE = 256          # most writes committed in one transaction
+WRITE_BATCH_WINDOW = 0.002      # seconds to wait for more writes to join a batch
+MAX_BODY_BYTES = 1 << 16
+MAX_CHANGESET_BYTES = 1 << 26   # a first sync carries the whole catalogue
+SNAPSHOT_CHECK_SECONDS = 3600   # how often to consider taking a stock snapshot
+MAINTENANCE_CHECK_SECONDS = 900 # how often to run due maintenance (see maintenance.SCHEDULE)
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class InventoryService:
+    def __init__(self, path=database.DB_PATH, workers=READ_WORKERS):
+        self.path = path
+        self.pool = database.ConnectionPool(path)
+        self.readers = ThreadPoolExecutor(workers, thread_name_prefix="inventory-read")
+        # SQLite allows one writer at a time, so a single thread owns all writes
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="inventory-write")
+        self.fts_enabled = False
+        self.server = self.writes = self.write_task = self.snapshot_task = self.maintenance_task = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Migrate the database and start listening; returns the bound port"""
+        loop = asyncio.get_running_loop()
+        self.fts_enabled = await loop.run_in_executor(self.writer, lambda: database.initialize(self.pool.get()))
+        self.writes = asyncio.Queue()
+        self.write_task = asyncio.create_task(self._write_loop())
+        self.snapshot_task = asyncio.create_task(self._snapshot_loop())
+        self.maintenance_task = asyncio.create_task(self._maintenance_loop())
+        self.server = await asyncio.start_server(self._handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server:
+            self.server.close(); await self.server.wait_closed()
+        for task in (self.write_task, self.snapshot_task, self.maintenance_task):
+            if task: task.cancel()
+        self.readers.shutdown(); self.writer.shutdown()
+        self.pool.close_all()
+
+    # --- Database access ---
+    async def read(self, fn, *args):
+        """Run fn(conn, *args) on a reader thread with that thread's connection"""
+        return await asyncio.get_running_loop().run_in_executor(self.readers, lambda: fn(self.pool.get(), *args))
+
+    async def write(self, fn, *args):
+        """Queue fn(conn, *args, commit=False) for the writer; resolves once its batch commits"""
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((fn, args, future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            # Give concurrent requests a moment to join the same transaction
+            deadline = loop.time() + WRITE_BATCH_WINDOW
+            while len(batch) < WRITE_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try: batch.append(await asyncio.wait_for(self.writes.get(), timeout))
+                except asyncio.TimeoutError: break
+            try:
+                results = await loop.run_in_executor(self.writer, self._apply_batch, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if future.done(): continue
+                if isinstance(result, Exception): future.set_exception(result)
+                else: future.set_result(result)
+
+    async def _snapshot_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(self.writer, lambda: ledger.maybe_snapshot(self.pool.get()))
+            await asyncio.sleep(SNAPSHOT_CHECK_SECONDS)
+
+    async def _maintenance_loop(self):
+        # Tasks open their own connection, so they run beside the readers and the writer
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(MAINTENANCE_CHECK_SECONDS)
+            try: entries = await loop.run_in_executor(None, maintenance.run_due, self.path)
+            except Exception as e: print(f"maintenance failed: {e}", flush=True); continue
+            for entry in entries: print(maintenance.format_entry(entry), flush=True)
+
+    def _apply_batch(self, batch):
+        """Apply queued writes in one transaction; a failing write is rolled back on its own"""
+        conn = self.pool.get()
+        results = []
+        conn.execute("BEGIN")
+        try:
+            for fn, args, _ in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    results.append(fn(conn, *args, commit=False))
+                    conn.execute("RELEASE write")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write"); conn.execute("RELEASE write")
+                    results.append(e)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return results
+
+    # --- HTTP ---
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line: break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""): break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length") or 0)
+                    limit = MAX_CHANGESET_BYTES if target.startswith("/sync") else MAX_BODY_BYTES
+                    if length > limit: raise HTTPError(413, "Request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, target, body)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                except HTTPError as e:
+                    status, payload, keep_alive = e.status, {"error": str(e)}, False
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "Malformed request"}, False
+                data = json.dumps(payload).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                              f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive: break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        """Route one request; returns (status, JSON-able payload)"""
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if parts == ["health"] and method == "GET":
+                return 200, {"ok": True}
+            if parts == ["totals"] and method == "GET":
+                qty, value = await self.read(core.read_totals)
+                return 200, {"total_quantity": qty, "total_value": value}
+            if parts == ["stock"] and method == "GET":
+                at = query.get("at") or core.timestamp()
+                qty, value = await self.read(ledger.stock_value_at, at)
+                return 200, {"at": at, "total_quantity": qty, "total_value": value}
+            if parts == ["movements"] and method == "POST":
+                return 200, {"recorded": await self.write(ledger.record_movements, self._movements(body))}
+            if parts == ["sync"] and method == "GET":
+                site = query.get("site", "")
+                return 200, await self.read(lambda conn: {"site": sync.site_id(conn), "received_version": sync.received_version(conn, site)})
+            if parts == ["sync", "changes"]:
+                if method == "GET":
+                    return 200, await self.read(sync.changeset, self._id(query.get("since", "0")))
+                if method == "POST":
+                    return 200, await self.write(sync.apply_changeset, self._changeset(body))
+                raise HTTPError(405, "Method not allowed")
+            if parts == ["search"] and method == "GET":
+                return 200, {"products": await self.read(self._search, query.get("q", "").strip(), self._limit(query))}
+            if parts == ["products"]:
+                if method == "GET":
+                    rows = await self.read(self._list, query.get("before"), self._limit(query))
+                    return 200, {"products": [core.product_dict(r) for r in rows],
+                                 "next": rows[-1][0] if len(rows) == self._limit(query) else None}
+                if method == "POST":
+                    fields = self._product_fields(body)
+                    return 201, {"id": await self.write(core.add_product, *fields)}
+            if len(parts) == 2 and parts[0] == "products":
+                pid = self._id(parts[1])
+                if method == "GET":
+                    row = await self.read(core.get_product, pid)
+                    if row is None: raise HTTPError(404, "Product not found")
+                    return 200, core.product_dict(row)
+                if method == "PUT":
+                    fields = self._product_fields(body)
+                    if not await self.write(core.update_product, pid, *fields): raise HTTPError(404, "Product not found")
+                    return 200, {"id": pid}
+                if method == "DELETE":
+                    if not await self.write(core.delete_product, pid): raise HTTPError(404, "Product not found")
+                    return 200, {"id": pid}
+                raise HTTPError(405, "Method not allowed")
+            if parts in (["health"], ["totals"], ["search"], ["products"], ["stock"], ["movements"], ["sync"]):
+                raise HTTPError(405, "Method not allowed")
+            raise HTTPError(404, "No such endpoint")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            # Validation errors from inventory_core
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    def _search(self, conn, text, limit):
+        if not text: return []
+        rows = core.fetch_page(conn, core.search_view(conn, text, self.fts_enabled), limit=limit)
+        return [core.product_dict(r) for r in rows]
+
+    def _list(self, conn, before, limit):
+        view = core.make_view()
+        key = (self._id(before),) * 2 if before else None
+        return core.fetch_page(conn, view, before=key, limit=limit)
+
+    def _limit(self, query):
+        try: return max(1, min(int(query.get("limit", core.DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except ValueError: raise HTTPError(400, "Invalid limit")
+
+    def _id(self, text):
+        if not str(text).isdigit(): raise HTTPError(400, "Invalid product id")
+        return int(text)
+
+    def _movements(self, body):
+        try:
+            items = json.loads(body or b"{}").get("movements")
+            movements = [(int(m["product_id"]), m["kind"], int(m["change"]), m.get("note")) for m in items]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise HTTPError(400, 'Body must be {"movements": [{"product_id", "kind", "change"}, ...]}')
+        if not movements: raise HTTPError(400, "No movements given")
+        return movements
+
+    def _changeset(self, body):
+        try:
+            changes = json.loads(body or b"{}")
+            str(changes["site"]); int(changes["version"])
+            if not all(isinstance(row, list) and len(row) == 6 for row in changes["rows"]): raise ValueError
+        except (ValueError, TypeError, KeyError):
+            raise HTTPError(400, 'Body must be a changeset: {"site", "version", "rows": [[uid, name, price, quantity, updated_at, deleted_at], ...]}')
+        try: sync.check_changeset(changes)
+        except ValueError as e: raise HTTPError(400, str(e))
+        return changes
+
+    def _product_fields(self, body):
+        """(name, price_str, qty_str) from a JSON body, validated before it is queued"""
+        try: data = json.loads(body or b"{}")
+        except ValueError: raise HTTPError(400, "Body must be JSON")
+        if not isinstance(data, dict): raise HTTPError(400, "Body must be a JSON object")
+        name = str(data.get("name") or "").strip()
+        price_str, qty_str = str(data.get("price", "")).strip(), str(data.get("quantity", "")).strip()
+        core.validate_product_input(name, price_str, qty_str)
+        return name, price_str, qty_str
+
+async def serve(path, host, port, workers):
+    service = InventoryService(path, workers)
+    port = await service.start(host, port)
+    print(f"Serving {path} on http://{host}:{port}", flush=True)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optiedge Inventory HTTP service")
+    parser.add_argument("--db", default=database.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=READ_WORKERS, help="reader threads (default: %(default)s)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
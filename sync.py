@@ -0,0 +1,204 @@
+"""Offline-first sync between terminals: exchange changesets of product changes with a peer.
+
+Each terminal keeps its own database and works without the others. Every insert,
+update and delete already stamps the product with the next local change version
+(product_changes, database migration 6), so the changes since a peer last synced
+are one index range, whatever the size of the catalogue. A changeset carries the
+current state of each changed product once, however often it changed:
+
+    {"site": <sender's site id>, "version": <sender's version it covers>,
+     "rows": [[uid, name, price, quantity, updated_at, deleted_at], ...]}
+
+Products are matched by uid (database migration 8), since ids are only local.
+When both sides changed a product, the newer one wins: updated_at, or deleted_at
+for a deletion. Equal timestamps fall back to comparing the rows themselves, so
+every terminal picks the same winner. Timestamps come from each terminal's clock,
+so keep the clocks right.
+
+A peer is another terminal's database file (on this machine, or carried over on
+a USB stick) or a running service.py. sync() pulls the peer's changes, applies
+them, then pushes its own; each side records the highest version it has applied
+from the other, inside the transaction that applied it. Give each terminal its own database (a new terminal
+starts empty and syncs): a copied file shares its original's site id. A peer file
+must already exist; start one on a stick with inventory.py --db FILE --sync <this database>.
+"""
+import json
+import math
+import os
+from datetime import datetime
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import database
+import inventory_core as core
+from product_cache import current_version
+
+SYNC_NOTE = "sync from {site}"      # stock movements caused by a changeset are noted as this
+HTTP_TIMEOUT = 60
+
+# --- Changesets ---
+def site_id(conn):
+    return conn.execute("SELECT site_id FROM sync_state WHERE id = 1").fetchone()[0]
+
+def received_version(conn, peer):
+    """Highest change version of peer applied here (0 if it never synced)"""
+    r = conn.execute("SELECT received_version FROM sync_peers WHERE site_id = ?", (peer,)).fetchone()
+    return r[0] if r else 0
+
+def changeset(conn, since=0, skip=None):
+    """Changes made here after version since, as a changeset; skip=(after, upto) leaves out that version range"""
+    version = current_version(conn)
+    sql = """SELECT r.uid, p.name, p.price, p.quantity, p.updated_at, r.deleted_at
+             FROM product_changes c JOIN sync_rows r ON r.product_id = c.product_id
+             LEFT JOIN products p ON p.id = c.product_id
+             WHERE c.version > ? AND c.version <= ?"""
+    params = (since, version)
+    if skip: sql += " AND NOT (c.version > ? AND c.version <= ?)"; params += tuple(skip)
+    rows = conn.execute(sql + " ORDER BY c.version", params).fetchall()
+    return {"site": site_id(conn), "version": version, "rows": [list(r) for r in rows]}
+
+def _stamp(row):
+    """Conflict order of a [uid, name, price, quantity, updated_at, deleted_at] row: newest change wins"""
+    _, name, price, quantity, updated_at, deleted_at = row
+    if deleted_at: return (deleted_at, 1, "", 0, 0)
+    return (updated_at or "", 0, name, price, quantity)
+
+def _check_time(value, what):
+    if value is None: return
+    try: datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError): raise ValueError(f"{what} must be YYYY-MM-DD HH:MM:SS or null") from None
+
+def check_changeset(changes):
+    """Raise ValueError unless every row of changes holds values the products table can take"""
+    for n, row in enumerate(changes["rows"], 1):
+        try:
+            uid, name, price, quantity, updated_at, deleted_at = row
+            if not isinstance(uid, str) or not uid: raise ValueError("uid must be a non-empty string")
+            _check_time(deleted_at, "deleted_at")
+            if deleted_at: continue
+            if not isinstance(name, str): raise ValueError("Name must be a string")
+            if isinstance(price, bool) or not isinstance(price, (int, float)) or not math.isfinite(price):
+                raise ValueError("Price must be a number")
+            if isinstance(quantity, bool) or not isinstance(quantity, int): raise ValueError("Quantity must be a whole number")
+            core.validate_product_input(name.strip(), str(price), str(quantity))
+            _check_time(updated_at, "updated_at")
+        except ValueError as e:
+            raise ValueError(f"Changeset row {n}: {e}") from None
+
+def apply_changeset(conn, changes, commit=True):
+    """Apply a peer's changeset, keeping whichever side changed each product last.
+
+    Returns {"inserted", "updated", "deleted", "skipped", "from_version", "to_version"};
+    the versions bound the local changes the changeset caused, which the peer
+    already has. Records the changeset's version as received from its site.
+    Raises ValueError, before changing anything, if a row fails check_changeset()."""
+    check_changeset(changes)
+    stats = dict.fromkeys(("inserted", "updated", "deleted", "skipped"), 0)
+    stats["from_version"] = current_version(conn)
+    conn.execute("UPDATE ledger_context SET note=? WHERE id = 1", (SYNC_NOTE.format(site=changes["site"]),))
+    try:
+        for row in changes["rows"]:
+            uid, name, price, quantity, updated_at, deleted_at = row
+            local = conn.execute("""SELECT r.product_id, p.name, p.price, p.quantity, p.updated_at, r.deleted_at
+                                    FROM sync_rows r LEFT JOIN products p ON p.id = r.product_id WHERE r.uid = ?""", (uid,)).fetchone()
+            if local is not None and _stamp(row) <= _stamp(local):
+                stats["skipped"] += 1; continue
+            pid, live = (local[0], local[5] is None) if local is not None else (None, False)
+            if deleted_at:
+                if live: conn.execute("DELETE FROM products WHERE id = ?", (pid,)); stats["deleted"] += 1
+                else: stats["skipped"] += 1
+                # The deletion keeps its original time, so every terminal orders it the same way
+                conn.execute("INSERT INTO sync_rows (uid, product_id, deleted_at) VALUES (?, ?, ?) "
+                             "ON CONFLICT(uid) DO UPDATE SET deleted_at = excluded.deleted_at", (uid, pid, deleted_at))
+            elif live:
+                conn.execute("UPDATE products SET name=?, price=?, quantity=?, updated_at=? WHERE id=?",
+                             (name, price, quantity, updated_at, pid))
+                stats["updated"] += 1
+            else:
+                # New here, or deleted here before the peer's later change: (re)create it under the peer's uid
+                conn.execute("DELETE FROM sync_rows WHERE uid = ?", (uid,))
+                new_id = conn.execute("INSERT INTO products (name,price,quantity,updated_at) VALUES (?,?,?,?)",
+                                      (name, price, quantity, updated_at)).lastrowid
+                conn.execute("UPDATE sync_rows SET uid = ? WHERE product_id = ?", (uid, new_id))
+                stats["inserted"] += 1
+    finally:
+        conn.execute("UPDATE ledger_context SET note=NULL WHERE id = 1")
+    _record_received(conn, changes["site"], changes["version"])
+    stats["to_version"] = current_version(conn)
+    if commit: conn.commit()
+    return stats
+
+def _record_received(conn, peer, version):
+    conn.execute("""INSERT INTO sync_peers (site_id, received_version, synced_at) VALUES (?, ?, ?)
+                    ON CONFLICT(site_id) DO UPDATE SET received_version = MAX(received_version, excluded.received_version),
+                                                       synced_at = excluded.synced_at""", (peer, version, core.timestamp()))
+
+# --- Peers ---
+class FilePeer:
+    """Another terminal's database file; create=True starts one at a path that has none"""
+
+    def __init__(self, path, create=False):
+        # A mistyped path would otherwise become a new database holding a copy of the whole catalogue
+        if not create and not os.path.exists(path): raise FileNotFoundError(f"No database at {path}")
+        self.conn = database.connect(path)
+        try: database.initialize(self.conn)
+        except BaseException:
+            self.conn.close(); raise
+
+    def hello(self, site):
+        """(peer's site id, highest version of site it has received)"""
+        return site_id(self.conn), received_version(self.conn, site)
+
+    def changes(self, since):
+        return changeset(self.conn, since)
+
+    def apply(self, changes):
+        return apply_changeset(self.conn, changes)
+
+    def close(self):
+        self.conn.close()
+
+class ServicePeer:
+    """A service.py instance, e.g. http://192.168.0.10:8765"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def _call(self, path, body=None):
+        data = json.dumps(body, separators=(",", ":")).encode("utf-8") if body is not None else None
+        request = Request(self.url + path, data=data, method="POST" if data else "GET",
+                          headers={"Content-Type": "application/json"})
+        with urlopen(request, timeout=HTTP_TIMEOUT) as response: return json.load(response)
+
+    def hello(self, site):
+        reply = self._call(f"/sync?site={quote(site)}")
+        return reply["site"], reply["received_version"]
+
+    def changes(self, since):
+        return self._call(f"/sync/changes?since={int(since)}")
+
+    def apply(self, changes):
+        return self._call("/sync/changes", changes)
+
+    def close(self):
+        pass
+
+def open_peer(target):
+    """A FilePeer or ServicePeer for a database path or an http(s):// URL"""
+    return ServicePeer(target) if target.startswith(("http://", "https://")) else FilePeer(target)
+
+# --- Sync ---
+def sync(conn, peer):
+    """Exchange changes with peer in both directions; returns {"received": stats, "sent": stats}"""
+    me = site_id(conn)
+    other, sent_before = peer.hello(me)
+    if other == me: raise ValueError("The peer has the same site id - was its database copied from this one?")
+    incoming = peer.changes(received_version(conn, other))
+    received = apply_changeset(conn, incoming)
+    # What applying the peer's changes changed here, the peer already has
+    outgoing = changeset(conn, sent_before, skip=(received["from_version"], received["to_version"]))
+    sent = peer.apply(outgoing)
+    if sent["from_version"] == incoming["version"]:
+        # Nothing else changed on the peer in between, so its changes from ours need not come back
+        _record_received(conn, other, sent["to_version"]); conn.commit()
+    return {"peer": other, "received": received, "sent": dict(sent, rows=len(outgoing["rows"]))}
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+
+@pytest.fixture
+def open_db(tmp_path):
+    """open_db(name) -> a migrated connection to a fresh database file in tmp_path"""
+    connections = []
+
+    def open_db(name="inventory.db"):
+        conn = database.connect(str(tmp_path / name)); database.initialize(conn)
+        connections.append(conn)
+        return conn
+    yield open_db
+    for conn in connections: conn.close()
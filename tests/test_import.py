@@ -0,0 +1,24 @@
+import threading
+
+import pytest
+
+import inventory_core as core
+
+def write(path, rows):
+    path.write_text("Name,Price,Quantity\n" + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+def test_rejects_are_written_for_a_finished_import(open_db, tmp_path):
+    open_db()
+    filename = write(tmp_path / "prices.csv", ["Rice,10,5", "Beans,x,1"])
+    assert core.import_products_csv(str(tmp_path / "inventory.db"), filename) == (1, 1)
+    assert (tmp_path / "prices.rejects.csv").exists()
+
+def test_cancelled_import_leaves_no_rejects(open_db, tmp_path):
+    conn = open_db()
+    filename = write(tmp_path / "prices.csv", ["Beans,x,1"] + [f"Item {i},1,1" for i in range(10)])
+    cancelled = threading.Event(); cancelled.set()
+    with pytest.raises(core.ImportCancelled):
+        core.import_products_csv(str(tmp_path / "inventory.db"), filename, cancelled=cancelled, batch_size=2)
+    assert not (tmp_path / "prices.rejects.csv").exists()
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 0
@@ -0,0 +1,46 @@
+import inventory_core as core
+import ledger
+
+def stock(conn, pid):
+    """{location id: quantity} for one product"""
+    return dict(conn.execute("SELECT location_id, quantity FROM location_stock WHERE id = ?", (pid,)).fetchall())
+
+def product(conn, name, qty, location=None):
+    core.add_product(conn, name, "10", str(qty), location=location)
+    return conn.execute("SELECT MAX(id) FROM products").fetchone()[0]
+
+def test_total_follows_the_locations(open_db):
+    conn = open_db()
+    annex = core.add_location(conn, "Annex")
+    pid = product(conn, "Rice", 5)
+    core.set_location_stock(conn, annex, pid, 4, commit=True)
+    assert stock(conn, pid) == {core.DEFAULT_LOCATION: 5, annex: 4}
+    assert core.get_product(conn, pid)[3] == 9
+    assert core.check_totals(conn)[0] and core.check_totals(conn, annex)[0]
+
+def test_sale_comes_from_the_location_holding_the_stock(open_db):
+    conn = open_db()
+    warehouse = core.add_location(conn, "Warehouse")
+    pid = product(conn, "Rice", 5, location=warehouse)
+    ledger.record_movements(conn, [(pid, "sale", -3)])
+    assert stock(conn, pid) == {warehouse: 2}
+
+def test_reduced_total_spreads_over_locations(open_db):
+    conn = open_db()
+    warehouse = core.add_location(conn, "Warehouse")
+    pid = product(conn, "Beans", 7)
+    core.set_location_stock(conn, warehouse, pid, 4, commit=True)
+    before = conn.execute("SELECT MAX(id) FROM stock_movements").fetchone()[0]
+    core.update_product(conn, pid, "Beans", "10", "2")
+    assert stock(conn, pid) == {core.DEFAULT_LOCATION: 0, warehouse: 2}
+    # One movement for the edit, not one per location touched
+    assert conn.execute("SELECT quantity_change FROM stock_movements WHERE id > ?", (before,)).fetchall() == [(-9,)]
+    assert core.check_totals(conn)[0] and core.check_totals(conn, warehouse)[0]
+
+def test_increase_lands_on_the_writers_location(open_db):
+    conn = open_db()
+    warehouse = core.add_location(conn, "Warehouse")
+    pid = product(conn, "Salt", 1)
+    conn.execute("UPDATE ledger_context SET location_id = ? WHERE id = 1", (warehouse,))
+    conn.execute("UPDATE products SET quantity = 6 WHERE id = ?", (pid,)); conn.commit()
+    assert stock(conn, pid) == {core.DEFAULT_LOCATION: 1, warehouse: 5}
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+import pytest
+
+import inventory_core as core
+import service
+import sync
+
+def terminals(open_db, tmp_path):
+    """Two synced terminals sharing one product: (conn, peer, product id here, product id there)"""
+    conn = open_db("till-1.db")
+    core.add_product(conn, "Rice", "10", "5")
+    peer = sync.FilePeer(str(tmp_path / "till-2.db"), create=True)
+    sync.sync(conn, peer)
+    return conn, peer, 1, peer.conn.execute("SELECT id FROM products").fetchone()[0]
+
+def edit(conn, pid, quantity, at):
+    conn.execute("UPDATE products SET quantity = ?, updated_at = ? WHERE id = ?", (quantity, at, pid)); conn.commit()
+
+def quantity(conn, pid):
+    row = core.get_product(conn, pid)
+    return row and row[3]
+
+def test_newer_edit_wins_on_both_sides(open_db, tmp_path):
+    conn, peer, here, there = terminals(open_db, tmp_path)
+    edit(conn, here, 7, "2030-01-01 10:00:00")
+    edit(peer.conn, there, 3, "2030-01-01 11:00:00")
+    sync.sync(conn, peer)
+    assert quantity(conn, here) == quantity(peer.conn, there) == 3
+    peer.close()
+
+def test_equal_timestamps_pick_the_same_winner(open_db, tmp_path):
+    conn, peer, here, there = terminals(open_db, tmp_path)
+    edit(conn, here, 7, "2030-01-01 10:00:00")
+    edit(peer.conn, there, 3, "2030-01-01 10:00:00")
+    sync.sync(conn, peer)
+    assert quantity(conn, here) == quantity(peer.conn, there) == 7
+    peer.close()
+
+def test_deletion_and_later_edit(open_db, tmp_path):
+    conn, peer, here, there = terminals(open_db, tmp_path)
+    uid = conn.execute("SELECT uid FROM sync_rows WHERE product_id = ?", (here,)).fetchone()[0]
+    core.delete_product(conn, here)
+    sync.sync(conn, peer)
+    assert quantity(peer.conn, there) is None
+    # An edit older than the deletion stays deleted; a newer one brings the product back
+    old = {"site": "x", "version": 1, "rows": [[uid, "Rice", 10.0, 9, "2000-01-01 10:00:00", None]]}
+    assert sync.apply_changeset(conn, old)["skipped"] == 1
+    new = {"site": "x", "version": 2, "rows": [[uid, "Rice", 10.0, 9, "2099-01-01 10:00:00", None]]}
+    assert sync.apply_changeset(conn, new)["inserted"] == 1
+    assert conn.execute("SELECT quantity FROM products WHERE name = 'Rice'").fetchone()[0] == 9
+    peer.close()
+
+def test_reinserted_id_revives_its_tombstone(open_db, tmp_path):
+    conn, path, export = open_db(), str(tmp_path / "inventory.db"), str(tmp_path / "products.csv")
+    for name in ("Rice", "Beans"): core.add_product(conn, name, "10", "5")
+    core.write_products_csv(path, export)
+    uid = conn.execute("SELECT uid FROM sync_rows WHERE product_id = 2").fetchone()[0]
+    core.delete_product(conn, 2)
+    # Export, delete, re-import: the ID column upserts the deleted product again
+    assert core.import_products_csv(path, export) == (2, 0)
+    assert conn.execute("SELECT uid, deleted_at FROM sync_rows WHERE product_id = 2").fetchone() == (uid, None)
+
+@pytest.mark.parametrize("row", [
+    ["x:1", "Rice", 1, "x", None, None],
+    ["x:1", "", 1, 1, None, None],
+    ["x:1", "Rice", -1, 1, None, None],
+    ["x:1", "Rice", 1, 1, "yesterday", None],
+])
+def test_changeset_with_bad_values_is_refused(open_db, row):
+    conn = open_db()
+    good = ["x:2", "Beans", 1, 1, None, None]
+    with pytest.raises(ValueError):
+        sync.apply_changeset(conn, {"site": "x", "version": 2, "rows": [good, row]})
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 0
+    with pytest.raises(service.HTTPError) as error:
+        service.InventoryService.__new__(service.InventoryService)._changeset(
+            json.dumps({"site": "x", "version": 2, "rows": [row]}).encode())
+    assert error.value.status == 400
+
+def test_missing_peer_file_is_not_created(tmp_path):
+    with pytest.raises(FileNotFoundError): sync.open_peer(str(tmp_path / "typo.db"))
+    assert not (tmp_path / "typo.db").exists()
+    (tmp_path / "junk.db").write_text("not a database")
+    with pytest.raises(sqlite3.DatabaseError): sync.open_peer(str(tmp_path / "junk.db"))